@@ -10,7 +10,11 @@ Ready for submit!
 """
 
 import pandas as pd #for importing tsv files
-import networkx as nx #for checking the graph
+import numpy as np #for vectorized variant checks
+from concurrent.futures import ProcessPoolExecutor #for loading several variant files at once
+from itertools import repeat
+import bisect,csv,gzip,io,os,struct #for reading VCF files and their indexes
+import json #for the header of Pedigree snapshots
 
 class Pedigree(object):
 	''' Pedigree() Creates class that loads person and variant data from files
@@ -33,14 +37,18 @@ class Pedigree(object):
 				can check after the fact!!
 	path is a .tsv
 	'''
+	_variant_row_bytes = 300 #in memory, a row of a variants file with short names, for the first max_memory chunk
 
 	def __init__(self,people=None,variants=None,graph=None):
 		"""A blank Pedigree object for loading people and variants"""
 
 		#have to reset the default values here to make copies of these objects
 		self.people=people if people != None else dict() 
-		self.variants=variants if variants != None else set()
-		self.graph=graph if graph != None else nx.DiGraph()
+		self.variants=variants if variants != None else VariantTable() #columnar store, iterates as Variant views
+		self.graph=graph if graph != None else PedigreeGraph([],[],[]) #integer parent arrays
+		self.families=dict() #person name -> PLINK family ID, for people loaded from FAM/PED files
+		self.phenotypes=dict() #person name -> PLINK phenotype, likewise
+		self.genotypes=None #BedGenotypes of a PLINK .bed file, if one was loaded
 
 	def load_people(self,path,header=True):
 		'''load_people() Takes a filename as input that includes the following 
@@ -52,69 +60,499 @@ class Pedigree(object):
 		Denote presence of header with header=True.
 		'''
 		column_names = ["name","gender","father_name","mother_name"]
-		assert isinstance(header,bool), "please denote header as True or False"
+		if not isinstance(header,bool):
+			raise AssertionError("please denote header as True or False")
+		if len(self.people) > 0:
+			raise AssertionError("people are already loaded into this Pedigree")
 		peoplefile=None
 
 		#load the input tsv into a pandas array
 		if header: #if header present
 			peoplefile = pd.read_table(path) #pandas read input
-			assert set(column_names).issubset(set(peoplefile.columns)), """Column titles must include: name, gender, father_name, mother_name. 
-		    You provided: %s""" % str(peoplefile.columns)
+			if not set(column_names).issubset(set(peoplefile.columns)):
+				raise AssertionError("""Column titles must include: name, gender, father_name, mother_name. 
+		    You provided: %s""" % str(peoplefile.columns))
 			peoplefile = peoplefile[column_names] #subset these columns
 		else:
 			peoplefile = pd.read_table(path,names=column_names,usecols=range(0,4),header=None) #if you don't have it, assume the first columns
-		peoplefile["mother_name"] = peoplefile.apply(lambda x: x["mother_name"] if type(x["mother_name"])!=float else None,axis=1) #change the NaNs to None
-		peoplefile["father_name"] = peoplefile.apply(lambda x: x["father_name"] if type(x["father_name"])!=float else None,axis=1) #change the NaNs to None
+		self._add_people(peoplefile,path)
+		return None
+
+	def extend_people(self,rows):
+		'''extend_people() Adds new people to a loaded Pedigree. rows is a DataFrame with the load_people()
+		column titles, or (name, gender, father_name, mother_name) tuples. Parents may be people
+		already in the Pedigree or in rows. Only the new people are checked for cycles, since
+		existing people gain no parents, so the cost grows with the batch rather than the Pedigree.
+		'''
+		column_names = ["name","gender","father_name","mother_name"]
+		if isinstance(rows,pd.DataFrame):
+			if not set(column_names).issubset(set(rows.columns)):
+				raise AssertionError("Column titles must include: name, gender, father_name, mother_name")
+			rows = rows[column_names].copy()
+		else:
+			rows = pd.DataFrame(list(rows),columns=column_names)
+		self._add_people(rows,"extend_people() rows")
+		return None
+
+	def load_fam(self,path,separator=None):
+		'''load_fam() Loads people from a PLINK FAM file: whitespace-separated family ID, individual ID,
+		father ID, mother ID, sex (1 = male, 2 = female) and phenotype, with no header. Parents coded
+		'0' are missing. Individual IDs become person names, or with a separator family ID +
+		separator + individual ID, for files whose individual IDs repeat between families.
+		Family IDs and phenotypes are kept in families and phenotypes for save_fam(). Other sex
+		codes fail the usual gender check. The file is read in one go, as the people are checked
+		together: a parent's line may come after their child's.
+		'''
+		self._load_fam(path,separator)
+		return None
+
+	def _load_fam(self,path,separator):
+		'''load_fam(), returning the FAM columns as a DataFrame'''
+		if len(self.people) > 0:
+			raise AssertionError("people are already loaded into this Pedigree")
+		fam = pd.read_csv(path,sep=r"\s+",header=None,usecols=range(6),dtype=str)
+		self._add_fam(fam,path,separator)
+		return fam
+
+	def save_fam(self,path,separator=None,chunksize=100000):
+		'''save_fam() Writes every person to a PLINK FAM file, chunksize people at a time. People not loaded
+		from a FAM or PED file get their own name as family ID and phenotype -9. With a separator,
+		the family ID prefix that load_fam() added to each name is removed again.
+		'''
+		people = list(self.people.values())
+		def plink_id(person):
+			if person == None: return "0"
+			family = self.families.get(person.name,person.name)
+			if separator != None and person.name.startswith(family+separator):
+				return person.name[len(family)+len(separator):]
+			return person.name
+		with open(path,"w") as f:
+			for start in range(0,len(people),chunksize):
+				chunk = people[start:start+chunksize]
+				pd.DataFrame({
+					"family": [self.families.get(p.name,p.name) for p in chunk],
+					"person": [plink_id(p) for p in chunk],
+					"father": [plink_id(p.father) for p in chunk],
+					"mother": [plink_id(p.mother) for p in chunk],
+					"sex": ["1" if p.gender == "male" else "2" for p in chunk],
+					"phenotype": [self.phenotypes.get(p.name,"-9") for p in chunk]
+					}).to_csv(f,sep=" ",header=False,index=False)
+		return None
+
+	def load_ped(self,path,map_path=None,separator=None,chunksize=10000):
+		'''load_ped() Loads people and genotypes from a PLINK PED file and its MAP file (by default the
+		same path ending in .map). The first six PED columns are read as by load_fam(); the rest are
+		two alleles per MAP marker, '0' for missing. PED files have no reference allele, so each
+		marker's most common allele in the file is used as ref, and every person carrying another
+		allele gets one variant with the first such allele. MAP positions are 1-based (converted
+		to 0-based), chromosomes 1-22 and 23/24/25 (X, Y, XY) map to the hg38 names, and markers
+		on other chromosomes (e.g. 0 or MT) or with a position <= 0 are skipped, as in load_bed().
+		The file is read twice, chunksize lines at a time: once for the people and allele counts,
+		once for the variants, which are validated like load_variants(bulk=True). If any variant
+		fails, the people and variants of this call are removed again, so the load can be retried.
+		'''
+		if len(self.people) > 0:
+			raise AssertionError("people are already loaded into this Pedigree")
+		if map_path == None: map_path = os.path.splitext(path)[0]+".map"
+		markers = pd.read_csv(map_path,sep=r"\s+",header=None,dtype=str)
+		chroms = _plink_chroms(markers[0])
+		positions = markers[markers.columns[-1]].astype(np.int64).to_numpy()
+		n_columns = 6+2*len(markers)
+		read = lambda: pd.read_csv(path,sep=r"\s+",header=None,dtype=str,chunksize=chunksize)
+
+		fams,counts = list(),np.zeros((len(markers),4),dtype=np.int64)
+		for chunk in read():
+			if chunk.shape[1] != n_columns:
+				raise AssertionError("%s has %d columns, but %s lists %d markers" % (path,chunk.shape[1],map_path,len(markers)))
+			fams.append(chunk.iloc[:,:6])
+			alleles = chunk.iloc[:,6:].to_numpy(dtype=object)
+			for i,base in enumerate(VariantTable._bases):
+				counts[:,i] += (alleles == base).reshape(len(chunk),-1,2).sum(axis=(0,2))
+		fam = pd.concat(fams,ignore_index=True) if fams else pd.DataFrame(columns=range(6),dtype=str)
+		start,registered,line = self.variants.n_rows,len(self.variants.people),0
+		self._add_fam(fam,path,separator)
+		names = self._fam_names(fam,separator).to_numpy(dtype=object)
+
+		ref = np.array(VariantTable._bases,dtype=object)[counts.argmax(axis=1)]
+		usable = (counts.sum(axis=1) > 0)&(positions > 0)&pd.Series(chroms).isin(Variant._chrom_sizes.keys()).to_numpy()
+		try:
+			for chunk in read():
+				alleles = chunk.iloc[:,6:].to_numpy(dtype=object)
+				first,second = alleles[:,0::2],alleles[:,1::2]
+				alt = np.where((first != ref)&(first != "0"),first,second)
+				rows,cols = np.nonzero((alt != ref)&(alt != "0")&usable)
+				variantfile = pd.DataFrame({
+					"chrom": chroms[cols],
+					"pos": positions[cols]-1,
+					"ref": ref[cols],
+					"alt": alt[rows,cols],
+					"person": names[line+rows]
+					})
+				self._check_variant_chunk(variantfile,path,line+rows+1)
+				self.variants.extend(variantfile)
+				line += len(chunk)
+		except AssertionError: #undo the partial load; no people were loaded before it
+			self.variants.truncate(start,registered)
+			for name in names.tolist():
+				self.families.pop(name,None)
+				self.phenotypes.pop(name,None)
+			self.people,self.graph = dict(),PedigreeGraph([],[],[])
+			raise
+		self.variants.regions.build() #index the new positions for region queries
+		return None
+
+	def load_bed(self,path,separator=None):
+		'''load_bed() Loads people from a PLINK .fam file and their genotypes from the .bed and .bim files
+		beside it (path may be any of the three or their shared prefix). The .bed file is memory-mapped
+		as self.genotypes and decoded only when asked: each person's variants read their column of
+		it, and genotypes.variants_at() / genotypes.dosages() read whole markers. A person carrying
+		allele 1 of a marker has a variant with allele 1 as alt and allele 2 as ref; markers that
+		are not single A/C/G/T bases on a known chromosome are not shown as variants. These variants
+		are read-only.
+		'''
+		prefix = path[:-4] if path.endswith((".bed",".bim",".fam")) else path
+		names = self._fam_names(self._load_fam(prefix+".fam",separator),separator)
+		self.genotypes = BedGenotypes(prefix+".bed",prefix+".bim",[self.people[name] for name in names.tolist()])
+		for person in self.genotypes.people:
+			person.variants = BedPersonVariants(self.genotypes,person)
+		return None
+
+	@staticmethod
+	def _fam_names(fam,separator):
+		'''person names of the rows of a FAM DataFrame'''
+		return fam[1] if separator == None else fam[0]+separator+fam[1]
+
+	def _add_fam(self,fam,path,separator):
+		'''add the people of a DataFrame of the six FAM columns through the load_people() checks'''
+		family = fam[0]
+		parent = lambda ids: (ids if separator == None else family+separator+ids).where(ids != "0",None)
+		peoplefile = pd.DataFrame({
+			"name": self._fam_names(fam,separator),
+			"gender": fam[4].map({"1":"M","2":"F"}).fillna(fam[4]), #other codes fail the gender check
+			"father_name": parent(fam[2]),
+			"mother_name": parent(fam[3])
+			})
+		self._add_people(peoplefile,path)
+		self.families.update(zip(peoplefile["name"].tolist(),family.tolist()))
+		self.phenotypes.update(zip(peoplefile["name"].tolist(),fam[5].tolist()))
+		return None
+
+	def _add_people(self,peoplefile,path):
+		'''validate the people in a name, gender, father_name, mother_name DataFrame and add them;
+		nothing is added if any check fails'''
+		for col in ["mother_name","father_name"]:
+			peoplefile[col] = peoplefile[col].astype(object).where(peoplefile[col].notna(),None) #change the NaNs to None
 
 		# check that each person is represented in the database and that each person name is unique
-		assert len(set(peoplefile["name"])) == len(peoplefile["name"]), "You have duplicate 'name's in your input."
-		assert set(peoplefile["mother_name"]). \
-			  union(set(peoplefile["father_name"])).difference(set([None])). \
-			  issubset(set(peoplefile["name"])), """mothers and fathers must also have their own rows.
-		These parents are not represented: %s""" % (set(peoplefile["mother_name"]).
-													union(set(peoplefile["father_name"])).
-													difference(set(peoplefile["name"])))
-		# check that graph is a DAG using networkx
-		for ix,row in peoplefile.iterrows():
-			self.graph.add_node(row["name"],{"gender":row["gender"]})
-			if row["mother_name"] != None: self.graph.add_edge(row["mother_name"], row["name"]) #add edges to graph representing relationships
-			if row["father_name"] != None: self.graph.add_edge(row["father_name"], row["name"]) #add edges to graph representing relationships
-		assert nx.is_directed_acyclic_graph(self.graph), """You have an error in your pedigree.
-		You did not provide a directed acyclic graph (pedigree is impossible)."""
+		duplicated = peoplefile["name"].duplicated().to_numpy()
+		if duplicated.any():
+			print("ERROR:: record %d in %s :: duplicate name %s"%(np.argmax(duplicated)+1,path,peoplefile["name"].iat[np.argmax(duplicated)]))
+			raise AssertionError("You have duplicate 'name's in your input.")
+		existing = [name for name in peoplefile["name"].tolist() if name in self.people]
+		if len(existing) > 0:
+			raise AssertionError("These people are already in the Pedigree: %s" % existing)
+		missing = {parent for parent in set(peoplefile["mother_name"]).union(set(peoplefile["father_name"]))
+				   if parent != None and parent not in self.people}.difference(set(peoplefile["name"]))
+		if len(missing) > 0:
+			raise AssertionError("""mothers and fathers must also have their own rows.
+		These parents are not represented: %s""" % missing)
+		# the same name and gender checks as Person(), which python -O would skip
+		names = peoplefile["name"].astype(object)
+		bad = ~(names.map(lambda x: isinstance(x,str) and 0 < len(x) <= 255)&peoplefile["gender"].isin(list(Person._genders.keys()))).to_numpy()
+		if bad.any():
+			print("ERROR:: record %d in %s :: bad name or gender"%(np.argmax(bad)+1,path))
+			raise AssertionError("names must be 1 to 255 characters and gender one of %s, got %s %r" % (
+				list(Person._genders.keys()),names.iat[np.argmax(bad)],peoplefile["gender"].iat[np.argmax(bad)]))
+		# check that graph is a DAG, new people get integer ids in file order after the existing ones
+		names = names.tolist()
+		offset = len(self.graph)
+		codes = []
+		for col in ["mother_name","father_name"]:
+			parent_names = peoplefile[col].tolist()
+			code = pd.Categorical(parent_names,categories=names).codes.astype(np.int32)
+			code = np.where(code >= 0,code+offset,-1)
+			for i in np.flatnonzero(code < 0).tolist(): #parents already loaded
+				if parent_names[i] != None: code[i] = self.graph.ids[parent_names[i]]
+			codes.append(code)
 
 		# validate each person using the Person generator
-		peoplefile.set_index(peoplefile["name"],inplace=True) #make the input file indexable by row name which equals node name
 		try:
 			"""THOUGHTS: so for this to work, each person has to inherit from the mother (top part of the graph).
 			we should store the graph representation as well.
 			"""
 			# create the people objects as nodes, don't worry about setting parents yet
 			count = 0
-			for ix,row in peoplefile.iterrows():
+			people = []
+			for name,gender in zip(names,peoplefile["gender"].tolist()):
 				count += 1
-				self.people[row["name"]] = Person(name=row["name"],
-											gender=row["gender"],
-											mother=None,
-											father=None
-										   )
+				people.append(Person(name=name,gender=gender,mother=None,father=None))
 		except AssertionError as msg:
 			print("ERROR:: record %d in %s :: %s"%(count,path,msg)) #print an error indicating the line number in the file
 			raise
+		order = self.graph.extend(names,codes[0],codes[1])
+		if order is None:
+			raise AssertionError("""You have an error in your pedigree.
+		You did not provide a directed acyclic graph (pedigree is impossible).""")
+		for person in people:
+			self.people[person.name] = person
+			self.variants.attach(person) #person.variants now reads from the table
 
-		# traverse the graph from top to bottom to save time and to do this systematically
-		for node in nx.topological_sort(self.graph): #this should return the top ancestor first
-			parent = self.people[node] # get the person object
-			first_order_descendents = self.graph.edge[node] #these are the children of that node
-			if parent.gender == "female":
-				for child in first_order_descendents:
-					self.people[child].set_mother(parent)
-			elif parent.gender == "male":
-				for child in first_order_descendents:
-					self.people[child].set_father(parent)
-
+		# traverse the new people from top to bottom to save time and to do this systematically
+		mothers,fathers = self.graph.mother,self.graph.father
+		for child in order.tolist(): #the top ancestors come first
+			person = people[child-offset]
+			if mothers[child] >= 0: person.set_mother(self.people[self.graph.names[mothers[child]]])
+			if fathers[child] >= 0: person.set_father(self.people[self.graph.names[fathers[child]]])
+		for person in people: #from now on, parent changes are written to the graph as well
+			person._graph = self.graph
 		return None
 
-	def load_variants(self,path,header=True):
+	def to_networkx(self):
+		'''to_networkx() Returns the pedigree as a networkx.DiGraph with parent -> child edges and
+		a gender attribute on each node. networkx is only needed for this export.
+		'''
+		import networkx as nx
+		graph = nx.DiGraph()
+		graph.add_nodes_from((name,{"gender":self.people[name].gender}) for name in self.graph.names)
+		graph.add_edges_from(self.graph.edges())
+		return graph
+
+	def topological_order(self,people=None):
+		'''topological_order() Returns people (names or Person objects, default everyone) as Person
+		objects sorted parents before children, by generation. Batch ancestry queries can walk
+		this order so that each person's parents are always handled first.
+		'''
+		if people == None: people = self.people.values()
+		people = [self.people[p] if isinstance(p,str) else p for p in people]
+		return sorted(people,key=lambda person: person.generation)
+
+	def kinship(self,people=None,sparse=False):
+		'''kinship() Returns the kinship coefficients between people (names, default everyone).
+		Ancestors outside people are used in the computation but not returned. The result is a
+		DataFrame with people as both index and columns (its values are a numpy matrix), or with
+		sparse=True a DataFrame of the non-zero pairs with columns person1, person2, kinship, each
+		pair once. Uses the pedigree as loaded.
+		'''
+		ids,matrix = self.graph.kinship(None if people == None else [self.graph.ids[p] for p in people])
+		if people != None:
+			position = np.empty(len(self.graph),dtype=np.int64)
+			position[ids] = np.arange(len(ids))
+			ids = np.array([self.graph.ids[p] for p in people],dtype=np.int64)
+			matrix = matrix[np.ix_(position[ids],position[ids])]
+		names = [self.graph.names[i] for i in ids.tolist()]
+		if not sparse:
+			return pd.DataFrame(matrix,index=names,columns=names)
+		rows,cols = np.nonzero(np.triu(matrix))
+		return pd.DataFrame({"person1":np.array(names,dtype=object)[rows],
+							 "person2":np.array(names,dtype=object)[cols],
+							 "kinship":matrix[rows,cols]})
+
+	def kinship_pairs(self,pairs):
+		'''kinship_pairs() Returns a numpy array with the kinship coefficient of each (name, name) pair,
+		computing over only the people in pairs and their ancestors
+		'''
+		pairs = [(self.graph.ids[a],self.graph.ids[b]) for a,b in pairs]
+		if len(pairs) == 0: return np.zeros(0)
+		first,second = np.array(pairs,dtype=np.int64).T
+		ids,matrix = self.graph.kinship(np.concatenate([first,second]))
+		position = np.empty(len(self.graph),dtype=np.int64)
+		position[ids] = np.arange(len(ids))
+		return matrix[position[first],position[second]]
+
+	def inbreeding(self,people=None):
+		'''inbreeding() Returns a Series of inbreeding coefficients (the kinship of each person's
+		parents) indexed by name, for people (names, default everyone)
+		'''
+		names = self.graph.names if people == None else list(people)
+		return pd.Series(2*self.kinship_pairs([(p,p) for p in names])-1,index=names)
+
+	def relationship(self,a,b):
+		'''relationship() Returns what person b is to person a (names), e.g. "sibling", "half-sibling",
+		"aunt/uncle", "first cousin once removed", or "unrelated". Uses the pedigree as loaded.
+		'''
+		return self.graph.relationships().relationship(self.graph.ids[a],self.graph.ids[b])[0]
+
+	def meiotic_distance(self,a,b):
+		'''meiotic_distance() Returns the fewest meioses separating persons a and b (names), None if unrelated'''
+		return self.graph.relationships().meiotic_distance(self.graph.ids[a],self.graph.ids[b])
+
+	def family_relationships(self,people):
+		'''family_relationships() Returns a DataFrame with columns person1, person2, relationship and
+		meiotic_distance for every pair of people (names), where relationship is what person2 is to person1
+		'''
+		index = self.graph.relationships()
+		ids = [self.graph.ids[p] for p in people]
+		rows = [(people[i],people[j])+index.relationship(ids[i],ids[j])
+				for i in range(len(ids)) for j in range(i+1,len(ids))]
+		relationships = pd.DataFrame(rows,columns=["person1","person2","relationship","meiotic_distance"])
+		relationships["meiotic_distance"] = relationships["meiotic_distance"].astype("Int64") #None for unrelated
+		return relationships
+
+	def mendelian_errors(self,people=None,chunksize=None):
+		'''mendelian_errors() Checks every complete trio (a child with both parents loaded, for children in
+		people, default everyone) for genotypes the parents cannot explain, all trios at once.
+		With a PLINK .bed file loaded (see load_bed()) the full genotypes are checked marker by
+		marker, chunksize markers at a time; a marker counts for a trio when all three are called.
+		Otherwise the variants are checked: a child's variant is an error when neither parent has
+		a variant with the same alt at that position, as people without a variant are taken to be
+		homozygous reference there. Either way errors where both parents are homozygous reference
+		are marked "de_novo" and the rest "mendelian", and chrX and chrY are skipped.
+		Returns:
+			:obj:`tuple`: two DataFrames; one row per trio with columns child, mother, father, sites
+				(sites checked), errors and de_novo, and one row per error with columns child,
+				mother, father, chrom, pos, ref, alt and error, plus child_dosage, mother_dosage
+				and father_dosage (copies of alt) when checked from a .bed file
+		'''
+		graph = self.graph
+		ids = np.flatnonzero((graph.mother >= 0)&(graph.father >= 0))
+		if people != None:
+			ids = ids[np.isin(ids,[graph.ids[p] for p in people])]
+		trios = np.stack([ids,graph.mother[ids],graph.father[ids]])
+		persons = np.array([self.people[name] for name in graph.names],dtype=object)[trios] if len(ids) > 0 else np.zeros((3,0),dtype=object)
+		if self.genotypes is not None:
+			genotypes = self.genotypes
+			columns = np.vectorize(lambda person: genotypes._codes.get(person,-1),otypes=[np.int64])(persons)
+			found = (columns >= 0).all(axis=0)
+			trio,markers,dosages,de_novo,checked = genotypes.mendelian_errors(*columns[:,found],chunksize=chunksize)
+			trio = np.flatnonzero(found)[trio]
+			sites = pd.DataFrame({"chrom":genotypes.chroms[markers],"pos":genotypes.positions[markers],
+								  "ref":genotypes.ref[markers],"alt":genotypes.alt[markers]})
+			for i,member in enumerate(["child","mother","father"]):
+				sites[member+"_dosage"] = dosages[i]
+			sites_checked = np.zeros(len(ids),dtype=np.int64)
+			sites_checked[found] = checked
+		else:
+			table = self.variants
+			codes = np.vectorize(lambda person: table._person_codes.get(person,len(table.people)),otypes=[np.int64])(persons)
+			trio,rows,de_novo,sites_checked = table.mendelian_errors(*codes)
+			sites = table.to_frame(rows).drop(columns="person")
+		names = np.array(graph.names,dtype=object)
+		for i,member in enumerate(["child","mother","father"]):
+			sites.insert(i,member,names[trios[i][trio]])
+		sites.insert(7,"error",np.where(de_novo,"de_novo","mendelian").astype(object))
+		order = np.argsort(trio,kind="stable") #group the errors by trio
+		sites = sites.iloc[order].reset_index(drop=True)
+		summary = pd.DataFrame({"child":names[trios[0]],"mother":names[trios[1]],"father":names[trios[2]],
+								"sites":sites_checked,
+								"errors":np.bincount(trio,minlength=len(ids)),
+								"de_novo":np.bincount(trio[de_novo],minlength=len(ids))})
+		return summary,sites
+
+	def segregating_sites(self,model,affected=None,unaffected=None):
+		'''segregating_sites() Returns the variant sites that segregate with a disease in a family under an
+		inheritance model, checking every site for every person at once. model is one of
+			"dominant": affected people carry the alt allele, unaffected people do not
+			"recessive": affected people are homozygous alt, unaffected people are not, and the
+				parents of affected people carry it
+			"x_linked": recessive on chrX; affected males carry it, affected females are homozygous
+				and their parents carry it, mothers of affected males carry it, unaffected males do
+				not carry it and unaffected females are not homozygous
+			"de_novo": affected people carry it, their parents and unaffected people do not
+		affected and unaffected are names; by default they are the people with PLINK phenotype 2
+		and 1 (see load_fam()). Only these people are checked, including as parents. Genotypes come
+		from the PLINK .bed file if one is loaded, where a missing genotype fits any model. Otherwise
+		they come from the variants, where a person without a variant at a site is homozygous
+		reference; variants do not record zygosity, so a carrier also counts as homozygous.
+		Returns:
+			:obj:`pandas.DataFrame`: the passing sites, with columns chrom, pos, ref, alt and carriers
+				(how many of the people checked carry the alt allele)
+		'''
+		models = ["dominant","recessive","x_linked","de_novo"]
+		if model not in models:
+			raise AssertionError("model must be one of %s, not %s" % (", ".join(models),model))
+		if affected == None and unaffected == None:
+			affected = [name for name,phenotype in self.phenotypes.items() if phenotype == "2"]
+			unaffected = [name for name,phenotype in self.phenotypes.items() if phenotype == "1"]
+		affected,unaffected = list(affected),list(unaffected or [])
+		if len(affected) == 0:
+			raise AssertionError("at least one person must be affected")
+		if set(affected) & set(unaffected):
+			raise AssertionError("people cannot be both affected and unaffected")
+		members = affected+unaffected
+		people = [self.people[name] for name in members]
+		if self.genotypes is not None:
+			genotypes = self.genotypes
+			columns = np.array([genotypes._codes.get(person,-1) for person in people],dtype=np.int64)
+			if (columns < 0).any():
+				raise AssertionError("everyone checked must be in the .bed file")
+			markers,dosage = genotypes.carrier_dosages(columns,["chrX"] if model == "x_linked" else None)
+			sites = lambda keep: pd.DataFrame({"chrom":genotypes.chroms[markers[keep]],"pos":genotypes.positions[markers[keep]],
+											   "ref":genotypes.ref[markers[keep]],"alt":genotypes.alt[markers[keep]]})
+			missing = dosage < 0
+			carries,lacks = (dosage > 0)|missing,(dosage == 0)|missing
+			homozygous,heterozygous = (dosage == 2)|missing,dosage < 2
+		else:
+			table = self.variants
+			codes = np.array([table._person_codes.get(person,len(table.people)) for person in people],dtype=np.int64)
+			found,carries = table.carriers(codes,["chrX"] if model == "x_linked" else None)
+			sites = lambda keep: table.sites.to_frame(found[keep]).drop(columns="carriers")
+			lacks,homozygous,heterozygous = ~carries,carries,np.ones_like(carries)
+
+		#column of each member's parents among the members, -1 if not checked
+		column = {name:i for i,name in enumerate(members)}
+		parents = np.array([[column.get(getattr(person,parent).name,-1) if getattr(person,parent) != None else -1
+							 for parent in ("mother","father")] for person in people],dtype=np.int64).reshape(-1,2)
+		sick = np.arange(len(members)) < len(affected)
+		male = np.array([person._gender == 0 for person in people],dtype=bool)
+		every = lambda test,who: test[:,who].all(axis=1)
+		if model == "dominant":
+			passing = every(carries,sick)&every(lacks,~sick)
+		elif model == "recessive":
+			obligate = parents[sick].ravel()
+			passing = every(homozygous,sick)&every(heterozygous,~sick)&every(carries,obligate[obligate >= 0])
+		elif model == "x_linked":
+			obligate = np.concatenate([parents[sick&male,0],parents[sick&~male].ravel()])
+			passing = every(carries,sick&male)&every(homozygous,sick&~male)&every(lacks,~sick&male)& \
+					  every(heterozygous,~sick&~male)&every(carries,obligate[obligate >= 0])
+		else:
+			if (parents[sick] < 0).any(): #a missing parent (-1) would read the last member's column
+				raise AssertionError("both parents of everyone affected must be checked for de novo variants")
+			called = ~missing if self.genotypes is not None else np.ones_like(carries)
+			passing = every(carries&called,sick)&every(lacks&called,parents[sick].ravel())&every(lacks,~sick)
+		sites = sites(passing) #decode only the passing sites
+		sites["carriers"] = (carries&~lacks)[passing].sum(axis=1)
+		return sites
+
+	def gene_drop(self,replicates,seed=None,frequency=None,workers=1,batch=1000):
+		'''gene_drop() Simulates the transmission of alleles down the pedigree (gene dropping) in
+		`replicates` independent replicates. The pedigree is walked once per batch of `batch` replicates,
+		one generation at a time, drawing every replicate's transmissions at once. Batches can run
+		in a pool of `workers` processes (None for one per CPU). Batch k uses the k-th seed spawned
+		from numpy.random.SeedSequence(seed), so a given seed and batch give the same result for
+		any number of workers.
+		Each parent that is not loaded, e.g. both parents of a founder, brings a founder allele.
+		By default these are labelled 2*i (from the mother) and 2*i+1 (from the father) for
+		self.graph.names[i], so that alleles shared by descent have the same label. With a frequency,
+		each founder allele is instead the alt allele with that probability.
+		Returns:
+			:obj:`numpy.ndarray`: replicates x people x 2 int32 labels of the maternal and paternal alleles,
+				or with a frequency replicates x people int8 copies of the alt allele, with people
+				in the order of self.graph.names
+		'''
+		if replicates < 0:
+			raise AssertionError("replicates must not be negative")
+		if batch <= 0:
+			raise AssertionError("batch must be a positive number of replicates")
+		if workers != None and workers <= 0:
+			raise AssertionError("workers must be a positive number of processes")
+		if frequency != None and not 0 <= frequency <= 1:
+			raise AssertionError("frequency must be between 0 and 1")
+		graph = self.graph
+		sizes = [min(batch,replicates-start) for start in range(0,replicates,batch)]
+		seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+		jobs = (repeat(graph.mother),repeat(graph.father),repeat(graph.order),repeat(graph.generation),
+				sizes,seeds,repeat(frequency))
+		if workers == 1:
+			batches = list(map(_gene_drop,*jobs))
+		else:
+			with ProcessPoolExecutor(max_workers=workers) as pool:
+				batches = list(pool.map(_gene_drop,*jobs))
+		dtype = np.int32 if frequency == None else np.int8
+		alleles = np.concatenate(batches,axis=2) if batches else np.zeros((2,len(graph),0),dtype=dtype)
+		alleles = alleles.transpose(2,1,0)
+		return alleles if frequency == None else alleles.sum(axis=2,dtype=np.int8)
+
+	def load_variants(self,path,header=True,bulk=False,chunksize=None,max_memory=None):
 		"""load_variants() Takes a filename as input that includes the following 
 		tab-separated columns in this order:
 		1: chrom (the chromosome location, in "chr#" format)
@@ -123,45 +561,2339 @@ class Pedigree(object):
 		4: alt (a alternate nucleotide)
 		5: person (the name of the person the variant is associated with)
 		Denote presence of header with header=True.
+		With bulk=True the file is validated as whole columns and appended to 
+		self.variants in one step instead of building one Variant() per row.
+		With chunksize (rows) or max_memory (bytes) set, the file is streamed: each chunk
+		is validated, including duplicates against earlier chunks, and appended before
+		the next is read. max_memory bounds the read buffer only: one chunk and the copies
+		its validation makes. The variants kept in self.variants are not counted. The
+		first chunk is sized from an estimate of a row, later ones from the rows read so far.
+		If any record fails, every variant added by this call is removed again.
 		"""
 
 		#check we already ran load_people()
-		assert len(self.people) > 0, "you must load the people into the dataset first"
+		if len(self.people) == 0:
+			raise AssertionError("you must load the people into the dataset first")
+		if not isinstance(header,bool):
+			raise AssertionError("please denote header as True or False")
+		if chunksize != None and chunksize <= 0:
+			raise AssertionError("chunksize must be a positive number of rows")
+		if max_memory != None and max_memory <= 0:
+			raise AssertionError("max_memory must be a positive number of bytes")
 
-		#check columns
-		column_names = ["chrom","pos","ref","alt","person"]
-		assert isinstance(header,bool), "please denote header as True or False"
-		variantfile=None
+		start = self.variants.n_rows
+		try:
+			for offset,variantfile in self._read_variant_chunks(path,header,chunksize,max_memory):
+				self._load_variant_chunk(variantfile,path,offset,bulk)
+		except AssertionError:
+			self.variants.truncate(start) #undo the partial load
+			raise
+		self.variants.regions.build() #index the new positions for region queries
+		return None
 
-		if header: #if header is True
-			variantfile = pd.read_table(path)
-			assert set(column_names).issubset(set(variantfile.columns)), """Column titles must include: "chrom","pos","ref","alt","person" 
-		    You provided: %s""" % str(variantfile.columns)
-			variantfile = variantfile[column_names]
+	def load_variants_many(self,paths,workers=None,header=True):
+		"""load_variants_many() Loads several variants files, in the format of load_variants(),
+		parsing and validating them in a pool of `workers` processes (default: one per CPU,
+		workers=1 parses them here). Duplicates within and between files, and against
+		variants already loaded, are reported with the file and record number.
+		If any file fails, none of them are added.
+		"""
+		if len(self.people) == 0:
+			raise AssertionError("you must load the people into the dataset first")
+		if not isinstance(header,bool):
+			raise AssertionError("please denote header as True or False")
+		if workers != None and workers <= 0:
+			raise AssertionError("workers must be a positive number of processes")
+		paths = list(paths)
+		names = [p.name for p in self.variants.people]
+		jobs = (paths,repeat(header),repeat(self.variants.chroms),repeat(names))
+		if workers == 1:
+			parsed = list(map(_parse_variant_file,*jobs))
 		else:
-			variantfile = pd.read_table(path,names=column_names,usecols=range(0,5),header=None) #only use first 5 columns
+			with ProcessPoolExecutor(max_workers=workers) as pool:
+				parsed = list(pool.map(_parse_variant_file,*jobs))
 
-		#replace NaN with None
-		variantfile["person"] = variantfile.apply(lambda x: 
-										   x["person"] if type(x["person"])!=float else None,axis=1)
+		#duplicates between files, then against what is already loaded
+		keys = np.concatenate([VariantTable._keys(c["person"],c["chrom"],c["pos"]) for c in parsed]+[np.zeros(0,dtype=np.int64)])
+		sources = np.repeat(np.arange(len(paths)),[len(c["pos"]) for c in parsed])
+		records = np.concatenate([np.arange(len(c["pos"]))+1 for c in parsed]+[np.zeros(0,dtype=np.int64)])
+		order = np.argsort(keys,kind="stable")
+		repeated = np.flatnonzero(keys[order][1:] == keys[order][:-1])
+		if len(repeated) > 0:
+			first,second = order[repeated[0]],order[repeated[0]+1]
+			msg = "Duplicate variants for each individual exist in the dataset: record %d in %s repeats record %d in %s" % (
+				records[second],paths[sources[second]],records[first],paths[sources[first]])
+			print("ERROR:: record %d in %s :: duplicate variant"%(records[second],paths[sources[second]]))
+			raise AssertionError(msg)
+		loaded = self.variants.duplicates(keys)
+		if loaded.any():
+			i = int(np.argmax(loaded))
+			msg = "Duplicate variants for each individual exist in the dataset: record %d in %s is already loaded" % (records[i],paths[sources[i]])
+			print("ERROR:: record %d in %s :: duplicate variant"%(records[i],paths[sources[i]]))
+			raise AssertionError(msg)
 
-		assert set(variantfile["person"]).difference(set([None])).issubset(self.people.keys()), """Variants in input include people not loaded in pedigree. 
-		These people could not be found: %s""" % set(variantfile["person"]).difference(set([None])).difference(self.people.keys())
+		for codes in parsed:
+			self.variants.extend_codes(codes)
+		self.variants.regions.build() #index the new positions for region queries
+		return None
+
+	def load_vcf(self,path,samples=None,regions=None,index=None,chunksize=100000):
+		"""load_vcf() Loads the SNPs of a VCF file, plain or bgzip-compressed.
+		Each sample column is matched to the Person of the same name, or through `samples`,
+		a dict of VCF sample name -> person name (samples left out of it are ignored).
+		Every sample whose GT has a non-reference allele gets one variant at that site
+		(POS is converted to 0-based); reference calls, no-calls, indels and symbolic
+		alleles are skipped. The store holds one alt per person per site, so a 1/2 call keeps allele 1.
+		Chromosome names without a "chr" prefix are matched to the hg38 names with one.
+		regions (a list of (chrom, start, end), BED-style) loads only records inside them; for a
+		bgzipped file the tabix (.tbi) or CSI (.csi) index next to it, or `index`, is used
+		to seek straight to each region, otherwise the file is scanned.
+		Records are validated like load_variants(bulk=True), `chunksize` lines at a time; errors
+		give the VCF line number, or with an index the number of the record read.
+		If any record fails, every variant added by this call is removed again.
+		"""
+		if len(self.people) == 0:
+			raise AssertionError("you must load the people into the dataset first")
+		if chunksize <= 0:
+			raise AssertionError("chunksize must be a positive number of lines")
+		header_lines,sample_names = _vcf_header(path)
+		if samples == None:
+			samples = {name:name for name in sample_names}
+		columns = [9+i for i,name in enumerate(sample_names) if name in samples]
+		people = np.array([samples[name] for name in sample_names if name in samples],dtype=object)
+		if not set(people).issubset(self.people.keys()):
+			raise AssertionError("""VCF samples include people not loaded in pedigree. 
+		These people could not be found: %s""" % set(people).difference(self.people.keys()))
 
-		assert any(variantfile.duplicated(subset=["chrom","pos","person"]))==False,"""Duplicate variants for each individual exist in the dataset.
-		First example: %s""" % variantfile[variantfile.duplicated(subset=["chrom","pos","person"])].head(1)
+		if regions != None:
+			regions = _merge_regions(regions)
+			if index == None and _is_gzip(path):
+				index = next((path+ext for ext in [".tbi",".csi"] if os.path.exists(path+ext)),None)
+		if regions != None and index != None:
+			records = _vcf_indexed_records(path,index,regions)
+		else:
+			records = _vcf_scanned_records(path,header_lines,regions)
+
+		start = self.variants.n_rows
+		try:
+			lines,numbers = list(),list()
+			for number,line in records:
+				lines.append(line)
+				numbers.append(number)
+				if len(lines) == chunksize:
+					self._load_vcf_chunk(lines,numbers,path,columns,people)
+					lines,numbers = list(),list()
+			if len(lines) > 0:
+				self._load_vcf_chunk(lines,numbers,path,columns,people)
+		except AssertionError:
+			self.variants.truncate(start) #undo the partial load
+			raise
+		self.variants.regions.build() #index the new positions for region queries
+		return None
+
+	def _load_vcf_chunk(self,lines,numbers,path,columns,people):
+		"""Expand the genotypes of a list of VCF data lines into variants, validate and add them.
+		numbers are the line numbers, columns the sample columns to use and people their person names.
+		"""
+		fields = pd.read_csv(io.StringIO("".join(lines)),sep="\t",header=None,dtype=str,
+							 usecols=list(range(0,9))+columns,quoting=csv.QUOTE_NONE)
+		chrom = fields[0]
+		prefixed = "chr"+chrom
+		chrom = chrom.where(chrom.isin(Variant._chrom_sizes.keys())|~prefixed.isin(Variant._chrom_sizes.keys()),prefixed)
+		alts = fields[4].str.split(",",expand=True).to_numpy(dtype=object)
+		has_gt = fields[8].str.startswith("GT").to_numpy()
+
+		#first non-reference allele of every (line, sample) GT, 0 if there is none
+		gt = fields[columns].apply(lambda col: col.str.split(":",n=1).str[0]).to_numpy(dtype=object).ravel()
+		alleles = pd.Series(gt).str.extract(r"^(\.|\d+)(?:[/|](\.|\d+))?")
+		first = pd.to_numeric(alleles[0],errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+		second = pd.to_numeric(alleles[1],errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+		allele = np.where(first > 0,first,second)
+		line = np.repeat(np.arange(len(fields)),len(columns))
+		carried = np.flatnonzero((allele > 0)&(allele <= alts.shape[1])&has_gt[line])
+		line,allele = line[carried],allele[carried]
+		alt = alts[line,allele-1]
+		ref = fields[3].to_numpy(dtype=object)[line]
+		snp = (pd.Series(ref).str.len() == 1).to_numpy()&(pd.Series(alt).str.len() == 1).to_numpy()&(alt != "*")
+
+		variantfile = pd.DataFrame({
+			"chrom": chrom.to_numpy(dtype=object)[line][snp],
+			"pos": fields[1].astype(np.int64).to_numpy()[line][snp]-1,
+			"ref": ref[snp],
+			"alt": alt[snp],
+			"person": people[carried % len(columns)][snp]
+			})
+		self._check_variant_chunk(variantfile,path,np.asarray(numbers)[line][snp])
+		self.variants.extend(variantfile)
+		return None
+
+	def save(self,path):
+		"""save() Writes the people, their parents and every variant to a binary snapshot at path.
+		The file is a short JSON header followed by 64-byte aligned arrays, so that
+		Pedigree.open() can memory-map it instead of parsing it. Removed variants are left out.
+		"""
+		people = list(self.people.values())
+		position = {person:i for i,person in enumerate(people)}
+		if not all(person in position for person in self.variants.people):
+			raise AssertionError("every person with variants must be in the pedigree")
+		table = self.variants
+		rows = table.rows()
+		person = np.asarray([position[p] for p in table.people]+[-1],dtype=np.int32)[table.person[rows]] #-1 stays -1
+		order = np.lexsort((table.pos[rows],table.chrom[rows])) #for the region index
+		genders = sorted(set(p.gender for p in people))
+		names = [p.name.encode("utf-8") for p in people]
+		arrays = {
+			"names": np.frombuffer(b"".join(names),dtype=np.uint8),
+			"name_ends": np.cumsum([len(n) for n in names],dtype=np.int64),
+			"gender": np.array([genders.index(p.gender) for p in people],dtype=np.uint8),
+			"mother": np.array([position[p.mother] if p.mother != None else -1 for p in people],dtype=np.int32),
+			"father": np.array([position[p.father] if p.father != None else -1 for p in people],dtype=np.int32),
+			"chrom": table.chrom[rows],
+			"pos": table.pos[rows],
+			"ref": table.ref[rows],
+			"alt": table.alt[rows],
+			"person": person,
+			"live": np.ones(len(rows),dtype=bool),
+			"region_rows": order.astype(np.int64),
+			"region_pos": table.pos[rows][order],
+			"region_bounds": np.searchsorted(table.chrom[rows][order],np.arange(len(table.chroms)+1)).astype(np.int64)
+			}
+		_write_snapshot(path,{"chroms":table.chroms,"genders":genders,
+							  "families":self.families,"phenotypes":self.phenotypes},arrays)
+		return None
+
+	@classmethod
+	def open(cls,path):
+		"""open() Returns the Pedigree saved at path by save().
+		Variant columns are copy-on-write memory maps of the file: processes that open the same
+		snapshot share its pages, and changes made after opening are never written back.
+		"""
+		header,arrays = _read_snapshot(path)
+		table = VariantTable(chroms=header["chroms"],capacity=0)
+		for column in VariantTable._columns+["live"]:
+			setattr(table,column,arrays[column])
+		table.n_rows = len(arrays["pos"])
+		table.index.reset() #built from the columns on first lookup
+		for code in range(len(table.chroms)):
+			lo,hi = arrays["region_bounds"][code],arrays["region_bounds"][code+1]
+			if hi > lo:
+				table.regions.rows[code] = arrays["region_rows"][lo:hi]
+				table.regions.positions[code] = arrays["region_pos"][lo:hi]
+
+		names,ends = arrays["names"].tobytes(),arrays["name_ends"].tolist()
+		starts = [0]+ends[:-1]
+		people = [Person(names[a:b].decode("utf-8"),header["genders"][g],sanity=False)
+				  for a,b,g in zip(starts,ends,arrays["gender"].tolist())]
+		for code,person in enumerate(people):
+			table._person_codes[person] = code
+			person.variants = PersonVariants(table,code)
+		table.people = people
+		graph = PedigreeGraph([p.name for p in people],arrays["mother"],arrays["father"])
+		mothers,fathers = arrays["mother"].tolist(),arrays["father"].tolist()
+		for child in graph.order.tolist(): #parents first, so no generation has to be revised
+			if mothers[child] >= 0: people[child].set_mother(people[mothers[child]])
+			if fathers[child] >= 0: people[child].set_father(people[fathers[child]])
+		for person in people:
+			person._graph = graph
+
+		pedigree = cls(people={p.name:p for p in people},variants=table,graph=graph)
+		pedigree.families = header.get("families",dict())
+		pedigree.phenotypes = header.get("phenotypes",dict())
+		return pedigree
+
+	def _read_variant_chunks(self,path,header,chunksize,max_memory):
+		"""Yield (number of records before the chunk, DataFrame) pieces of a variants file.
+		Reads the whole file at once unless chunksize or max_memory is set. max_memory bounds
+		one chunk and the copies its validation makes, so the first chunk is sized from an
+		estimate of a row, and later ones from the rows measured so far.
+		"""
+		column_names = ["chrom","pos","ref","alt","person"]
+		if header: #if header is True
+			reader = pd.read_table(path,iterator=True)
+		else:
+			reader = pd.read_table(path,names=column_names,usecols=range(0,5),header=None,iterator=True) #only use first 5 columns
+		rows = chunksize
+		if rows == None and max_memory != None:
+			rows = max(1,int(max_memory//(4*self._variant_row_bytes))) #until a row has been measured
+		offset = 0
+		with reader:
+			while True:
+				try:
+					variantfile = reader.get_chunk(rows) #rows=None reads the rest of the file
+				except StopIteration:
+					return
+				if header:
+					if not set(column_names).issubset(set(variantfile.columns)):
+						raise AssertionError("""Column titles must include: "chrom","pos","ref","alt","person" 
+		    You provided: %s""" % str(variantfile.columns))
+					variantfile = variantfile[column_names]
+				if chunksize == None and max_memory != None and len(variantfile) > 0:
+					row_bytes = variantfile.memory_usage(deep=True).sum()/float(len(variantfile))
+					rows = max(1,int(max_memory//(4*row_bytes))) #validation holds a few temporary copies of each chunk
+				yield offset,variantfile
+				offset += len(variantfile)
+
+	def _load_variant_chunk(self,variantfile,path,offset,bulk):
+		"""Validate one chunk of a variants file and add it to the Pedigree.
+		offset is the number of records in the file before this chunk, for error messages.
+		"""
+		column_names = ["chrom","pos","ref","alt","person"]
+		self._check_variant_chunk(variantfile,path,offset)
+
+		if bulk:
+			self.variants.extend(variantfile) #also rejects duplicates of earlier chunks
+			return None
 
 		# add variants to the dataset
-		for ix,row in variantfile.iterrows():
-			variant = Variant(row["chrom"],
-			                          row["pos"],
-			                          ref=row["ref"],
-			                          alt=row["alt"],
-			                          person=self.people[row["person"]])
-			self.people[row["person"]].add_variant(variant) #add each variant to the person
+		for chrom,pos,ref,alt,person in zip(*[variantfile[col] for col in column_names]):
+			variant = Variant(chrom,
+			                          pos,
+			                          ref=ref,
+			                          alt=alt,
+			                          person=self.people[person])
+			self.people[person].add_variant(variant) #add each variant to the person
 			self.variants.add(variant) #add a list of variants as well
 		return None
 
+	def _check_variant_chunk(self,variantfile,path,offset):
+		"""Check the people, duplicates and every column of one chunk of a variants file.
+		The column checks run for bulk=False too: the checks in Variant() are assert statements,
+		which python -O removes. Missing values are replaced with None in place.
+		"""
+		#replace NaN with None
+		for col in ["ref","person"]:
+			variantfile[col] = variantfile[col].astype(object).where(variantfile[col].notna(),None)
+
+		missing = variantfile["person"].isna().to_numpy()
+		if missing.any():
+			record = _record_number(offset,int(np.argmax(missing)))
+			print("ERROR:: record %d in %s :: person missing"%(record,path))
+			raise AssertionError("Every variant must belong to a person, record %d in %s has none" % (record,path))
+		unknown = ~variantfile["person"].isin(list(self.people.keys()))
+		if unknown.any():
+			print("ERROR:: record %d in %s :: person %s not loaded"%(_record_number(offset,int(np.argmax(unknown.to_numpy()))),path,variantfile["person"][unknown].iloc[0]))
+			raise AssertionError("""Variants in input include people not loaded in pedigree. 
+		These people could not be found: %s""" % set(variantfile["person"][unknown]))
+
+		duplicated = variantfile.duplicated(subset=["chrom","pos","person"])
+		if duplicated.any():
+			print("ERROR:: record %d in %s :: duplicate variant"%(_record_number(offset,int(np.argmax(duplicated.to_numpy()))),path))
+			raise AssertionError("""Duplicate variants for each individual exist in the dataset.
+		First example: %s""" % variantfile[duplicated].head(1))
+
+		self._check_variant_columns(variantfile,path,offset)
+		return None
+
+	def _check_variant_columns(self,variantfile,path,offset=0):
+		"""Run the Variant() sanity checks on whole columns at once.
+		The first failing record is reported in the same format as load_people(),
+		with the same message that Variant() would have raised for it.
+		offset is the number of records in the file before this chunk, or an array of
+		each row's line number in the file.
+		"""
+		n = len(variantfile)
+		if n == 0:
+			return None
+		checks = self._variant_column_checks(variantfile)
+		failed = np.vstack([mask for mask,_,_,_ in checks])
+		bad_rows = failed.any(axis=0)
+		if bad_rows.any():
+			row = int(np.argmax(bad_rows)) #first offending record in the file
+			msg = checks[int(np.argmax(failed[:,row]))][3](row)
+			print("ERROR:: record %d in %s :: %s"%(_record_number(offset,row),path,msg)) #print an error indicating the line number in the file
+			raise AssertionError(msg)
+		return None
+
+	@staticmethod
+	def _variant_column_checks(variantfile):
+		"""The Variant() sanity checks over whole columns, in the order Variant() runs them.
+		Returns:
+			:obj:`list`: (mask of failing rows, column, error code, function of a row giving the
+				message Variant() would raise) for each check
+		"""
+		n = len(variantfile)
+		chrom = variantfile["chrom"].astype(object)
+		pos = pd.to_numeric(variantfile["pos"],errors="coerce")
+		chrom_sizes = chrom.map(Variant._chrom_sizes)
+		bad_chrom = chrom_sizes.isna().to_numpy()
+		#Variant() takes int pos only, so a float column fails even where it holds whole numbers
+		if variantfile["pos"].dtype.kind in "iu":
+			pos_is_int = np.ones(n,dtype=bool)
+		elif variantfile["pos"].dtype.kind == "O":
+			pos_is_int = variantfile["pos"].map(lambda x: isinstance(x,int)).to_numpy(dtype=bool)
+		else:
+			pos_is_int = np.zeros(n,dtype=bool)
+		bad_pos_type = ~pos_is_int
+		bad_pos_range = ~bad_chrom & pos_is_int & ~((pos>=0)&(pos<chrom_sizes)).to_numpy()
+
+		checks = [(bad_chrom,"chrom","bad_chrom",lambda i: "chrom %s not found" % chrom.iat[i]),
+				  (bad_pos_type,"pos","bad_pos",lambda i: "pos must be type int, got type %s" % type(variantfile["pos"].iloc[i:i+1].tolist()[0])),
+				  (bad_pos_range,"pos","bad_pos",lambda i: "pos must be < chrom size, chrom %s is %d, pos is %d"%(chrom.iat[i],chrom_sizes.iat[i],pos.iat[i]))]
+		for col,required in [("alt",True),("ref",False)]:
+			allele = variantfile[col].astype(object)
+			present = allele.notna().to_numpy()
+			is_str = allele.map(lambda x: isinstance(x,str)).to_numpy()
+			length = allele.where(is_str,"").str.len().to_numpy()
+			bad_type = ~is_str & (present if not required else True)
+			bad_len = is_str & (length != 1)
+			bad_base = is_str & (length == 1) & ~allele.isin(["A","C","T","G"]).to_numpy()
+			error = "bad_"+col
+			if col == "alt":
+				checks += [(bad_type,col,error,lambda i,a=allele: "alt allele must be type str, got type %s" % type(a.iat[i])),
+						   (bad_len,col,error,lambda i,l=length: "alt allele only supports SNPs at this time, got length %d" % l[i]),
+						   (bad_base,col,error,lambda i: "alt allele must be in A,C,T,G")]
+			else:
+				checks += [(bad_type,col,error,lambda i,a=allele: "ref allele must be a string, got type %s" % type(a.iat[i])),
+						   (bad_len,col,error,lambda i,l=length: "ref allele only supports SNPs at this time, got length %d" % l[i]),
+						   (bad_base,col,error,lambda i: "ref allele must be in A,C,T,G")]
+		return [(np.broadcast_to(mask,(n,)),col,error,message) for mask,col,error,message in checks]
+
+	def validate_people(self,path,header=True):
+		"""validate_people() Checks a people file in the format of load_people() in one vectorized pass
+		and reports every problem rather than stopping at the first: bad names, bad genders,
+		duplicate names, names already loaded, parents without a row, and cycles of parents.
+		Names already loaded count as known parents. Nothing is loaded, and no assert statements
+		are used, so the checks also run under python -O.
+		Returns:
+			:obj:`pandas.DataFrame`: one row per problem, ordered by record, with columns record
+				(1-based data row, 0 for the whole file), column, error (a short code) and message
+		"""
+		column_names = ["name","gender","father_name","mother_name"]
+		if header:
+			peoplefile = pd.read_table(path)
+			missing = [col for col in column_names if col not in peoplefile.columns]
+			if missing:
+				return _report([_report_rows(np.ones(1,dtype=bool),np.zeros(1,dtype=np.int64),",".join(missing),
+											 "missing_columns",lambda i: "Column titles must include: %s" % ", ".join(column_names))])
+			peoplefile = peoplefile[column_names]
+		else:
+			peoplefile = pd.read_table(path,names=column_names,usecols=range(0,4),header=None)
+		records = np.arange(1,len(peoplefile)+1)
+		names = peoplefile["name"].astype(object)
+		found = []
+
+		is_str = names.map(lambda x: isinstance(x,str)).to_numpy()
+		length = names.where(is_str,"").str.len().to_numpy()
+		found.append(_report_rows(~is_str|(length < 1)|(length > 255),records,"name","bad_name",
+								  lambda i: "name must be a str of 1 to 255 characters, got %r" % names.iat[i]))
+		gender = peoplefile["gender"].astype(object)
+		found.append(_report_rows(~gender.isin(list(Person._genders.keys())).to_numpy(),records,"gender","bad_gender",
+								  lambda i: "gender must be one of %s, got %r" % (list(Person._genders.keys()),gender.iat[i])))
+		duplicate = names.duplicated(keep="first").to_numpy()
+		first = pd.Series(records[~duplicate],index=names[~duplicate].to_numpy())
+		found.append(_report_rows(duplicate,records,"name","duplicate_name",
+								  lambda i: "duplicate name %s, first at record %d" % (names.iat[i],first[names.iat[i]])))
+		loaded = names.isin(list(self.people.keys())).to_numpy()
+		found.append(_report_rows(loaded,records,"name","already_loaded",
+								  lambda i: "%s is already in the Pedigree" % names.iat[i]))
+
+		known = set(names.tolist())
+		parents = dict()
+		for col in ["mother_name","father_name"]:
+			parent = peoplefile[col].astype(object).where(peoplefile[col].notna(),None)
+			missing = parent.map(lambda p: p != None and p not in known and p not in self.people).to_numpy()
+			found.append(_report_rows(missing,records,col,"missing_parent",
+									  lambda i,parent=parent: "parent %s has no row" % parent.iat[i]))
+			parents[col] = pd.Categorical(parent[~duplicate],categories=names[~duplicate]).codes #loaded parents are -1
+
+		graph = PedigreeGraph(names[~duplicate].tolist(),parents["mother_name"],parents["father_name"])
+		in_cycle = np.zeros(len(peoplefile),dtype=bool)
+		in_cycle[records[~duplicate][graph.cycle_members()]-1] = True
+		found.append(_report_rows(in_cycle,records,"name","cycle",
+								  lambda i: "%s is part of a cycle of parents (the pedigree is not a DAG)" % names.iat[i]))
+		return _report(found)
+
+	def validate_variants(self,path,header=True,chunksize=None,max_memory=None):
+		"""validate_variants() Checks a variants file in the format of load_variants() against the loaded
+		people in one pass, streamed like load_variants(), and reports every problem rather than
+		stopping at the first: the Variant() checks on chrom, pos, alt and ref, missing people,
+		people not loaded, and duplicate (chrom, pos, person) rows within the file or against
+		variants already loaded. Nothing is loaded, and no assert statements are used, so the
+		checks also run under python -O.
+		Returns:
+			:obj:`pandas.DataFrame`: one row per problem, ordered by record, with columns record
+				(1-based data row, 0 for the whole file), column, error (a short code) and message
+		"""
+		column_names = ["chrom","pos","ref","alt","person"]
+		if header:
+			missing = [col for col in column_names if col not in pd.read_table(path,nrows=0).columns]
+			if missing:
+				return _report([_report_rows(np.ones(1,dtype=bool),np.zeros(1,dtype=np.int64),",".join(missing),
+											 "missing_columns",lambda i: "Column titles must include: %s" % ", ".join(column_names))])
+		table = self.variants
+		names = [p.name for p in table.people] #table codes first, then people without variants yet
+		stored_names = set(names)
+		names += [name for name in self.people if name not in stored_names]
+		found,keys,key_records = [],[],[]
+		for offset,variantfile in self._read_variant_chunks(path,header,chunksize,max_memory):
+			records = np.arange(offset+1,offset+len(variantfile)+1)
+			checks = self._variant_column_checks(variantfile)
+			for mask,col,error,message in checks:
+				found.append(_report_rows(mask,records,col,error,message))
+			person = variantfile["person"].astype(object).where(variantfile["person"].notna(),None)
+			missing = person.isna().to_numpy()
+			found.append(_report_rows(missing,records,"person","missing_person",
+									  lambda i: "person missing"))
+			unknown = person.map(lambda p: p != None and p not in self.people).to_numpy()
+			found.append(_report_rows(unknown,records,"person","unknown_person",
+									  lambda i,person=person: "person %s not loaded" % person.iat[i]))
+			#keys of the rows whose chrom, pos and person are usable
+			usable = ~(checks[0][0]|checks[1][0]|checks[2][0]|missing|unknown)
+			subset = variantfile[usable]
+			codes = VariantTable.encode(subset.assign(pos=subset["pos"].astype(np.int64),person=person[usable]),table.chroms,names)
+			key = VariantTable._keys(codes["person"],codes["chrom"],codes["pos"])
+			if len(table) > 0:
+				stored = table.duplicates(key)
+				found.append(_report_rows(stored,records[usable],"pos","duplicate_variant",
+										  lambda i: "variant is already loaded"))
+			keys.append(key)
+			key_records.append(records[usable])
+		if keys:
+			key,key_records = pd.Series(np.concatenate(keys)),np.concatenate(key_records)
+			duplicate = key.duplicated(keep="first").to_numpy()
+			first = pd.Series(key_records[~duplicate],index=key[~duplicate].to_numpy())
+			found.append(_report_rows(duplicate,key_records,"pos","duplicate_variant",
+									  lambda i: "duplicate variant, first at record %d" % first[key.iat[i]]))
+		return _report(found)
+
+	def variants_in_region(self,chrom,start,end):
+		'''variants_in_region() Returns the list of Variants with start <= pos < end on chrom, in position order.
+		Each Variant's .person tells whose it is.
+		'''
+		return [self.variants[row] for row in self.variants.regions.region(chrom,start,end).tolist()]
+
+	def variants_at(self,chrom,pos):
+		'''variants_at() Returns the list of Variants at exactly chrom:pos, across all people.'''
+		return [self.variants[row] for row in self.variants.regions.point(chrom,pos).tolist()]
+
+	def carriers(self,chrom,pos,alt=None):
+		'''carriers() Returns the list of people with a variant at chrom:pos (with that alt, if given),
+		read from the site index rather than by scanning every variant.
+		'''
+		table = self.variants
+		rows = [table.sites.carrier_rows(site) for site in table.sites.find(chrom,pos,alt).tolist()]
+		codes = np.sort(table.person[np.concatenate(rows+[np.zeros(0,dtype=np.int64)])])
+		return [table.people[code] for code in codes.tolist() if code >= 0]
+
+	def allele_counts(self):
+		'''allele_counts() Returns a DataFrame with one row per distinct variant site, with columns chrom,
+		pos, ref, alt and carriers (the number of people with that variant), in chrom, pos and alt order.
+		'''
+		return self.variants.sites.to_frame()
+
+	def allele_frequencies(self,by=None,chroms=None):
+		'''allele_frequencies() Returns the frequency of every variant site (chrom, pos, alt), across the
+		whole cohort or within groups of people, optionally only on chroms. by is None (everyone
+		loaded), "family" (PLINK family IDs, see load_fam(); people without one are left out) or a
+		dict of person name -> group label. Variants only record that a person carries the alt
+		allele, so each carrier counts as one copy and frequency = carriers / (2 * people), where
+		people are all loaded people of the group, as people without a variant are reference.
+		The counts for by=None and by="family" are kept by the variant table after the first call
+		and updated as variants are loaded or removed, so later calls do not recount.
+		Returns:
+			:obj:`pandas.DataFrame`: one row per site (and group) with carriers, with columns chrom, pos,
+				ref, alt, carriers, people and frequency, and first a column named after by
+				("family", or "group" for a dict) when grouped
+		'''
+		if not (by == None or by == "family" or isinstance(by,dict)):
+			raise AssertionError("by must be None, \"family\" or a dict of name -> group")
+		table = self.variants
+		groups = self.families if by == "family" else by
+		if isinstance(by,dict): #counted once, as the groups may change
+			counter = AlleleCounts(table,groups)
+		else:
+			name = "family" if by == "family" else "cohort"
+			if name not in table.counters:
+				table.counters[name] = AlleleCounts(table,groups)
+			counter = table.counters[name]
+		if by == None:
+			sizes = {"all":len(self.people)}
+		else:
+			sizes = pd.Series([groups.get(name) for name in self.people]).value_counts().to_dict()
+		frequencies = counter.to_frame(sizes,chroms)
+		if by == None:
+			return frequencies.drop(columns="group")
+		return frequencies.rename(columns={"group":"family" if by == "family" else "group"})
+
+	def nearest_variants(self,chrom,pos):
+		'''nearest_variants() Returns the list of Variants at the variant position on chrom closest to pos.'''
+		return [self.variants[row] for row in self.variants.regions.nearest(chrom,pos).tolist()]
+
+	def query_regions(self,regions,header=False):
+		'''query_regions() Takes a BED-like set of regions and returns every variant inside them.
+		regions may be a list of (chrom, start, end) tuples, a DataFrame with chrom, start and end
+		columns, or the path of a tab-separated BED file (first three columns are used).
+		Coordinates are BED-style: 0-based, start inclusive and end exclusive.
+		Returns a DataFrame with columns region (the region's row number), chrom, pos, ref, alt, person.
+		'''
+		if isinstance(regions,str):
+			regions = pd.read_table(regions,names=["chrom","start","end"],usecols=range(0,3),
+									header=0 if header else None,comment="#")
+		elif not isinstance(regions,pd.DataFrame):
+			regions = pd.DataFrame(list(regions),columns=["chrom","start","end"])
+		region_ids,rows = self.variants.regions.regions(regions["chrom"],regions["start"],regions["end"])
+		found = self.variants.to_frame(rows)
+		found.insert(0,"region",region_ids)
+		return found
+
+def _report_rows(mask,records,column,error,message):
+	"""Validation report rows for the True entries of mask; message(i) describes row i"""
+	rows = np.flatnonzero(mask)
+	return pd.DataFrame({"record":np.asarray(records)[rows],"column":column,"error":error,
+						 "message":[message(i) for i in rows.tolist()]})
+
+def _report(found):
+	"""Concatenate report rows from _report_rows() into one report ordered by record"""
+	found = [rows for rows in found if len(rows) > 0]
+	if not found:
+		return pd.DataFrame({"record":np.zeros(0,dtype=np.int64),"column":[],"error":[],"message":[]})
+	return pd.concat(found,ignore_index=True).sort_values("record",kind="stable").reset_index(drop=True)
+
+def _record_number(offset,row):
+	"""The record number to report for `row` of a chunk; see Pedigree._check_variant_columns()"""
+	if isinstance(offset,np.ndarray):
+		return int(offset[row])
+	return offset+row+1
+
+def _parse_variant_file(path,header,chroms,names):
+	"""Read and validate one variants file for Pedigree.load_variants_many(), in a worker process.
+	Only the people's names are needed for validation, so the worker checks against a Pedigree
+	whose `people` maps each name to None.
+	Returns:
+		:obj:`dict`: the file's columns, converted by VariantTable.encode()
+	"""
+	checker = Pedigree(people=dict.fromkeys(names))
+	chunks = list()
+	for offset,variantfile in checker._read_variant_chunks(path,header,None,None):
+		checker._check_variant_chunk(variantfile,path,offset)
+		chunks.append(VariantTable.encode(variantfile,chroms,names))
+	return {column:np.concatenate([c[column] for c in chunks]) for column in VariantTable._columns}
+
+def _gene_drop(mother,father,order,generation,replicates,seed,frequency):
+	"""Drop alleles down a pedigree for one batch of Pedigree.gene_drop(), possibly in a worker process.
+	Every person starts with two founder alleles; the allele from each known parent is then replaced,
+	one generation at a time, by a random pick of that parent's two alleles in every replicate.
+	Returns:
+		:obj:`numpy.ndarray`: 2 (maternal, paternal) x people x replicates founder allele labels,
+			or 0/1 alt alleles if a frequency is given
+	"""
+	rng = np.random.default_rng(seed)
+	n = len(mother)
+	if frequency == None:
+		alleles = np.repeat(np.arange(2*n,dtype=np.int32).reshape(n,2).T[:,:,None],replicates,axis=2)
+	else:
+		alleles = np.zeros((2,n,replicates),dtype=np.int8)
+		for slot,parents in enumerate((mother,father)):
+			founders = np.flatnonzero(parents < 0)
+			alleles[slot,founders] = rng.random((len(founders),replicates)) < frequency
+	generations = np.split(order,np.flatnonzero(np.diff(generation[order]))+1)
+	for ids in generations[1:]: #generation 0 has no known parents
+		for slot,parents in enumerate((mother,father)):
+			known = ids[parents[ids] >= 0]
+			maternal,paternal = alleles[:,parents[known]] #each parent's two alleles, known x replicates
+			bits = rng.integers(0,256,(len(known),(replicates+7)//8),dtype=np.uint8)
+			picked = np.unpackbits(bits,axis=1,count=replicates) #1 where the parent passes on its paternal allele
+			paternal ^= maternal
+			paternal *= picked
+			paternal ^= maternal #maternal where picked is 0, paternal where it is 1
+			alleles[slot,known] = paternal
+	return alleles
+
+def _is_gzip(path):
+	"""True if the file starts with the gzip magic number, as bgzip files do"""
+	with open(path,"rb") as f:
+		return f.read(2) == b"\x1f\x8b"
+
+def _open_text(path):
+	"""Open a plain or gzip/bgzip-compressed text file for reading"""
+	if _is_gzip(path):
+		return gzip.open(path,"rt")
+	return open(path)
+
+def _vcf_header(path):
+	"""Read a VCF header
+	Returns:
+		:obj:`tuple`: (number of header lines, list of sample names)
+	"""
+	with _open_text(path) as vcf:
+		for number,line in enumerate(vcf,1):
+			if line.startswith("#CHROM"):
+				return number,line.rstrip("\r\n").split("\t")[9:]
+			if not line.startswith("##"):
+				raise AssertionError("VCF %s has no #CHROM header line" % path)
+	raise AssertionError("VCF %s has no #CHROM header line" % path)
+
+def _merge_regions(regions):
+	"""Sort BED-style (chrom, start, end) regions and merge the ones that overlap
+	Returns:
+		:obj:`dict`: chrom -> list of (start, end)
+	"""
+	merged = dict()
+	for chrom,start,end in sorted(regions,key=lambda r:(r[0],r[1])):
+		spans = merged.setdefault(chrom,[])
+		if spans and start <= spans[-1][1]:
+			spans[-1] = (spans[-1][0],max(spans[-1][1],end))
+		else:
+			spans.append((start,end))
+	return merged
+
+def _vcf_scanned_records(path,header_lines,regions=None):
+	"""Yield (line number, line) for the data lines of a VCF, keeping only those in
+	regions (from _merge_regions()) if given
+	"""
+	with _open_text(path) as vcf:
+		for number,line in enumerate(vcf,1):
+			if number <= header_lines or line.strip() == "":
+				continue
+			if regions != None:
+				chrom,pos = line.split("\t",2)[:2]
+				spans = regions.get(chrom) or regions.get("chr"+chrom,[])
+				i = bisect.bisect_right(spans,(int(pos)-1,float("inf")))-1
+				if i < 0 or int(pos)-1 >= spans[i][1]:
+					continue
+			yield number,line
+
+def _reg2bins(start,end,min_shift,depth):
+	"""The bins of a tabix/CSI binning index that may hold records in [start, end)"""
+	bins = list()
+	end -= 1
+	shift,offset = min_shift+depth*3,0
+	for level in range(depth+1):
+		bins.extend(range(offset+(start>>shift),offset+(end>>shift)+1))
+		shift -= 3
+		offset += 1<<(level*3)
+	return bins
+
+def _read_index(path):
+	"""Read a tabix (.tbi) or CSI (.csi) index
+	Returns:
+		:obj:`tuple`: (min_shift, depth, dict of sequence name -> dict of bin -> list of chunk start offsets)
+	"""
+	with gzip.open(path,"rb") as f:
+		data = f.read()
+	magic = data[:4]
+	if magic == b"TBI\x01":
+		min_shift,depth = 14,5
+		n_ref,l_nm = struct.unpack_from("<i",data,4)[0],struct.unpack_from("<i",data,32)[0]
+		names,at = data[36:36+l_nm],36+l_nm
+	elif magic == b"CSI\x01":
+		min_shift,depth,l_aux = struct.unpack_from("<iii",data,4)
+		aux = data[16:16+l_aux]
+		names = aux[28:] if l_aux >= 28 else b""
+		n_ref,at = struct.unpack_from("<i",data,16+l_aux)[0],20+l_aux
+	else:
+		raise AssertionError("%s is not a tabix or CSI index" % path)
+	names = [n.decode() for n in names.split(b"\x00")[:n_ref]]
+	index = dict()
+	for name in names:
+		bins = dict()
+		n_bin,at = struct.unpack_from("<i",data,at)[0],at+4
+		for _ in range(n_bin):
+			if magic == b"TBI\x01":
+				bin_id,n_chunk = struct.unpack_from("<Ii",data,at)
+				at += 8
+			else:
+				bin_id,_loffset,n_chunk = struct.unpack_from("<IQi",data,at)
+				at += 16
+			bins[bin_id] = [struct.unpack_from("<Q",data,at+16*i)[0] for i in range(n_chunk)]
+			at += 16*n_chunk
+		if magic == b"TBI\x01":
+			n_intv = struct.unpack_from("<i",data,at)[0]
+			at += 4+8*n_intv #linear index, not needed when scanning forward from the bins
+		index[name] = bins
+	return min_shift,depth,index
+
+def _bgzf_lines(path,virtual_offset):
+	"""Yield the lines of a bgzipped file starting at a BGZF virtual offset"""
+	raw = open(path,"rb")
+	raw.seek(virtual_offset>>16) #start of the compressed block
+	with gzip.GzipFile(fileobj=raw) as blocks, raw:
+		blocks.read(virtual_offset&0xFFFF) #skip into the block
+		for line in blocks:
+			yield line.decode()
+
+def _vcf_indexed_records(path,index,regions):
+	"""Yield (record number, line) for the VCF records in regions (from _merge_regions()),
+	seeking with a tabix or CSI index
+	"""
+	min_shift,depth,bins = _read_index(index)
+	number = 0
+	for chrom,spans in regions.items():
+		name = chrom if chrom in bins else chrom[3:] if chrom.startswith("chr") and chrom[3:] in bins else None
+		if name == None:
+			continue
+		for start,end in spans:
+			offsets = [o for b in _reg2bins(start,end,min_shift,depth) for o in bins[name].get(b,[])]
+			if len(offsets) == 0:
+				continue
+			for line in _bgzf_lines(path,min(offsets)):
+				if line.startswith("#"):
+					continue
+				record_chrom,pos = line.split("\t",2)[:2]
+				if record_chrom != name or int(pos)-1 >= end:
+					break
+				if int(pos)-1 >= start:
+					number += 1
+					yield number,line
+
+class PedigreeGraph(object):
+	''' PedigreeGraph() The parent -> child graph of a pedigree, with people as integer ids
+	Attributes:
+		names (:obj:`list` of :obj:`str`): person names, indexed by id
+		ids (:obj:`dict`): name -> id
+		mother (:obj:`numpy.ndarray` of int32): mother id of each person, -1 if unknown
+		father (:obj:`numpy.ndarray` of int32): father id of each person, -1 if unknown
+		child_starts (:obj:`numpy.ndarray` of int64): CSR offsets, the children of person i are
+			child_ids[child_starts[i]:child_starts[i+1]]
+		child_ids (:obj:`numpy.ndarray` of int32): children ids, grouped by parent
+		order (:obj:`numpy.ndarray` of int32): a topological order, parents before children;
+			None if the graph has a cycle
+		generation (:obj:`numpy.ndarray` of int32): length of the longest line of ancestors above
+			each person, 0 for founders; None if the graph has a cycle
+		rank (:obj:`numpy.ndarray` of int32): position of each person in order; None if the graph
+			has a cycle
+		founder (:obj:`numpy.ndarray` of bool): True for people with no known parents
+	The mother and father arrays are the pedigree's parentage; the Person objects of a Pedigree
+	change them through set_parent() when their mother or father is set or removed. The
+	children arrays, order, generation and rank are derived from them and rebuilt on first use
+	after such a change.
+	'''
+
+	def __init__(self,names,mother,father):
+		self.names = list(names)
+		self.ids = {name:i for i,name in enumerate(self.names)}
+		self.mother = np.asarray(mother,dtype=np.int32)
+		self.father = np.asarray(father,dtype=np.int32)
+		self.founder = (self.mother < 0)&(self.father < 0)
+		self._derive()
+		self._relationships = None #RelationshipIndex, built on first use
+
+	def _derive(self):
+		'''build the children arrays, order, generation and rank from the parent arrays'''
+		self._stale = False
+		n = len(self.names)
+		parents = np.concatenate([self.mother,self.father])
+		children = np.tile(np.arange(n,dtype=np.int32),2)
+		known = parents >= 0
+		parents,children = parents[known],children[known]
+		self._child_starts = np.concatenate([[0],np.cumsum(np.bincount(parents,minlength=n))]).astype(np.int64)
+		self._child_ids = children[np.argsort(parents,kind="stable")]
+		self._order,self._generation = self._topological_order()
+		self._rank = None
+		if self._order is not None:
+			self._rank = np.empty(n,dtype=np.int32)
+			self._rank[self._order] = np.arange(n,dtype=np.int32)
+		return None
+
+	def _derived(name):
+		'''a read-only attribute that is rebuilt first if the parents have changed since'''
+		def get(self):
+			if self._stale:
+				self._derive()
+			return getattr(self,"_"+name)
+		return property(get)
+
+	child_starts = _derived("child_starts")
+	child_ids = _derived("child_ids")
+	order = _derived("order")
+	generation = _derived("generation")
+	rank = _derived("rank")
+	del _derived
+
+	def set_parent(self,child,attribute,parent):
+		'''set the "mother" or "father" (attribute) of id child to id parent, -1 for none; the caller
+		checks that this leaves no cycle'''
+		getattr(self,attribute)[child] = parent
+		self.founder[child] = self.mother[child] < 0 and self.father[child] < 0
+		self._stale = True
+		self._relationships = None
+		return None
+
+	def __len__(self):
+		return len(self.names)
+
+	def children_of(self,ids):
+		'''the children of every id in ids, concatenated (a child of two listed parents appears twice)'''
+		ids = np.asarray(ids,dtype=np.int64)
+		starts = self.child_starts[ids]
+		counts = self.child_starts[ids+1]-starts
+		offsets = np.arange(counts.sum())-np.repeat(np.cumsum(counts)-counts,counts)
+		return self.child_ids[np.repeat(starts,counts)+offsets]
+
+	def _topological_order(self):
+		'''Kahn's algorithm, one generation of the pedigree at a time
+		A person joins the frontier once both parents have, so frontier k is generation k.
+		Returns:
+			:obj:`tuple`: (ids with parents before children, generation of each id), or
+				(None, None) if there is a cycle
+		'''
+		waiting = (self.mother >= 0).astype(np.int32)+(self.father >= 0)
+		generation = np.zeros(len(self.names),dtype=np.int32)
+		frontier = np.flatnonzero(waiting == 0).astype(np.int32)
+		order = [frontier]
+		while len(frontier) > 0:
+			children = self.children_of(frontier)
+			np.subtract.at(waiting,children,1)
+			frontier = np.unique(children[waiting[children] == 0]).astype(np.int32)
+			generation[frontier] = len(order)
+			order.append(frontier)
+		order = np.concatenate(order)
+		if len(order) != len(self.names):
+			return None,None
+		return order,generation
+
+	def ancestors_of(self,ids):
+		'''ids together with all of their ancestors, in topological order'''
+		keep = np.zeros(len(self),dtype=bool)
+		frontier = np.unique(np.asarray(ids,dtype=np.int64))
+		while len(frontier) > 0:
+			keep[frontier] = True
+			parents = np.concatenate([self.mother[frontier],self.father[frontier]])
+			parents = parents[parents >= 0]
+			frontier = np.unique(parents[~keep[parents]])
+		return self.order[keep[self.order]]
+
+	def kinship(self,ids=None):
+		'''Kinship coefficients, filled one generation at a time in topological order.
+		A person's kinship with anyone earlier in the order is the mean of their parents' kinships
+		with that person, and with themselves it is (1 + the kinship of their parents) / 2. People
+		of one generation are never each other's ancestors, so each generation is one block.
+		Args:
+			ids (optional): only these people and their ancestors are included; default everyone
+		Returns:
+			:obj:`tuple`: (ids in topological order, :obj:`numpy.ndarray` kinship matrix over those ids)
+		'''
+		if self.order is None:
+			raise AssertionError("kinship needs a directed acyclic pedigree")
+		ids = self.order if ids is None else self.ancestors_of(ids)
+		n = len(ids)
+		position = np.full(len(self),n,dtype=np.int64) #unknown parents map to an all-zero row n
+		position[ids] = np.arange(n)
+		mother = np.where(self.mother[ids] >= 0,position[self.mother[ids]],n)
+		father = np.where(self.father[ids] >= 0,position[self.father[ids]],n)
+		bounds = np.flatnonzero(np.diff(self.generation[ids]))+1
+		kinship = np.zeros((n+1,n+1))
+		for start,end in zip(np.concatenate([[0],bounds]).tolist(),np.concatenate([bounds,[n]]).tolist()):
+			m,f = mother[start:end],father[start:end]
+			kinship[start:end,:start] = 0.5*(kinship[m,:start]+kinship[f,:start])
+			kinship[:start,start:end] = kinship[start:end,:start].T
+			kinship[start:end,start:end] = 0.5*(kinship[m,start:end]+kinship[f,start:end])
+			diagonal = np.arange(start,end)
+			kinship[diagonal,diagonal] = 0.5*(1+kinship[m,f])
+		return ids,kinship[:n,:n]
+
+	def cycle_members(self):
+		'''ids on (or between) cycles of parents: those left once founders are peeled off from the top
+		and childless people from the bottom'''
+		waiting = (self.mother >= 0).astype(np.int32)+(self.father >= 0)
+		ordered = np.zeros(len(self),dtype=bool)
+		frontier = np.flatnonzero(waiting == 0)
+		while len(frontier) > 0:
+			ordered[frontier] = True
+			children = self.children_of(frontier)
+			np.subtract.at(waiting,children,1)
+			frontier = np.unique(children[(waiting[children] == 0)&~ordered[children]])
+		remaining = np.diff(self.child_starts)
+		peeled = np.zeros(len(self),dtype=bool)
+		frontier = np.flatnonzero(remaining == 0)
+		while len(frontier) > 0:
+			peeled[frontier] = True
+			parents = np.concatenate([self.mother[frontier],self.father[frontier]])
+			parents = parents[parents >= 0]
+			np.subtract.at(remaining,parents,1)
+			frontier = np.unique(parents[(remaining[parents] == 0)&~peeled[parents]])
+		return np.flatnonzero(~ordered&~peeled)
+
+	def extend(self,names,mother,father):
+		'''Append people whose parents (ids) are existing or appended people. Existing people gain no
+		parents, so a cycle can only pass through the new people: only they are sorted, and their
+		order is appended to the existing one. Their edges are inserted into the children arrays.
+		Returns:
+			:obj:`numpy.ndarray`: the new ids in topological order, or None, leaving the graph
+				unchanged, if the new people form a cycle
+		'''
+		if self._stale:
+			self._derive() #before the parent arrays grow
+		n,k = len(self),len(names)
+		mother,father = np.asarray(mother,dtype=np.int32),np.asarray(father,dtype=np.int32)
+		local = lambda parents: np.where(parents >= n,parents-n,-1) #existing parents are already ordered
+		added = PedigreeGraph(names,local(mother),local(father))
+		if added.order is None:
+			return None
+		if n == 0:
+			self.__dict__.update(added.__dict__)
+			return self.order
+		order = (added.order+n).astype(np.int32)
+		self.mother,self.father = np.concatenate([self.mother,mother]),np.concatenate([self.father,father])
+		generation = np.concatenate([self.generation,np.zeros(k,dtype=np.int32)])
+		for block in np.split(order,np.flatnonzero(np.diff(added.generation[added.order]))+1):
+			parents = np.stack([self.mother[block],self.father[block]])
+			generation[block] = np.where(parents >= 0,generation[parents]+1,0).max(axis=0)
+
+		parents = np.concatenate([mother,father])
+		children = np.tile(np.arange(n,n+k,dtype=np.int32),2)
+		known = parents >= 0
+		parents,children = parents[known],children[known]
+		sort = np.argsort(parents,kind="stable")
+		parents,children = parents[sort],children[sort]
+		self._child_ids = np.insert(self.child_ids,self.child_starts[np.minimum(parents+1,n)],children)
+		counts = np.concatenate([np.diff(self.child_starts),np.zeros(k,dtype=np.int64)])+np.bincount(parents,minlength=n+k)
+		self._child_starts = np.concatenate([[0],np.cumsum(counts)]).astype(np.int64)
+
+		self.names.extend(names)
+		self.ids.update((name,n+i) for i,name in enumerate(names))
+		self.founder = np.concatenate([self.founder,added.founder])
+		self._generation = generation
+		self._order = np.concatenate([self.order,order])
+		self._rank = np.concatenate([self.rank,n+added.rank])
+		self._relationships = None
+		return order
+
+	def edges(self):
+		'''(parent name, child name) pairs, mothers first'''
+		return [(self.names[p],self.names[c]) for parents in [self.mother,self.father]
+				for c,p in enumerate(parents.tolist()) if p >= 0]
+
+	def relationships(self):
+		'''the RelationshipIndex of this graph, built the first time it is asked for'''
+		if self._relationships is None:
+			if self.order is None:
+				raise AssertionError("relationships need a directed acyclic pedigree")
+			self._relationships = RelationshipIndex(self)
+		return self._relationships
+
+def _plink_chroms(codes):
+	'''hg38 chromosome names of a Series of PLINK chromosome codes: 1-22, and 23/24/25 as X/Y/X'''
+	chroms = codes.replace({"23":"X","24":"Y","25":"X"})
+	return chroms.where(chroms.str.startswith("chr"),"chr"+chroms).to_numpy(dtype=object)
+
+def _ranges(starts,counts):
+	'''flat indices of the ranges [start, start+count), concatenated'''
+	offsets = np.arange(counts.sum())-np.repeat(np.cumsum(counts)-counts,counts)
+	return np.repeat(starts,counts)+offsets
+
+class RelationshipIndex(object):
+	''' RelationshipIndex(graph) Every person's ancestors with their meiotic distance, for relationship queries
+	Attributes:
+		graph (:obj:`PedigreeGraph`): the indexed graph
+		starts (:obj:`numpy.ndarray` of int64): the ancestry of person i is entries
+			starts[i]:starts[i]+counts[i], which include i itself at distance 0
+		counts (:obj:`numpy.ndarray` of int64): ancestry size of each person
+		ancestors (:obj:`numpy.ndarray` of int32): ancestor ids, sorted within each person
+		depths (:obj:`numpy.ndarray` of int32): shortest number of meioses to each ancestor
+	'''
+
+	def __init__(self,graph):
+		self.graph = graph
+		n = len(graph)
+		self.starts = np.zeros(n,dtype=np.int64)
+		self.counts = np.zeros(n,dtype=np.int64)
+		self.ancestors = np.zeros(max(n,1),dtype=np.int32)
+		self.depths = np.zeros(max(n,1),dtype=np.int32)
+		size = 0
+		bounds = np.flatnonzero(np.diff(graph.generation[graph.order]))+1
+		for block in np.split(graph.order,bounds):
+			#each person's ancestry is themselves plus their parents' ancestries one meiosis further
+			ids = [block.astype(np.int64)]
+			ancestors,depths = [block],[np.zeros(len(block),dtype=np.int32)]
+			for parents in (graph.mother[block],graph.father[block]):
+				known = parents >= 0
+				counts = self.counts[parents[known]]
+				entries = _ranges(self.starts[parents[known]],counts)
+				ids.append(np.repeat(block[known],counts).astype(np.int64))
+				ancestors.append(self.ancestors[entries])
+				depths.append(self.depths[entries]+1)
+			ids,ancestors,depths = np.concatenate(ids),np.concatenate(ancestors),np.concatenate(depths)
+			sort = np.lexsort((depths,ancestors,ids))
+			ids,ancestors,depths = ids[sort],ancestors[sort],depths[sort]
+			first = np.ones(len(ids),dtype=bool) #keep the shortest path to each ancestor
+			first[1:] = (ids[1:] != ids[:-1])|(ancestors[1:] != ancestors[:-1])
+			ids,ancestors,depths = ids[first],ancestors[first],depths[first]
+			self._reserve(size+len(ids))
+			self.ancestors[size:size+len(ids)] = ancestors
+			self.depths[size:size+len(ids)] = depths
+			people,begin,counts = np.unique(ids,return_index=True,return_counts=True)
+			self.starts[people] = size+begin
+			self.counts[people] = counts
+			size += len(ids)
+
+	def _reserve(self,size):
+		'''grow the ancestor arrays so that size entries fit'''
+		capacity = len(self.ancestors)
+		if size <= capacity:
+			return None
+		while capacity < size:
+			capacity *= 2
+		for name in ["ancestors","depths"]:
+			grown = np.zeros(capacity,dtype=np.int32)
+			grown[:len(getattr(self,name))] = getattr(self,name)
+			setattr(self,name,grown)
+		return None
+
+	def common_ancestors(self,a,b):
+		'''(ancestor ids, meioses from a, meioses from b) for the shared ancestors of ids a and b;
+		a person counts as their own ancestor at distance 0'''
+		sa,sb = slice(self.starts[a],self.starts[a]+self.counts[a]),slice(self.starts[b],self.starts[b]+self.counts[b])
+		shared,ia,ib = np.intersect1d(self.ancestors[sa],self.ancestors[sb],assume_unique=True,return_indices=True)
+		return shared,self.depths[sa][ia],self.depths[sb][ib]
+
+	def meiotic_distance(self,a,b):
+		'''the fewest meioses separating ids a and b through a shared ancestor, None if unrelated'''
+		shared,da,db = self.common_ancestors(a,b)
+		return int((da+db).min()) if len(shared) > 0 else None
+
+	def relationship(self,a,b):
+		'''(name of what b is to a, meiotic distance), e.g. ("half-sibling", 2) or ("unrelated", None).
+		The closest shared ancestors decide the name; two of them at the same distances (a couple)
+		make a full relationship, one makes it half.
+		'''
+		shared,da,db = self.common_ancestors(a,b)
+		if len(shared) == 0:
+			return "unrelated",None
+		total = da+db
+		closest = np.lexsort((np.abs(da-db),total))[0]
+		up,down = int(da[closest]),int(db[closest])
+		full = np.count_nonzero((da == up)&(db == down)) > 1
+		return _relationship_name(up,down,full),int(total[closest])
+
+def _relationship_name(up,down,full):
+	'''the name of someone down meioses below an ancestor that is up meioses above the reference person'''
+	grand = lambda k: "" if k <= 0 else "grand" if k == 1 else "great-"*(k-1)+"grand"
+	half = "" if full else "half-"
+	if up == 0 and down == 0:
+		return "self"
+	if up == 0:
+		return grand(down-1)+"child"
+	if down == 0:
+		return grand(up-1)+"parent"
+	if up == 1 and down == 1:
+		return half+"sibling"
+	if up == 1:
+		return half+grand(down-2)+"niece/nephew"
+	if down == 1:
+		return half+grand(up-2)+"aunt/uncle"
+	degree,removed = min(up,down)-1,abs(up-down)
+	name = {1:"first",2:"second",3:"third"}.get(degree,"%dth" % degree)+" cousin"
+	if removed > 0:
+		name += " "+{1:"once",2:"twice"}.get(removed,"%d times" % removed)+" removed"
+	return half+name
+
+_SNAPSHOT_MAGIC = b"PEDSNAP\x01"
+
+def _write_snapshot(path,header,arrays):
+	"""Write a Pedigree snapshot: magic, header length, JSON header, then each array
+	starting on a 64-byte boundary. The header records each array's dtype, offset and length.
+	"""
+	align = lambda n: (n+63)//64*64
+	layout,offset = dict(),0
+	arrays = {name:np.ascontiguousarray(a) for name,a in arrays.items()}
+	for name,a in arrays.items():
+		layout[name] = {"dtype":a.dtype.str,"offset":offset,"length":len(a)}
+		offset = align(offset+a.nbytes)
+	header = dict(header,arrays=layout)
+	head = json.dumps(header).encode("utf-8")
+	start = align(len(_SNAPSHOT_MAGIC)+8+len(head))
+	with open(path,"wb") as f:
+		f.write(_SNAPSHOT_MAGIC+struct.pack("<Q",len(head))+head)
+		f.write(b"\x00"*(start-f.tell()))
+		for name,a in arrays.items():
+			f.write(a.tobytes())
+			f.write(b"\x00"*(start+align(layout[name]["offset"]+a.nbytes)-f.tell()))
+	return None
+
+def _read_snapshot(path):
+	"""Memory-map a Pedigree snapshot written by _write_snapshot()
+	Returns:
+		:obj:`tuple`: (header dict, dict of array name -> copy-on-write :obj:`numpy.ndarray` view)
+	"""
+	with open(path,"rb") as f:
+		if f.read(len(_SNAPSHOT_MAGIC)) != _SNAPSHOT_MAGIC:
+			raise AssertionError("%s is not a Pedigree snapshot" % path)
+		length = struct.unpack("<Q",f.read(8))[0]
+		header = json.loads(f.read(length).decode("utf-8"))
+	start = (len(_SNAPSHOT_MAGIC)+8+length+63)//64*64
+	data = np.memmap(path,dtype=np.uint8,mode="c")
+	arrays = dict()
+	for name,spec in header["arrays"].items():
+		dtype = np.dtype(spec["dtype"])
+		offset = start+spec["offset"]
+		arrays[name] = data[offset:offset+dtype.itemsize*spec["length"]].view(dtype)
+	return header,arrays
+
+class VariantTable(object):
+	''' VariantTable() Array-backed store for variants, one row per (chrom, pos, ref, alt, person)
+	Iterating gives Variant views of the rows, so code that reads .chrom/.pos/.ref/.alt/.person
+	works the same as with a set of Variant objects.
+	Attributes:
+		chroms (:obj:`list` of :obj:`str`): chromosome names, indexed by chrom code
+		people (:obj:`list` of :obj:`Person`): people, indexed by person code
+		chrom (:obj:`numpy.ndarray` of uint8): chromosome codes
+		pos (:obj:`numpy.ndarray` of uint32): 0-based positions
+		ref (:obj:`numpy.ndarray` of uint8): reference allele codes, NA if unknown
+		alt (:obj:`numpy.ndarray` of uint8): alternate allele codes
+		person (:obj:`numpy.ndarray` of int32): person codes, -1 if unassigned
+		live (:obj:`numpy.ndarray` of bool): False for removed rows
+	Only the first `n_rows` entries of each array are in use.
+	'''
+
+	_columns = ["chrom","pos","ref","alt","person"]
+	_bases = ["A","C","G","T"]
+	NA = 255 #allele code for a missing ref
+
+	def __init__(self,chroms=None,capacity=1024):
+		self.chroms = list(chroms) if chroms != None else sorted(Variant._chrom_sizes.keys())
+		self._chrom_codes = {c:i for i,c in enumerate(self.chroms)}
+		self._base_codes = {b:i for i,b in enumerate(self._bases)}
+		self.people = list()
+		self._person_codes = dict()
+		self.n_rows = 0
+		self.chrom = np.zeros(capacity,dtype=np.uint8)
+		self.pos = np.zeros(capacity,dtype=np.uint32)
+		self.ref = np.zeros(capacity,dtype=np.uint8)
+		self.alt = np.zeros(capacity,dtype=np.uint8)
+		self.person = np.zeros(capacity,dtype=np.int32)
+		self.live = np.zeros(capacity,dtype=bool)
+		self.index = KeyIndex(self) #sorted (person, chrom, pos) keys, for duplicate checks and find()
+		self.regions = RegionIndex(self) #chrom -> sorted positions, for region queries
+		self.sites = SiteIndex(self) #distinct sites and their carriers, changes merged in on the next query
+		self.counters = dict() #name -> AlleleCounts, updated as rows are added and removed
+		self._counts = None #number of live rows of each person code, kept up to date; None until needed
+
+	def __len__(self):
+		return int(np.count_nonzero(self.live[:self.n_rows]))
+
+	def __iter__(self):
+		for row in self.rows():
+			yield Variant._view(self,int(row))
+
+	def __getitem__(self,row):
+		assert 0 <= row < self.n_rows and self.live[row], "no variant in row %d" % row
+		return Variant._view(self,row)
+
+	def __contains__(self,variant):
+		return isinstance(variant,Variant) and variant._table is self and bool(self.live[variant._row])
+
+	def __repr__(self):
+		return "<VariantTable at %s, %d variants, %d people>" % (str(id(self)),len(self),len(self.people))
+
+	def _reserve(self,n):
+		'''grow the column arrays so that n more rows fit'''
+		needed = self.n_rows + n
+		capacity = max(len(self.pos),1)
+		if needed <= len(self.pos):
+			return None
+		while capacity < needed:
+			capacity *= 2
+		for column in self._columns+["live"]:
+			grown = np.zeros(capacity,dtype=getattr(self,column).dtype)
+			grown[:self.n_rows] = getattr(self,column)[:self.n_rows]
+			setattr(self,column,grown)
+		return None
+
+	def _person_counts(self):
+		'''the number of live rows of each person code, built from the columns if it was not kept'''
+		if self._counts is None:
+			self._counts = np.bincount(self.person[self.rows()].astype(np.int64)+1,minlength=len(self.people)+1)[1:]
+		elif len(self._counts) < len(self.people): #people registered since, grown by doubling
+			grown = np.zeros(max(len(self.people),2*len(self._counts)),dtype=np.int64)
+			grown[:len(self._counts)] = self._counts
+			self._counts = grown
+		return self._counts
+
+	def _count(self,codes,sign=1):
+		'''add sign to the count of each row's person code; unassigned rows are not counted'''
+		if self._counts is None: #nothing kept yet, counted from the columns when first needed
+			return None
+		codes = np.asarray(codes)
+		np.add.at(self._person_counts(),codes[codes >= 0],sign)
+		return None
+
+	def count(self,person):
+		'''the number of live variants of a Person, without building the per-person rows'''
+		code = self.person_code(person)
+		if code < 0:
+			return int(np.count_nonzero(self.person[self.rows()] < 0))
+		return int(self._person_counts()[code])
+
+	def person_code(self,person):
+		'''return the integer code of a Person, registering it if needed; None maps to -1'''
+		if person is None:
+			return -1
+		if person not in self._person_codes:
+			self._person_codes[person] = len(self.people)
+			self.people.append(person)
+		return self._person_codes[person]
+
+	def attach(self,person):
+		'''register a Person and make its `variants` attribute a view of its rows in this table'''
+		code = self.person_code(person)
+		for variant in list(person.variants):
+			self.add(variant,person=person)
+		person.variants = PersonVariants(self,code)
+		return None
+
+	def value(self,column,row):
+		'''decode a single cell back to the value Variant() was created with'''
+		code = getattr(self,column)[row]
+		if column == "chrom":
+			return self.chroms[code]
+		if column == "pos":
+			return int(code)
+		if column == "person":
+			return self.people[code] if code >= 0 else None
+		return self._bases[code] if code != self.NA else None
+
+	def rows(self,person=None):
+		'''row numbers of the live variants, optionally only those of one Person'''
+		if person is not None:
+			return self.sites.rows_of(self.person_code(person))
+		return np.flatnonzero(self.live[:self.n_rows])
+
+	def add(self,variant,person=None):
+		'''store a Variant in a new row and turn it into a view of that row'''
+		assert isinstance(variant,Variant), "input variant must be type Variant, not %s" % type(variant)
+		if variant in self:
+			return variant._row
+		if variant._table is not None: #a view of another table, copy its values out first
+			variant._values = [variant.chrom,variant.pos,variant.ref,variant.alt,variant.person]
+		chrom,pos,ref,alt,owner = variant._values
+		self._reserve(1)
+		row = self.n_rows
+		self.chrom[row] = self._chrom_codes[chrom]
+		self.pos[row] = pos
+		self.ref[row] = self._base_codes[ref] if ref != None else self.NA
+		self.alt[row] = self._base_codes[alt]
+		self.person[row] = self.person_code(person if person != None else owner)
+		key = int(self.keys([row])[0])
+		if key in self.index:
+			raise AssertionError("variant already exists at %s:%d"%(chrom,pos))
+		self.live[row] = True
+		self.index.add(key,row)
+		self.n_rows += 1
+		self._count([self.person[row]])
+		self.regions.add_rows([row])
+		self.sites.add_rows([row])
+		for counter in self.counters.values():
+			counter.add_rows([row])
+		variant._bind(self,row)
+		return row
+
+	def set_person(self,row,person):
+		'''give the variant in row to another Person (or None), keeping the (person, chrom, pos) index in step'''
+		code = self.person_code(person)
+		old,new = int(self.keys([row])[0]),int(self._keys(code,self.chrom[row],self.pos[row]))
+		if old == new:
+			return None
+		if new in self.index:
+			raise AssertionError("variant already exists at %s:%d"%(self.value("chrom",row),self.value("pos",row)))
+		for counter in self.counters.values():
+			counter.add_rows([row],-1)
+		self._count([self.person[row]],-1)
+		self.sites.move_row(row,int(self.person[row]))
+		self.person[row] = code
+		self._count([code])
+		self.index.add(new,row) #the entry under the old key no longer matches the row and is skipped
+		for counter in self.counters.values():
+			counter.add_rows([row])
+		return None
+
+	def remove(self,variant):
+		'''drop a Variant's row; the Variant keeps its values and stops reading from the table'''
+		assert variant in self, "variant %s is not stored in this table" % str(variant)
+		variant._values = [variant.chrom,variant.pos,variant.ref,variant.alt,variant.person]
+		for counter in self.counters.values():
+			counter.add_rows([variant._row],-1)
+		self.live[variant._row] = False
+		self._count([self.person[variant._row]],-1)
+		self.sites.remove_rows([variant._row])
+		variant._table = None
+		variant._row = None
+		return None
+
+	def truncate(self,n_rows,n_people=None):
+		'''drop every row from n_rows on, e.g. to undo a load that failed part way, and with n_people
+		forget the people registered from that code on (they must have no rows left)'''
+		dropped = np.arange(n_rows,self.n_rows)
+		for counter in self.counters.values():
+			counter.add_rows(dropped[self.live[dropped]],-1)
+		self._count(self.person[dropped[self.live[dropped]]],-1)
+		self.live[n_rows:self.n_rows] = False
+		self.n_rows = n_rows
+		self.regions.truncate(n_rows)
+		self.sites.truncate(n_rows)
+		if n_people != None:
+			for person in self.people[n_people:]:
+				del self._person_codes[person]
+			del self.people[n_people:] #their counts are 0 now and are reused with the codes
+			for counter in self.counters.values():
+				counter.forget_people(n_people)
+		return None
+
+	def discard(self,variant):
+		'''remove a Variant if it is stored in this table'''
+		if variant in self:
+			self.remove(variant)
+		return None
+
+	@staticmethod
+	def _keys(person,chrom,pos):
+		'''a unique int64 key per (person, chrom, pos), used for duplicate checks'''
+		return ((np.asarray(person).astype(np.int64)+1)<<40)|(np.asarray(chrom).astype(np.int64)<<32)|np.asarray(pos).astype(np.int64)
+
+	def keys(self,rows=None):
+		'''the (person, chrom, pos) keys of the live rows, or of the given rows'''
+		rows = self.rows() if rows is None else rows
+		return self._keys(self.person[rows],self.chrom[rows],self.pos[rows])
+
+	@classmethod
+	def encode(cls,variantfile,chroms,names):
+		'''convert validated columns to table codes
+		Args:
+			variantfile (:obj:`pandas.DataFrame`): chrom, pos, ref, alt and person name columns
+			chroms (:obj:`list` of :obj:`str`): chromosome names in code order
+			names (:obj:`list` of :obj:`str`): person names in code order
+		Returns:
+			:obj:`dict`: column name -> :obj:`numpy.ndarray` of codes
+		'''
+		codes = {
+			"chrom": pd.Categorical(variantfile["chrom"].astype(object),categories=chroms).codes,
+			"pos": variantfile["pos"].to_numpy().astype(np.uint32),
+			"ref": pd.Categorical(variantfile["ref"].astype(object),categories=cls._bases).codes,
+			"alt": pd.Categorical(variantfile["alt"].astype(object),categories=cls._bases).codes,
+			"person": pd.Categorical(variantfile["person"].astype(object),categories=names).codes
+			}
+		codes["ref"] = np.where(codes["ref"]<0,cls.NA,codes["ref"])
+		return codes
+
+	def duplicates(self,keys):
+		'''mask of the (person, chrom, pos) keys that are already stored'''
+		return self.index.contains(keys)
+
+	def extend(self,variantfile):
+		'''append validated columns in bulk
+		Args:
+			variantfile (:obj:`pandas.DataFrame`): chrom, pos, ref, alt and person name columns
+		Returns:
+			:obj:`numpy.ndarray`: the new row numbers
+		'''
+		codes = self.encode(variantfile,self.chroms,[p.name for p in self.people])
+		duplicated = self.duplicates(self._keys(codes["person"],codes["chrom"],codes["pos"]))
+		if duplicated.any():
+			raise AssertionError("""Duplicate variants for each individual exist in the dataset.
+		First example: %s""" % variantfile[duplicated].head(1))
+		return self.extend_codes(codes)
+
+	def extend_codes(self,codes):
+		'''append columns already converted by encode(); duplicates must have been checked
+		Returns:
+			:obj:`numpy.ndarray`: the new row numbers
+		'''
+		n = len(codes["pos"])
+		new_keys = self._keys(codes["person"],codes["chrom"],codes["pos"])
+		self._reserve(n)
+		rows = np.arange(self.n_rows,self.n_rows+n)
+		for column in self._columns:
+			getattr(self,column)[rows] = codes[column]
+		self.live[rows] = True
+		self.index.extend(new_keys,rows)
+		self.n_rows += n
+		self._count(codes["person"])
+		self.regions.add_rows(rows)
+		self.sites.add_rows(rows)
+		for counter in self.counters.values():
+			counter.add_rows(rows)
+		return rows
+
+	def mendelian_errors(self,child,mother,father):
+		'''child variants that neither parent has, for trios given as arrays of person codes (a code
+		with no rows, e.g. len(self.people), stands for a person without variants); chrX and chrY are skipped
+		Returns:
+			:obj:`tuple`: (trio of each error, its row, True where neither parent has a variant at the
+				position, the number of child variants checked per trio)
+		'''
+		rows = self.rows()
+		keys = self._keys(self.person[rows],self.chrom[rows],self.pos[rows])
+		order = np.argsort(keys)
+		keys = keys[order]
+		trio_of = np.full(len(self.people)+2,-1,dtype=np.int64) #unassigned rows (-1) read the last entry
+		trio_of[np.asarray(child,dtype=np.int64)] = np.arange(len(child))
+		sex = [self._chrom_codes[c] for c in ("chrX","chrY") if c in self._chrom_codes]
+		trio = trio_of[self.person[rows]]
+		checked = rows[(trio >= 0)&~np.isin(self.chrom[rows],sex)]
+		trio = trio_of[self.person[checked]]
+		explained,carrier = np.zeros(len(checked),dtype=bool),np.zeros(len(checked),dtype=bool)
+		for parent in (mother,father):
+			wanted = self._keys(np.asarray(parent)[trio],self.chrom[checked],self.pos[checked])
+			at = np.minimum(np.searchsorted(keys,wanted),max(len(keys)-1,0)) #nothing is checked if there are no rows
+			has = keys[at] == wanted
+			carrier |= has
+			explained |= has & (self.alt[rows[order[at]]] == self.alt[checked])
+		error = ~explained
+		return trio[error],checked[error],~carrier[error],np.bincount(trio,minlength=len(child))
+
+	def carriers(self,people,chroms=None):
+		'''the sites where any of people (person codes) has a variant, optionally only on chroms
+		Returns:
+			:obj:`tuple`: (SiteIndex ids of the sites, sites x people bool matrix of who has a variant there)
+		'''
+		index = self.sites
+		index.build()
+		rows = [index.rows_of(code) for code in np.asarray(people,dtype=np.int64).tolist()]
+		member = np.repeat(np.arange(len(rows)),[len(r) for r in rows])
+		site = index.find_rows(np.concatenate(rows+[np.zeros(0,dtype=np.int64)]))
+		if chroms != None:
+			keep = np.isin(index.chrom[site],[self._chrom_codes[c] for c in chroms if c in self._chrom_codes])
+			site,member = site[keep],member[keep]
+		sites,site = np.unique(site,return_inverse=True)
+		carriers = np.zeros((len(sites),len(rows)),dtype=bool)
+		carriers[site,member] = True
+		return sites,carriers
+
+	def find(self,person,chrom,pos):
+		'''row number of a Person's variant at chrom:pos, or None if there is none'''
+		if chrom not in self._chrom_codes or person not in self._person_codes:
+			return None
+		return self.index.get(int(self._keys(self._person_codes[person],self._chrom_codes[chrom],pos)))
+
+	def to_frame(self,rows=None):
+		'''the live variants, or the given rows, as a DataFrame of chrom, pos, ref, alt and person names'''
+		rows = self.rows() if rows is None else np.asarray(rows,dtype=np.int64)
+		return pd.DataFrame({
+			"chrom": np.array(self.chroms,dtype=object)[self.chrom[rows]],
+			"pos": self.pos[rows],
+			"ref": np.array(self._bases+[None],dtype=object)[np.minimum(self.ref[rows],len(self._bases))],
+			"alt": np.array(self._bases,dtype=object)[self.alt[rows]],
+			"person": [self.people[c].name if c >= 0 else None for c in self.person[rows]]
+			})
+
+class PersonVariants(object):
+	''' PersonVariants() One person's variants, read from a VariantTable
+	Supports the list operations Person uses: iteration, len, in, indexing, append and remove.
+	'''
+
+	__slots__ = ("table","code")
+
+	def __init__(self,table,code):
+		self.table = table
+		self.code = code
+
+	def _rows(self):
+		return self.table.rows(person=self.table.people[self.code])
+
+	def __iter__(self):
+		for row in self._rows():
+			yield Variant._view(self.table,int(row))
+
+	def __len__(self):
+		return self.table.count(self.table.people[self.code])
+
+	def __getitem__(self,i):
+		return Variant._view(self.table,int(self._rows()[i]))
+
+	def __contains__(self,variant):
+		return variant in self.table and self.table.person[variant._row] == self.code
+
+	def __repr__(self):
+		return repr(list(self))
+
+	def get(self,chrom,pos):
+		'''this person's Variant at chrom:pos, or None'''
+		row = self.table.find(self.table.people[self.code],chrom,pos)
+		return Variant._view(self.table,row) if row is not None else None
+
+	def append(self,variant):
+		self.table.add(variant,person=self.table.people[self.code])
+		return None
+
+	def remove(self,variant):
+		assert variant in self, "variant %s does not belong to this person" % str(variant)
+		self.table.remove(variant)
+		return None
+
+class BedGenotypes(object):
+	''' BedGenotypes(bed,bim,people) Genotypes of a PLINK .bed file, memory-mapped and decoded on demand
+	The .bed file holds 2 bits per person per marker, one marker after another. Nothing is decoded
+	until a marker or person is asked for, so a cohort-sized file is never expanded in memory.
+	Attributes:
+		people (:obj:`list` of :obj:`Person`): the people of the .fam file, in file order
+		chroms (:obj:`numpy.ndarray` of object): hg38 chromosome name of each marker
+		positions (:obj:`numpy.ndarray` of int64): 0-based position of each marker
+		ids (:obj:`numpy.ndarray` of object): marker IDs
+		alt (:obj:`numpy.ndarray` of object): allele 1 of each marker, the counted allele
+		ref (:obj:`numpy.ndarray` of object): allele 2 of each marker
+		usable (:obj:`numpy.ndarray` of bool): markers that can be shown as Variants: single-base
+			A/C/G/T alleles, a known chromosome and a position
+	'''
+
+	_magic = b"\x6c\x1b\x01" #SNP-major .bed
+	_dosage = np.array([2,-1,1,0],dtype=np.int8) #2-bit code -> copies of allele 1, -1 if missing
+
+	def __init__(self,bed,bim,people):
+		self.people = list(people)
+		markers = pd.read_csv(bim,sep=r"\s+",header=None,dtype=str)
+		if markers.shape[1] != 6:
+			raise AssertionError("%s must have 6 columns, not %d" % (bim,markers.shape[1]))
+		self.chroms = _plink_chroms(markers[0])
+		self.positions = markers[3].astype(np.int64).to_numpy()-1
+		self.ids = markers[1].to_numpy(dtype=object)
+		self.alt = markers[4].to_numpy(dtype=object)
+		self.ref = markers[5].to_numpy(dtype=object)
+		self.usable = (markers[4].isin(VariantTable._bases)&markers[5].isin(VariantTable._bases)).to_numpy() \
+					  &pd.Series(self.chroms).isin(Variant._chrom_sizes.keys()).to_numpy()&(self.positions >= 0)
+		width = (len(self.people)+3)//4
+		with open(bed,"rb") as f:
+			if f.read(3) != self._magic:
+				raise AssertionError("%s is not a SNP-major PLINK .bed file" % bed)
+		size = os.path.getsize(bed)
+		if size != 3+width*len(markers):
+			raise AssertionError("%s should be %d bytes for %d people and %d markers, not %d" % (
+			bed,3+width*len(markers),len(self.people),len(markers),size))
+		self._bed = np.memmap(bed,dtype=np.uint8,mode="r",offset=3,shape=(len(markers),width)) if len(markers) > 0 \
+					else np.zeros((0,width),dtype=np.uint8)
+		self._codes = {person:i for i,person in enumerate(self.people)}
+		self._keys = None #sorted (chrom, pos) keys of the markers, built on first lookup
+
+	def __len__(self):
+		return len(self.positions)
+
+	def dosages(self,markers):
+		'''copies of allele 1 (alt) for every person at each of markers (indices), -1 where missing
+		Returns:
+			:obj:`numpy.ndarray` of int8: markers x people
+		'''
+		packed = self._bed[np.asarray(markers,dtype=np.int64)]
+		codes = (packed[:,:,None] >> np.array([0,2,4,6],dtype=np.uint8)) & 3
+		return self._dosage[codes.reshape(len(packed),-1)[:,:len(self.people)]]
+
+	def person_dosages(self,person):
+		'''copies of allele 1 (alt) that person carries at every marker, -1 where missing'''
+		i = self._codes[person]
+		return self._dosage[(self._bed[:,i//4] >> (2*(i % 4))) & 3]
+
+	def find(self,chrom,pos):
+		'''the index of the marker at chrom:pos, or None'''
+		if self._keys is None:
+			names = sorted(set(self.chroms.tolist()))
+			codes = np.searchsorted(names,self.chroms.astype(str)) if len(self) > 0 else np.zeros(0,dtype=np.int64)
+			keys = (codes.astype(np.int64) << 40)|(self.positions & ((1 << 40)-1))
+			self._keys = (names,np.argsort(keys,kind="stable"),np.sort(keys,kind="stable"))
+		names,order,keys = self._keys
+		if chrom not in names:
+			return None
+		key = (names.index(chrom) << 40)|(int(pos) & ((1 << 40)-1))
+		at = int(np.searchsorted(keys,key))
+		return int(order[at]) if at < len(keys) and keys[at] == key else None
+
+	def carrier_dosages(self,people,chroms=None,chunksize=1 << 20):
+		'''the usable markers (optionally only on chroms) where any of people (indices) carries allele 1,
+		read chunksize markers at a time
+		Returns:
+			:obj:`tuple`: (the markers, markers x people int8 dosages, -1 where missing)
+		'''
+		people = np.asarray(people,dtype=np.int64)
+		markers = np.flatnonzero(self.usable&(np.isin(self.chroms,chroms) if chroms != None else True))
+		found,dosages = [np.zeros(0,dtype=np.int64)],[np.zeros((0,len(people)),dtype=np.int8)]
+		for start in range(0,len(markers),chunksize):
+			block = markers[start:start+chunksize]
+			dosage = self._dosage[(self._bed[block][:,people//4] >> (2*(people % 4)).astype(np.uint8)) & 3]
+			carried = (dosage > 0).any(axis=1)
+			found.append(block[carried])
+			dosages.append(dosage[carried])
+		return np.concatenate(found),np.concatenate(dosages)
+
+	def mendelian_errors(self,child,mother,father,chunksize=None):
+		'''genotypes the parents cannot explain, for trios given as arrays of person indices; usable
+		markers off chrX and chrY are checked chunksize at a time (default about 16M genotypes),
+		reading only the trios' 2-bit codes
+		Returns:
+			:obj:`tuple`: (trio of each error, its marker, 3 x errors dosages of child, mother and
+				father, True where both parents are homozygous reference, the markers checked per trio)
+		'''
+		transmitted = [(0,),(0,1),(1,)] #copies of allele 1 that a parent of each dosage can pass on
+		consistent = np.zeros((3,3,3),dtype=bool) #mother, father, child dosage
+		for m in range(3):
+			for f in range(3):
+				for a in transmitted[m]:
+					for b in transmitted[f]:
+						consistent[m,f,a+b] = True
+		m,f,c = [self._dosage[codes] for codes in np.indices((4,4,4)).reshape(3,-1)] #every mother, father, child code
+		called = (m >= 0)&(f >= 0)&(c >= 0) #indexed by mother << 4 | father << 2 | child code
+		error = called & ~consistent[np.maximum(m,0),np.maximum(f,0),np.maximum(c,0)]
+
+		markers = np.flatnonzero(self.usable&~np.isin(self.chroms,["chrX","chrY"]))
+		if chunksize == None: chunksize = max((1 << 24)//max(len(child),1),1)
+		members = [(np.asarray(i,dtype=np.int64)//4,(2*(np.asarray(i,dtype=np.int64) % 4)).astype(np.uint8))
+				   for i in (mother,father,child)]
+		checked = np.zeros(len(child),dtype=np.int64)
+		found = []
+		for start in range(0,len(markers),chunksize):
+			block = markers[start:start+chunksize]
+			packed = self._bed[block]
+			codes = np.zeros((len(block),len(child)),dtype=np.uint8)
+			for column,shift in members:
+				codes = (codes << 2)|((packed[:,column] >> shift) & 3)
+			checked += called[codes].sum(axis=0)
+			at,trio = np.nonzero(error[codes])
+			found.append((trio,block[at],codes[at,trio]))
+		trio = np.concatenate([t for t,_,_ in found]) if found else np.zeros(0,dtype=np.int64)
+		errors = np.concatenate([e for _,e,_ in found]) if found else np.zeros(0,dtype=np.int64)
+		codes = np.concatenate([x for _,_,x in found]) if found else np.zeros(0,dtype=np.uint8)
+		dosages = np.stack([c[codes],m[codes],f[codes]])
+		return trio,errors,dosages,(dosages[1] == 0)&(dosages[2] == 0),checked
+
+	def variant(self,marker,person):
+		'''a detached Variant for person at marker'''
+		return Variant(self.chroms[marker],int(self.positions[marker]),self.alt[marker],
+					   ref=self.ref[marker],person=person,sanity=False)
+
+	def variants_at(self,chrom,pos):
+		'''a Variant for every person carrying the alt allele at chrom:pos'''
+		marker = self.find(chrom,pos)
+		if marker is None or not self.usable[marker]:
+			return []
+		dosage = self.dosages([marker])[0]
+		return [self.variant(marker,self.people[i]) for i in np.flatnonzero(dosage > 0).tolist()]
+
+class BedPersonVariants(object):
+	''' BedPersonVariants() One person's variants, decoded from a BedGenotypes when asked for
+	Supports the read-only list operations Person uses: iteration, len, in, indexing and get.
+	'''
+
+	__slots__ = ("genotypes","person")
+
+	def __init__(self,genotypes,person):
+		self.genotypes = genotypes
+		self.person = person
+
+	def _markers(self):
+		return np.flatnonzero((self.genotypes.person_dosages(self.person) > 0)&self.genotypes.usable)
+
+	def __iter__(self):
+		for marker in self._markers().tolist():
+			yield self.genotypes.variant(marker,self.person)
+
+	def __len__(self):
+		return len(self._markers())
+
+	def __getitem__(self,i):
+		return self.genotypes.variant(int(self._markers()[i]),self.person)
+
+	def __contains__(self,variant):
+		found = self.get(variant.chrom,variant.pos)
+		return found is not None and found.alt == variant.alt
+
+	def __repr__(self):
+		return repr(list(self))
+
+	def get(self,chrom,pos):
+		'''this person's Variant at chrom:pos, or None'''
+		genotypes = self.genotypes
+		marker = genotypes.find(chrom,pos)
+		if marker is None or not genotypes.usable[marker]:
+			return None
+		i = genotypes._codes[self.person]
+		code = (int(genotypes._bed[marker,i//4]) >> (2*(i % 4))) & 3
+		return genotypes.variant(marker,self.person) if genotypes._dosage[code] > 0 else None
+
+	def append(self,variant):
+		raise AssertionError("variants read from a .bed file cannot be changed")
+
+	def remove(self,variant):
+		raise AssertionError("variants read from a .bed file cannot be changed")
+
+class SiteIndex(object):
+	''' SiteIndex() The distinct sites of a VariantTable, each stored once with the rows of its carriers
+	A site is a (chrom, pos, alt); the rows of its carriers are a CSR list, so finding who carries a
+	site or how many do is a binary search and a slice rather than a scan of the table. Each person's
+	rows are kept the same way, in table order. Built from the table's columns on the first query;
+	after that, like RegionIndex, the table queues the rows it adds and they are merged into the
+	sorted arrays on the next query, while removed rows are dropped using the live mask. The sites
+	and the person rows are merged separately, so moving a variant to another person or reading
+	one person's rows does not touch the sites; the table keeps the per-person counts itself.
+	Attributes:
+		table (:obj:`VariantTable`): the table being indexed
+		keys (:obj:`numpy.ndarray` of int64): sorted chrom << 34 | pos << 2 | alt key of each site
+		chrom, pos, ref, alt (:obj:`numpy.ndarray`): the table codes of each site; ref is that of the
+			site's first row
+		starts (:obj:`numpy.ndarray` of int64): rows[starts[i]:starts[i+1]] are the rows of site i
+		rows (:obj:`numpy.ndarray` of int64): table rows, grouped by site
+		person_starts (:obj:`numpy.ndarray` of int64): person_rows[person_starts[c]:person_starts[c+1]]
+			are the rows of person code c
+		person_rows (:obj:`numpy.ndarray` of int64): table rows, grouped by person
+		stale, people_stale (:obj:`bool`): True if the sites or the person rows have changes to merge
+	'''
+
+	def __init__(self,table):
+		self.table = table
+		self.keys = None #built from the table on the first query, and again after a truncate
+		self.person_rows = None
+		self.stale = True
+		self.people_stale = True
+		self._added = list() #rows added since the sites were merged
+		self._removed = list() #rows removed since the sites were merged
+		self._people_added = list() #likewise for the person rows
+		self._people_removed = list()
+		self._moved = dict() #row given to another person -> its person code when the person rows were merged
+
+	def add_rows(self,rows):
+		'''queue rows added to the table'''
+		rows = np.asarray(rows,dtype=np.int64)
+		if self.keys is not None: #until the first build, the table's columns are all there is to read
+			self._added.append(rows)
+		if self.person_rows is not None:
+			self._people_added.append(rows)
+		self.stale = self.people_stale = True
+		return None
+
+	def remove_rows(self,rows):
+		'''queue rows removed from the table'''
+		rows = np.asarray(rows,dtype=np.int64)
+		if self.keys is not None:
+			self._removed.append(rows)
+		if self.person_rows is not None:
+			self._people_removed.append(rows)
+		self.stale = self.people_stale = True
+		return None
+
+	def move_row(self,row,code):
+		'''queue a row given to another person, before the table changes it from person code; its site stays the same'''
+		if self.person_rows is not None:
+			self._moved.setdefault(row,code)
+		self.people_stale = True
+		return None
+
+	def truncate(self,n_rows):
+		'''forget the index after VariantTable.truncate(); it is rebuilt on the next query'''
+		self.keys = self.person_rows = None
+		self._added,self._removed,self._people_added,self._people_removed,self._moved = list(),list(),list(),list(),dict()
+		self.stale = self.people_stale = True
+		return None
+
+	@staticmethod
+	def _keys(chrom,pos,alt):
+		'''a unique int64 key per (chrom, pos, alt), in chrom, pos, alt order'''
+		return (np.asarray(chrom).astype(np.int64) << 34)|(np.asarray(pos).astype(np.int64) << 2)|np.asarray(alt).astype(np.int64)
+
+	@staticmethod
+	def _queued(added,removed):
+		'''(rows to put in, rows to take out) of the queues; rows both added and removed since the merge are neither'''
+		added = np.concatenate(added+[np.zeros(0,dtype=np.int64)])
+		removed = np.concatenate(removed+[np.zeros(0,dtype=np.int64)])
+		if len(added) == 0 or len(removed) == 0:
+			return added,removed
+		return added[~np.isin(added,removed)],removed[~np.isin(removed,added)]
+
+	@staticmethod
+	def _positions(rows,starts,groups,values):
+		'''where each value is, or would go, in its group rows[starts[g]:starts[g+1]], which is sorted'''
+		return np.array([lo+int(np.searchsorted(rows[lo:hi],v)) for lo,hi,v in
+						 zip(starts[groups].tolist(),starts[groups+1].tolist(),values.tolist())],dtype=np.int64)
+
+	def build(self):
+		'''merge the queued rows into the sites, or build them from the table if there are many'''
+		if not self.stale:
+			return None
+		table = self.table
+		added,removed = self._queued(self._added,self._removed) if self.keys is not None else (None,None)
+		self._added,self._removed = list(),list()
+		if self.keys is None or len(added)+len(removed) > max(64,len(self.rows)>>3):
+			live = table.rows()
+			keys = self._keys(table.chrom[live],table.pos[live],table.alt[live])
+			order = np.argsort(keys,kind="stable")
+			rows,keys = live[order],keys[order]
+			first = np.flatnonzero(np.concatenate([[True],keys[1:] != keys[:-1]])) if len(keys) > 0 else np.zeros(0,dtype=np.int64)
+			self.keys,self.rows = keys[first],rows
+			self.starts = np.append(first,len(rows)).astype(np.int64)
+			for column in ["chrom","pos","ref","alt"]:
+				setattr(self,column,getattr(table,column)[rows[first]])
+			self.stale = False
+			return None
+		columns = ["keys","chrom","pos","ref","alt"]
+		counts = np.diff(self.starts)
+		if len(removed) > 0: #taken out of their site's rows; sites left without carriers are dropped
+			site = self.find_rows(removed)
+			self.rows = np.delete(self.rows,self._positions(self.rows,self.starts,site,removed))
+			np.subtract.at(counts,site,1)
+			touched = np.unique(site)
+			empty = touched[counts[touched] == 0]
+			counts = np.delete(counts,empty)
+			for column in columns:
+				setattr(self,column,np.delete(getattr(self,column),empty))
+		if len(added) > 0: #added rows come after every row in the index, so they go at the end of their site's rows
+			keys = self._keys(table.chrom[added],table.pos[added],table.alt[added])
+			order = np.lexsort((added,keys))
+			added,keys = added[order],keys[order]
+			site = np.searchsorted(self.keys,keys)
+			known = site < len(self.keys)
+			known[known] = self.keys[site[known]] == keys[known]
+			starts = self.starts if len(removed) == 0 else np.append(0,np.cumsum(counts))
+			self.rows = np.insert(self.rows,starts[site+known],added)
+			np.add.at(counts,site[known],1)
+			if not known.all():
+				new,first,number = np.unique(keys[~known],return_index=True,return_counts=True)
+				first = added[~known][first]
+				at = np.searchsorted(self.keys,new)
+				counts = np.insert(counts,at,number)
+				self.keys = np.insert(self.keys,at,new)
+				for column in columns[1:]:
+					setattr(self,column,np.insert(getattr(self,column),at,getattr(table,column)[first]))
+		self.starts = np.append(0,np.cumsum(counts)).astype(np.int64)
+		if len(removed) > 0: #a site whose first row was removed takes the ref of its new first row
+			site = self.find_rows(removed)
+			site = site[site >= 0]
+			self.ref[site] = table.ref[self.rows[self.starts[site]]]
+		self.stale = False
+		return None
+
+	def find_rows(self,rows):
+		'''the site id of each table row (removed ones too), -1 where the site is not indexed; does not merge'''
+		table = self.table
+		keys = self._keys(table.chrom[rows],table.pos[rows],table.alt[rows])
+		site = np.searchsorted(self.keys,keys)
+		found = site < len(self.keys)
+		found[found] = self.keys[site[found]] == keys[found]
+		return np.where(found,site,-1)
+
+	def build_people(self):
+		'''merge the queued rows into the rows of each person, or build them from the table if there are many'''
+		if not self.people_stale:
+			return None
+		table = self.table
+		if self.person_rows is not None:
+			added,removed = self._queued(self._people_added,self._people_removed)
+			if len(self._moved) > 0: #taken out under their old person and put back under the new one
+				moved = np.fromiter(self._moved.keys(),dtype=np.int64,count=len(self._moved))
+				removed = np.union1d(removed,moved[~np.isin(moved,added)])
+				added = np.union1d(added,moved)
+			added = added[table.live[added]]
+		self._people_added,self._people_removed = list(),list()
+		if self.person_rows is None or len(added)+len(removed) > max(64,len(self.person_rows)>>3):
+			live = table.rows()
+			order = np.argsort(table.person[live],kind="stable") #keeps each person's rows in table order
+			self.person_rows = live[order]
+			self.person_starts = np.searchsorted(table.person[self.person_rows],np.arange(len(table.people)+1)).astype(np.int64) #unassigned rows come first
+		else:
+			#counts[0] is of the unassigned rows (-1), counts[c+1] of person code c
+			counts = np.zeros(len(table.people)+1,dtype=np.int64)
+			counts[:len(self.person_starts)] = np.diff(self.person_starts,prepend=0)
+			starts = np.append(0,np.cumsum(counts))
+			if len(removed) > 0:
+				code = np.array([self._moved.get(row,table.person[row]) for row in removed.tolist()],dtype=np.int64)+1
+				self.person_rows = np.delete(self.person_rows,self._positions(self.person_rows,starts,code,removed))
+				np.subtract.at(counts,code,1)
+				starts = np.append(0,np.cumsum(counts))
+			code = table.person[added].astype(np.int64)+1
+			order = np.lexsort((added,code))
+			added,code = added[order],code[order]
+			self.person_rows = np.insert(self.person_rows,self._positions(self.person_rows,starts,code,added),added)
+			np.add.at(counts,code,1)
+			self.person_starts = np.cumsum(counts)
+		self._moved = dict()
+		self.people_stale = False
+		return None
+
+	def __len__(self):
+		self.build()
+		return len(self.keys)
+
+	def find(self,chrom,pos,alt=None):
+		'''the ids of the sites at chrom:pos, or only the one with that alt'''
+		self.build()
+		table = self.table
+		if chrom not in table._chrom_codes or (alt != None and alt not in table._base_codes):
+			return np.zeros(0,dtype=np.int64)
+		first,last = (table._base_codes[alt],)*2 if alt != None else (0,len(table._bases)-1)
+		code = table._chrom_codes[chrom]
+		lo = np.searchsorted(self.keys,self._keys(code,pos,first),side="left")
+		hi = np.searchsorted(self.keys,self._keys(code,pos,last),side="right")
+		return np.arange(lo,hi,dtype=np.int64)
+
+	def carrier_rows(self,site):
+		'''the table rows of the people carrying site'''
+		self.build()
+		return self.rows[self.starts[site]:self.starts[site+1]]
+
+	def counts(self):
+		'''the number of carriers of each site'''
+		self.build()
+		return np.diff(self.starts)
+
+	def rows_of(self,code):
+		'''the rows of person code, in table order'''
+		self.build_people()
+		if not 0 <= code < len(self.person_starts)-1:
+			return np.zeros(0,dtype=np.int64)
+		return self.person_rows[self.person_starts[code]:self.person_starts[code+1]]
+
+	def to_frame(self,sites=None):
+		'''the sites, or the given site ids, as a DataFrame of chrom, pos, ref, alt and carriers'''
+		self.build()
+		sites = np.arange(len(self.keys)) if sites is None else np.asarray(sites,dtype=np.int64)
+		table = self.table
+		return pd.DataFrame({
+			"chrom": np.array(table.chroms,dtype=object)[self.chrom[sites]],
+			"pos": self.pos[sites],
+			"ref": np.array(table._bases+[None],dtype=object)[np.minimum(self.ref[sites],len(table._bases))],
+			"alt": np.array(table._bases,dtype=object)[self.alt[sites]],
+			"carriers": self.counts()[sites]
+			})
+
+class AlleleCounts(object):
+	''' AlleleCounts() Running count of the carriers of each site (chrom, pos, alt) in each group of people
+	Built once from a VariantTable and then updated by the table as rows are added and removed, so
+	loading another batch of variants only counts the new rows. Like RegionIndex, changes are
+	queued and merged in one go before the next query. Counts are kept sparse, one entry per
+	(group, site) with carriers, under a sorted int64 key of group << 42 | SiteIndex key.
+	Attributes:
+		table (:obj:`VariantTable`): the table being counted
+		groups (:obj:`dict`): person name -> group label, or None to count everyone as one group;
+			people not in it are not counted. Read when a person's first rows are counted.
+		labels (:obj:`list`): group labels, indexed by group code
+		keys (:obj:`numpy.ndarray` of int64): sorted (group, site) keys
+		counts (:obj:`numpy.ndarray` of int64): carriers of each key
+		ref (:obj:`numpy.ndarray` of uint8): ref allele code of each key, from its first row
+	'''
+
+	_site_bits = 42 #chrom << 34 | pos << 2 | alt
+
+	def __init__(self,table,groups=None):
+		self.table = table
+		self.groups = groups
+		self.labels = list()
+		self._label_codes = dict()
+		self._person_groups = np.zeros(0,dtype=np.int64) #person code -> group code, -1 if not counted
+		self.keys = np.zeros(0,dtype=np.int64)
+		self.counts = np.zeros(0,dtype=np.int64)
+		self.ref = np.zeros(0,dtype=np.uint8)
+		self._pending_rows = list() #rows added since the last merge
+		self._pending = list() #(keys, ref, signs) of rows not yet merged
+		self.add_rows(table.rows())
+
+	def _group_codes(self,codes):
+		'''group codes of person codes, looking up people seen for the first time'''
+		table = self.table
+		known = len(self._person_groups)
+		if len(table.people) > known:
+			new = np.full(len(table.people)-known,-1,dtype=np.int64)
+			for i,person in enumerate(table.people[known:]):
+				label = "all" if self.groups == None else self.groups.get(person.name)
+				if label == None:
+					continue
+				if label not in self._label_codes:
+					self._label_codes[label] = len(self.labels)
+					self.labels.append(label)
+				new[i] = self._label_codes[label]
+			self._person_groups = np.concatenate([self._person_groups,new])
+		return np.append(self._person_groups,-1)[codes] #unassigned rows (-1) read the last entry
+
+	def forget_people(self,n_people):
+		'''drop the groups of the person codes from n_people on, which VariantTable.truncate() unregistered'''
+		self._freeze()
+		self._person_groups = self._person_groups[:n_people]
+		return None
+
+	def add_rows(self,rows,sign=1):
+		'''queue table rows to be counted (sign=1) or uncounted (sign=-1) at the next build()'''
+		if sign > 0:
+			self._pending_rows.append(rows)
+			return None
+		self._freeze() #rows about to change are read as they are now
+		self._freeze(rows,-1)
+		return None
+
+	def _freeze(self,rows=None,sign=1):
+		'''turn queued rows (or rows) into queued keys, before the rows can change'''
+		if rows is None:
+			if len(self._pending_rows) == 0:
+				return None
+			rows,self._pending_rows = np.concatenate([np.asarray(r,dtype=np.int64) for r in self._pending_rows]),list()
+		table = self.table
+		rows = np.asarray(rows,dtype=np.int64)
+		group = self._group_codes(table.person[rows].astype(np.int64))
+		rows,group = rows[group >= 0],group[group >= 0]
+		keys = (group << self._site_bits)|SiteIndex._keys(table.chrom[rows],table.pos[rows],table.alt[rows])
+		self._pending.append((keys,table.ref[rows],np.full(len(rows),sign,dtype=np.int64)))
+		return None
+
+	def build(self):
+		'''merge the queued rows into the sorted keys and counts'''
+		self._freeze()
+		if len(self._pending) == 0:
+			return None
+		keys,ref,signs = [np.concatenate(column) for column in zip(*self._pending)]
+		self._pending = list()
+		keys,first,inverse = np.unique(keys,return_index=True,return_inverse=True)
+		counts = np.bincount(inverse,weights=signs,minlength=len(keys)).astype(np.int64)
+		at = np.searchsorted(self.keys,keys)
+		found = at < len(self.keys)
+		found[found] = self.keys[at[found]] == keys[found]
+		self.counts[at[found]] += counts[found]
+		if not found.all(): #new (group, site) keys
+			at = np.searchsorted(self.keys,keys[~found])
+			self.keys = np.insert(self.keys,at,keys[~found])
+			self.counts = np.insert(self.counts,at,counts[~found])
+			self.ref = np.insert(self.ref,at,ref[first[~found]])
+		return None
+
+	def to_frame(self,sizes,chroms=None):
+		'''the counts as a DataFrame of group, chrom, pos, ref, alt, carriers, people and frequency,
+		given the number of people in each group (a dict label -> size)'''
+		self.build()
+		table = self.table
+		keep = self.counts > 0
+		if chroms != None:
+			codes = [table._chrom_codes[c] for c in chroms if c in table._chrom_codes]
+			keep &= np.isin((self.keys >> 34) & 255,codes)
+		keys,counts = self.keys[keep],self.counts[keep]
+		group = keys >> self._site_bits
+		people = np.array([sizes.get(label,0) for label in self.labels],dtype=np.int64)[group] if len(self.labels) > 0 else np.zeros(0,dtype=np.int64)
+		return pd.DataFrame({
+			"group": np.array(self.labels,dtype=object)[group] if len(self.labels) > 0 else np.zeros(0,dtype=object),
+			"chrom": np.array(table.chroms,dtype=object)[(keys >> 34) & 255],
+			"pos": ((keys >> 2) & 0xffffffff).astype(np.uint32),
+			"ref": np.array(table._bases+[None],dtype=object)[np.minimum(self.ref[keep],len(table._bases))],
+			"alt": np.array(table._bases,dtype=object)[keys & 3],
+			"carriers": counts,
+			"people": people,
+			"frequency": counts/np.maximum(2*people,1)
+			})
+
+class KeyIndex(object):
+	''' KeyIndex() The (person, chrom, pos) keys of a VariantTable's rows, sorted, for duplicate checks and find()
+	Bulk loads are merged straight into the sorted arrays; rows added one at a time are kept in a small
+	dict and merged once it grows. An entry whose row was removed, truncated or given to another person
+	no longer matches the row's key and is skipped, then dropped at the next merge.
+	Attributes:
+		table (:obj:`VariantTable`): the table being indexed
+		keys (:obj:`numpy.ndarray` of int64): sorted keys, None until built from the table
+		rows (:obj:`numpy.ndarray` of int64): table rows, aligned with keys
+	'''
+
+	def __init__(self,table):
+		self.table = table
+		self.keys = np.zeros(0,dtype=np.int64)
+		self.rows = np.zeros(0,dtype=np.int64)
+		self._pending = dict()
+
+	def reset(self):
+		'''forget everything; the index is rebuilt from the table's columns on the next lookup'''
+		self.keys,self.rows,self._pending = None,None,dict()
+		return None
+
+	def _valid(self,keys,rows):
+		'''mask of the entries whose row is live and still has that key'''
+		table = self.table
+		rows = np.asarray(rows,dtype=np.int64)
+		ok = rows < table.n_rows
+		ok[ok] = table.live[rows[ok]]
+		ok[ok] = table.keys(rows[ok]) == np.asarray(keys)[ok]
+		return ok
+
+	def build(self):
+		'''drop entries that no longer match their row and merge the queued ones into the sorted arrays'''
+		if self.keys is None:
+			self.rows = self.table.rows()
+			self.keys = self.table.keys(self.rows)
+			order = np.argsort(self.keys)
+			self.keys,self.rows = self.keys[order],self.rows[order]
+		keep = self._valid(self.keys,self.rows)
+		if not keep.all():
+			self.keys,self.rows = self.keys[keep],self.rows[keep]
+		if len(self._pending) > 0:
+			keys = np.fromiter(self._pending.keys(),dtype=np.int64,count=len(self._pending))
+			rows = np.fromiter(self._pending.values(),dtype=np.int64,count=len(self._pending))
+			self._pending = dict()
+			keep = self._valid(keys,rows)
+			keep[keep] = ~self._has(keys[keep]) #a row given back to a person it had is still stored
+			self.extend(keys[keep],rows[keep])
+		return None
+
+	def extend(self,keys,rows):
+		'''merge new (key, row) pairs into the sorted arrays; the keys must not be stored yet'''
+		if self.keys is None:
+			return None #built from the columns, which already hold the new rows
+		keys,rows = np.asarray(keys,dtype=np.int64),np.asarray(rows,dtype=np.int64)
+		order = np.argsort(keys)
+		at = np.searchsorted(self.keys,keys[order])
+		self.keys = np.insert(self.keys,at,keys[order])
+		self.rows = np.insert(self.rows,at,rows[order])
+		return None
+
+	def add(self,key,row):
+		'''queue one (key, row) pair, merging the queue once it is an eighth of the index'''
+		if self.keys is None:
+			return None
+		self._pending[key] = row
+		if len(self._pending) > max(1024,len(self.keys)>>3):
+			self.build()
+		return None
+
+	def _matches(self,key,row):
+		'''_valid() for one entry, without building arrays'''
+		table = self.table
+		return row < table.n_rows and bool(table.live[row]) and \
+			((int(table.person[row])+1)<<40)|(int(table.chrom[row])<<32)|int(table.pos[row]) == key
+
+	def get(self,key):
+		'''the row with key, or None'''
+		if self.keys is None:
+			self.build()
+		row = self._pending.get(key)
+		if row is not None and self._matches(key,row):
+			return row
+		i = int(self.keys.searchsorted(key))
+		if i < len(self.keys) and self.keys[i] == key and self._matches(key,int(self.rows[i])):
+			return int(self.rows[i])
+		return None
+
+	def __contains__(self,key):
+		return self.get(key) is not None
+
+	def _has(self,keys):
+		keys = np.asarray(keys,dtype=np.int64)
+		if len(self.keys) == 0:
+			return np.zeros(len(keys),dtype=bool)
+		at = np.minimum(np.searchsorted(self.keys,keys),len(self.keys)-1)
+		return self.keys[at] == keys
+
+	def contains(self,keys):
+		'''mask of keys that are stored'''
+		self.build()
+		return self._has(keys)
+
+class RegionIndex(object):
+	''' RegionIndex() Per-chromosome sorted positions of a VariantTable, searched with binary search
+	Regions are BED-style: 0-based, start inclusive and end exclusive.
+	Rows added to the table are buffered and merged into the sorted arrays before the next query;
+	removed rows are skipped using the table's live mask and dropped at the next merge.
+	Attributes:
+		table (:obj:`VariantTable`): the table being indexed
+		positions (:obj:`dict`): chrom code -> sorted :obj:`numpy.ndarray` of positions
+		rows (:obj:`dict`): chrom code -> :obj:`numpy.ndarray` of table rows, aligned with positions
+	'''
+
+	def __init__(self,table):
+		self.table = table
+		self.positions = dict()
+		self.rows = dict()
+		self._pending = list()
+
+	def add_rows(self,rows):
+		'''queue new table rows for the index'''
+		self._pending.append(np.asarray(rows,dtype=np.int64))
+		return None
+
+	def build(self):
+		'''merge queued rows into the sorted per-chromosome arrays'''
+		if len(self._pending) == 0:
+			return None
+		table = self.table
+		new = np.concatenate(self._pending)
+		self._pending = list()
+		new = new[table.live[new]]
+		new_chroms = table.chrom[new]
+		for code in np.unique(new_chroms).tolist():
+			added = new[new_chroms == code]
+			added = added[np.argsort(table.pos[added],kind="stable")]
+			rows = self.rows.get(code,np.zeros(0,dtype=np.int64))
+			rows = rows[table.live[rows]]
+			at = np.searchsorted(table.pos[rows],table.pos[added],side="right")
+			rows = np.insert(rows,at,added)
+			self.rows[code] = rows
+			self.positions[code] = table.pos[rows]
+		return None
+
+	def truncate(self,n_rows):
+		'''forget every row from n_rows on, after VariantTable.truncate()'''
+		self._pending = [rows[rows < n_rows] for rows in self._pending]
+		for code in list(self.rows.keys()):
+			self.rows[code] = self.rows[code][self.rows[code] < n_rows]
+			self.positions[code] = self.table.pos[self.rows[code]]
+		return None
+
+	def _chrom(self,chrom):
+		self.build()
+		code = self.table._chrom_codes.get(chrom)
+		if code not in self.rows:
+			return np.zeros(0,dtype=np.uint32),np.zeros(0,dtype=np.int64)
+		return self.positions[code],self.rows[code]
+
+	def region(self,chrom,start,end):
+		'''table rows with start <= pos < end on chrom, in position order'''
+		positions,rows = self._chrom(chrom)
+		lo,hi = np.searchsorted(positions,[start,end],side="left")
+		found = rows[lo:hi]
+		return found[self.table.live[found]]
+
+	def point(self,chrom,pos):
+		'''table rows at exactly chrom:pos'''
+		return self.region(chrom,pos,pos+1)
+
+	def nearest(self,chrom,pos):
+		'''table rows at the variant position closest to chrom:pos (both sides on a tie)'''
+		positions,rows = self._chrom(chrom)
+		alive = self.table.live[rows]
+		positions,rows = positions[alive],rows[alive]
+		if len(rows) == 0:
+			return rows
+		i = np.searchsorted(positions,pos,side="left")
+		candidates = positions[max(i-1,0):i+1].astype(np.int64)
+		distance = np.abs(candidates-pos).min()
+		return rows[np.abs(positions.astype(np.int64)-pos) == distance]
+
+	def regions(self,chroms,starts,ends):
+		'''batch version of region()
+		Args:
+			chroms, starts, ends (array-like): one entry per region
+		Returns:
+			:obj:`tuple`: (region number, table row) arrays, one entry per variant found
+		'''
+		chroms = np.asarray(chroms,dtype=object)
+		starts = np.asarray(starts,dtype=np.int64)
+		ends = np.asarray(ends,dtype=np.int64)
+		region_ids,found = [np.zeros(0,dtype=np.int64)],[np.zeros(0,dtype=np.int64)]
+		for chrom in pd.unique(chroms):
+			positions,rows = self._chrom(chrom)
+			which = np.flatnonzero(chroms == chrom)
+			lo = np.searchsorted(positions,starts[which],side="left")
+			hi = np.searchsorted(positions,ends[which],side="left")
+			counts = np.maximum(hi-lo,0)
+			#expand each [lo,hi) slice into the positions it covers
+			offsets = np.arange(counts.sum())-np.repeat(np.cumsum(counts)-counts,counts)
+			region_ids.append(np.repeat(which,counts))
+			found.append(rows[np.repeat(lo,counts)+offsets])
+		region_ids,found = np.concatenate(region_ids),np.concatenate(found)
+		alive = self.table.live[found]
+		return region_ids[alive],found[alive]
+
+class VariantList(list):
+	''' VariantList() A list of Variants that also indexes them by (chrom, pos)
+	Used for the variants of a Person that is not attached to a VariantTable.
+	'''
+
+	def __init__(self,variants=()):
+		list.__init__(self)
+		self._index = dict()
+		for variant in variants:
+			self.append(variant)
+
+	def __reduce__(self):
+		return (VariantList,(list(self),)) #rebuild the index when copied or pickled
+
+	def get(self,chrom,pos):
+		'''the Variant at chrom:pos, or None'''
+		return self._index.get((chrom,pos))
+
+	def append(self,variant):
+		assert (variant.chrom,variant.pos) not in self._index, "variant already exists at %s:%d"%(variant.chrom,variant.pos)
+		self._index[(variant.chrom,variant.pos)] = variant
+		list.append(self,variant)
+
+	def remove(self,variant):
+		assert self._index.get((variant.chrom,variant.pos)) is variant, "variant %s is not in this list" % str(variant)
+		del self._index[(variant.chrom,variant.pos)]
+		list.remove(self,variant)
+
 class Variant(object):
 	''' Variant
 	Attributes:
@@ -169,8 +2901,12 @@ class Variant(object):
 		pos (:obj:`int`): position that the variant is on the chromosome (0-indexed)
 		ref (:obj:`str`): reference/null allele at that position
 		alt (:obj:`str`): alternate/variant allele at that position
+		person (:obj:`Person`): the person the variant belongs to
+	A Variant either holds its own values or is a view of one row of a VariantTable.
 	'''
 
+	__slots__ = ("_table","_row","_values")
+
 	## default chromosome sizes based on hg38
 	_chrom_sizes = {'chr1': 248956422, 
 	 'chr10': 133797422,
@@ -216,11 +2952,65 @@ class Variant(object):
 				assert ref in ["A","C","T","G"], "ref allele must be in A,C,T,G"          
 			if person!=None:
 				assert isinstance(person,Person), "person must be of Person() class, got type" % type(person)
-		self.chrom = chrom
-		self.pos = pos
-		self.ref = ref.upper() if ref != None else None
-		self.alt = alt.upper()
-		self.person = person if person != None else None
+		self._table = None #set once the variant is stored in a VariantTable
+		self._row = None
+		self._values = [chrom, pos, ref.upper() if ref != None else None, alt.upper(), person]
+
+	@classmethod
+	def _view(cls,table,row):
+		'''a Variant that reads its attributes from row `row` of a VariantTable'''
+		variant = cls.__new__(cls)
+		variant._table = table
+		variant._row = row
+		variant._values = None
+		return variant
+
+	def _bind(self,table,row):
+		'''move this Variant's attributes into row `row` of a VariantTable'''
+		self._table = table
+		self._row = row
+		self._values = None
+
+	def _get(self,column):
+		if self._table is None:
+			return self._values[VariantTable._columns.index(column)]
+		return self._table.value(column,self._row)
+
+	@property
+	def chrom(self):
+		return self._get("chrom")
+
+	@property
+	def pos(self):
+		return self._get("pos")
+
+	@property
+	def ref(self):
+		return self._get("ref")
+
+	@property
+	def alt(self):
+		return self._get("alt")
+
+	@property
+	def person(self):
+		return self._get("person")
+
+	@person.setter
+	def person(self,person):
+		if self._table is None:
+			self._values[4] = person
+		else:
+			self._table.set_person(self._row,person)
+
+	def __eq__(self,other):
+		if isinstance(other,Variant) and self._table is not None:
+			return (self._table is other._table) and (self._row == other._row)
+		return self is other
+
+	def __hash__(self):
+		#from the values that never change, so a Variant keeps its hash when it is stored or removed
+		return hash((self.chrom,self.pos,self.ref,self.alt))
 
 	def __repr__(self):
 		'''A representation of a Variant object'''
@@ -241,6 +3031,8 @@ class Person(object):
 		father (:obj:`Person`): a person's father
 		children (:obj:`set` of `Person`): a person's children
 		variants (:obj:`list` of :obj:`Variant`s, optional): variants associated with the person
+		generation (:obj:`int`): length of the longest line of known ancestors above this person,
+			0 for founders; kept up to date whenever mother or father changes
 	"""
 
 	# default gender types
@@ -248,6 +3040,14 @@ class Person(object):
 		"M":"male","m":"male","male":"male",
 		"F":"female","f":"female","female":"female"
 		}
+	# a person stores their gender as an index into this shared table
+	_gender_names = ("male","female")
+	_gender_codes = {"M":0,"m":0,"male":0,"F":1,"f":1,"female":1}
+
+	# no per-person __dict__; children and variants stay None until first used, so the many
+	# people without children or variants do not each hold an empty set and list. _graph is the
+	# PedigreeGraph of the Pedigree holding this person, which parent changes are written to
+	__slots__ = ("name","_gender","_mother","_father","_children","_variants","generation","_graph")
 
 	def __init__(self, name, gender,mother=None, father=None, variants=None, children=None, sanity=True):
 		""" Create a Person instance
@@ -273,14 +3073,14 @@ class Person(object):
 					assert isinstance(v,Variant),"variants must each be of type Variant(), not type %s for variant %s"%(type(v),str(v))
 			if mother != None:
 				assert isinstance(mother,Person),"mother must be a Person(), not type %s"%type(mother)
-				assert mother not in self.children,"mother must not also belong to Person's children, Person %s" % str(mother)
+				assert children == None or mother not in children,"mother must not also belong to Person's children, Person %s" % str(mother)
 			if father != None:
 				assert isinstance(father,Person),"father must be a Person(), not type %s"%type(mother)
-				assert father not in self.children,"father must not also belong to Person's children, Person %s" % str(father)
+				assert children == None or father not in children,"father must not also belong to Person's children, Person %s" % str(father)
 			if children != None:
 				assert isinstance(children,set),"children passed at init must be enclosed in a set, not type %s"%type(children)
-				assert self.mother not in children,"attempt to set child equal to Person's mother, mother %s" % str(self.mother)
-				assert self.father not in children,"attempt to set child equal to Person's father, father %s" % str(self.father)
+				assert mother == None or mother not in children,"attempt to set child equal to Person's mother, mother %s" % str(mother)
+				assert father == None or father not in children,"attempt to set child equal to Person's father, father %s" % str(father)
 				for a in children:
 					assert isinstance(a,Person),"child %s passed in children is not of type Person (got type %s)" % (str(a),type(a))
 			if (mother != None)&(children != None):
@@ -291,15 +3091,17 @@ class Person(object):
 				#TODO: do some recursive matching to make sure you have a DAG
 		
 		self.name = name
-		self.gender = self._genders[gender] #already checked that it exists here
+		self._gender = self._gender_codes[gender] #already checked that it exists here
 
-		self.mother = None
-		self.father = None
-		self.set_mother(mother)
-		self.set_father(father)
-		self.children = children if children != None else set()
+		self._children = children
+		self.generation = 0
+		self._graph = None
+		self._mother = None
+		self._father = None
+		if mother != None: self.set_mother(mother)
+		if father != None: self.set_father(father)
 
-		self.variants = list()
+		self._variants = None #a VariantList indexed by (chrom, pos), made on first use
 		if variants != None: self.add_variants(variants) 
 
 	def __repr__(self):
@@ -330,21 +3132,108 @@ class Person(object):
 		return person.name
 
 
+	@property
+	def gender(self):
+		return self._gender_names[self._gender]
+
+	@gender.setter
+	def gender(self,gender):
+		assert gender in self._gender_codes,"gender must be one of %s" % str(self._genders.keys())
+		self._gender = self._gender_codes[gender]
+
+	@property
+	def children(self):
+		if self._children is None: self._children = set()
+		return self._children
+
+	@children.setter
+	def children(self,children):
+		self._children = children
+
+	@property
+	def variants(self):
+		if self._variants is None: self._variants = VariantList()
+		return self._variants
+
+	@variants.setter
+	def variants(self,variants):
+		self._variants = variants
+
+	@property
+	def mother(self):
+		return self._mother
+
+	@mother.setter
+	def mother(self,mother):
+		self._set_parent("_mother",mother)
+
+	@property
+	def father(self):
+		return self._father
+
+	@father.setter
+	def father(self,father):
+		self._set_parent("_father",father)
+
+	def _set_parent(self,attribute,parent):
+		'''sets a parent reference and updates the generations below it, and the parent arrays of
+		the Pedigree's graph if this person is in one; a parent may not be this person or one of
+		their descendants, nor, for a person in a Pedigree, someone from outside it'''
+		if parent != None:
+			if self._has_descendant(parent):
+				raise AssertionError("the pedigree is not a DAG. %s is a descendant of %s" % (parent.name,self.name))
+			if self._graph is not None and parent._graph is not self._graph:
+				raise AssertionError("%s and %s are not in the same Pedigree" % (parent.name,self.name))
+		setattr(self,attribute,parent)
+		self._update_generation()
+		if self._graph is not None:
+			graph = self._graph
+			graph.set_parent(graph.ids[self.name],attribute[1:],graph.ids[parent.name] if parent != None else -1)
+
+	def _has_descendant(self,person):
+		'''True if person is this person or one of their descendants. Descendants have a larger
+		generation than their ancestors, so branches already at person's generation are skipped.'''
+		stack = [self]
+		while stack:
+			current = stack.pop()
+			if current is person:
+				return True
+			if current.generation < person.generation:
+				stack.extend(current._children or ())
+		return False
+
+	def _update_generation(self):
+		'''recompute this person's generation from their parents, then their descendants' generations'''
+		stack = [self]
+		while stack:
+			person = stack.pop()
+			parents = [p for p in (person.mother,person.father) if p is not None]
+			generation = 1+max(p.generation for p in parents) if parents else 0
+			if generation != person.generation:
+				person.generation = generation
+				stack.extend(person._children or ())
+
+	def is_founder(self):
+		'''True if neither parent is known'''
+		return self.mother is None and self.father is None
+
 	def set_mother(self,mother):
 		'''sets the mother of this person using a Person() object, modifying the child in the mothers if necessary'''
 		if mother != None:
 			assert isinstance(mother, Person), "mother should be set to a Person object, not %s" % type(mother)
-			if self.mother != None: self.mother.children.remove(self)
-			mother.children.add(self)
+			previous = self.mother
 			self.mother = mother
+			if previous != None: previous.children.remove(self)
+			mother.children.add(self)
 
 	def set_father(self,father):
 		'''sets the father of this person using a Person() object, modifying the child in the fathers if necessary'''
 		if father != None:
 			assert isinstance(father, Person), "father should be set to a Person object, not %s" % type(father)
-			if self.father != None: self.father.children.remove(self)
-			father.children.add(self)
+			previous = self.father
 			self.father = father
+			if previous != None: previous.children.remove(self)
+			father.children.add(self)
 
 	def remove_mother(self):
 		'''remove the mother-child relationship in this object and the mother'''
@@ -361,9 +3250,9 @@ class Person(object):
 	def add_variant(self,variant):
 		'''add a variant to this person's variants, checking at runtime that it has a unique chrom and pos.'''
 		assert isinstance(variant,Variant), "input variant must be type Variant, not %s" % type(variant)
+		if self.has_variant(variant.chrom,variant.pos):
+			raise AssertionError("variant already exists at %s:%d"%(variant.chrom,variant.pos))
 		variant.person = self
-		variant_positions = [(v.chrom,v.pos) for v in self.variants if v != None]
-		assert (variant.chrom, variant.pos) not in variant_positions, "variant already exists at %s:%d"%(variant.chrom,variant.pos) # sanity check
 		self.variants.append(variant)
 		return None
 
@@ -377,9 +3266,18 @@ class Person(object):
 	def remove_variant(self,variant):
 		'''find and remove a particular Variant from the person.'''
 		assert isinstance(variant,Variant), "input variant must be type Variant, not %s" % type(variant)
-		self.variant.person = None
-		if variant in self.variants:
-			self.variants.pop(variant)
+		if variant.person is self and self.get_variant(variant.chrom,variant.pos) == variant:
+			self.variants.remove(variant)
+			variant.person = None
+		return None
+
+	def get_variant(self,chrom,pos):
+		'''return this person's Variant at chrom:pos, or None if they have none there'''
+		return self.variants.get(chrom,pos)
+
+	def has_variant(self,chrom,pos):
+		'''True if this person has a variant at chrom:pos'''
+		return self.variants.get(chrom,pos) is not None
 
 	def list_variants(self):
 		'''return a list() of variants from this person'''
@@ -389,15 +3287,15 @@ class Person(object):
 		'''return full-siblings only of this person'''
 		mother_children = self.mother.children if self.mother else set()
 		father_children = self.father.children if self.father else set()
-		return mother_chldren.intersection(father_children)
+		return mother_children.intersection(father_children).difference([self])
 
 	def half_siblings(self):
 		'''return half-siblings only of this person'''
 		mother_children = self.mother.children if self.mother else set()
 		father_children = self.father.children if self.father else set()
-		mother_half = mother_chldren.difference(father_children)
+		mother_half = mother_children.difference(father_children)
 		father_half = father_children.difference(mother_children)
-		return father_half.union(mother_half)
+		return father_half.union(mother_half).difference([self])
 
 	# TODO: EXTRA CREDIT: can a cycle in the ancestry graph create an infinite loop?
 	# if so, avoid this problem.
@@ -460,35 +3358,12 @@ class Person(object):
 		Raises:
 			:obj:`ValueError`: if `max_depth` < `min_depth`
 		"""
-		if max_depth is not None:
-			if max_depth < min_depth:
-					raise ValueError("max_depth ({}) cannot be less than min_depth ({})".format(
-						max_depth, min_depth))
-		else:
-			max_depth = min_depth # just collect one
-
-		collected_descendants = set()
-		return self._descendants(collected_descendants, min_depth, max_depth)
+		return set(self.iter_descendants(min_depth,max_depth))
 
-	def _descendants(self, collected_descendants, min_depth, max_depth):
-		""" Obtain this person's descendants who lie within the generational depth [min_depth, max_depth]
-		This is a private, recursive method that recurses through the descendants via children references.
-		Args:
-			collected_descendants (:obj:`set`): descendants collected thus far by this method
-			min_depth (:obj:`int`): see `descendants()`
-			max_depth (:obj:`int`): see `descendants()`
-		Returns:
-			:obj:`set` of `Person`: this person's descendants
-		Raises:
-			:obj:`ValueError`: if `max_depth` < `min_depth`
-		"""
-		assert self not in collected_descendants, "the pedigree is not a DAG. self is descendant of self."
-		if min_depth <= 0:
-			collected_descendants.add(self)
-		if 0 < max_depth:
-			for child in self.children:
-				child._descendants(collected_descendants, min_depth-1, max_depth-1)
-		return collected_descendants
+	def iter_descendants(self, min_depth=1, max_depth=None):
+		'''lazily generates the descendants that descendants() would return, nearest generations first'''
+		max_depth = self._check_depths(min_depth,max_depth)
+		return self._traverse(lambda person: person._children or (),min_depth,max_depth)
 
 	def ancestors(self, min_depth=1, max_depth=None):
 		""" Return this person's ancestors within a generational depth range
@@ -507,36 +3382,54 @@ class Person(object):
 		Raises:
 			:obj:`ValueError`: if `max_depth` < `min_depth`
 		"""
-		assert self not in collected_ancestors, "the pedigree is not a DAG. self is ancestor of self."
-		if max_depth is not None:
-			if max_depth < min_depth:
-					raise ValueError("max_depth ({}) cannot be less than min_depth ({})".format(
-						max_depth, min_depth))
-		else:
-			# collect just one depth
-			max_depth = min_depth
-		collected_ancestors = set()
-		return self._ancestors(collected_ancestors, min_depth, max_depth)
-
-	def _ancestors(self, collected_ancestors, min_depth, max_depth):
-		""" Obtain this person's ancestors who lie within the generational depth [min_depth, max_depth]
-		This is a private, recursive method that recurses through the ancestry via parent references.
+		return set(self.iter_ancestors(min_depth,max_depth))
+
+	def iter_ancestors(self, min_depth=1, max_depth=None):
+		'''lazily generates the ancestors that ancestors() would return, nearest generations first'''
+		max_depth = self._check_depths(min_depth,max_depth)
+		# a person whose generation is below the depth still needed has no ancestors that deep
+		return self._traverse(lambda person: [p for p in (person.mother,person.father) if p is not None],
+							  min_depth,max_depth,
+							  keep=lambda person,depth: depth+person.generation >= min_depth)
+
+	@staticmethod
+	def _check_depths(min_depth,max_depth):
+		'''returns max_depth, which defaults to min_depth; raises ValueError if max_depth < min_depth'''
+		if max_depth is None:
+			return min_depth # just collect one
+		if max_depth < min_depth:
+			raise ValueError("max_depth ({}) cannot be less than min_depth ({})".format(
+				max_depth, min_depth))
+		return max_depth
+
+	def _traverse(self,relatives,min_depth,max_depth,keep=None):
+		""" Walk breadth-first from this person, yielding relatives within [min_depth, max_depth]
+		The frontier at each depth is every person reachable by a path of exactly that length, so a
+		relative reached along many paths is expanded once per depth rather than once per path, and
+		deep lineages do not recurse.
 		Args:
-			collected_ancestors (:obj:`set`): ancestors collected thus far by this method
-			min_depth (:obj:`int`): see `ancestors()`
-			max_depth (:obj:`int`): see `ancestors()`
-		Returns:
-			:obj:`set` of `Person`: this person's ancestors
-		Raises:
-			:obj:`ValueError`: if `max_depth` < `min_depth`
+			relatives (:obj:`function`): maps a person to the next people out, e.g. their parents
+			min_depth (:obj:`int`): the minimum depth to yield
+			max_depth (:obj:`int`): the maximum depth to yield; may be infinite
+			keep (:obj:`function`, optional): keep(person, depth) is False when nothing in range can
+				be reached through person at depth; that branch is dropped
+		Yields:
+			:obj:`Person`: each relative in range once, in order of depth
 		"""
-		if min_depth <= 0:
-			collected_ancestors.add(self)
-		if 0 < max_depth:
-			for parent in [self.mother, self.father]:
-				if parent is not None:
-					parent._ancestors(collected_ancestors, min_depth-1, max_depth-1)
-		return collected_ancestors
+		yielded = set()
+		frontier = {self}
+		depth = 0
+		while frontier:
+			if keep is not None:
+				frontier = {person for person in frontier if keep(person,depth)}
+			if min_depth <= depth:
+				for person in frontier-yielded:
+					yielded.add(person)
+					yield person
+			if max_depth <= depth:
+				return
+			frontier = {relative for person in frontier for relative in relatives(person)}
+			depth += 1
 
 	def parents(self):
 		''' Provide this person's parents
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+# Benchmarks loading a Pedigree from files: memory and time per person and per variant.
+# Person construction on its own is measured by assignments/7/solutions/benchmark_person.py.
+# Run with `python assignment4_benchmark.py [number of people]`; exits non-zero if a target is missed.
+
+from assignment4 import *
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# load_people() keeps a Person, its PersonVariants view, a people dict entry, the parsed name
+# and a row of the PedigreeGraph arrays for everyone
+BYTES_PER_PERSON = 800
+MICROSECONDS_PER_PERSON = 40
+# a bulk-loaded variant is one row of the VariantTable columns and one int64 key and row in the key index
+BYTES_PER_VARIANT = 64
+MICROSECONDS_PER_VARIANT = 8
+VARIANTS_PER_PERSON = 10
+GENERATION = 1000 #people per generation; parents are a random couple of the generation before
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+def load_people(pedigree):
+	pedigree.load_people(people_path)
+	return pedigree
+
+def load_variants(pedigree):
+	pedigree.load_variants(variants_path,bulk=True)
+	return pedigree.variants
+
+def measure(setup,load):
+	'''(bytes kept, seconds) of load(setup()); timed without tracemalloc, which slows allocation down'''
+	arg = setup()
+	start = time.perf_counter()
+	load(arg)
+	seconds = time.perf_counter()-start
+	arg = setup()
+	tracemalloc.start()
+	kept = load(arg)
+	size = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	return size,seconds
+
+with tempfile.TemporaryDirectory() as directory: #the files are deleted once measured
+	random.seed(0)
+	people_path = os.path.join(directory,"people.txt")
+	with open(people_path,"w") as f:
+		f.write("name\tgender\tfather_name\tmother_name\n")
+		for i in range(n):
+			if i < GENERATION:
+				f.write("person%d\t%s\t\t\n" % (i,"MF"[i%2]))
+				continue
+			father = (i//GENERATION-1)*GENERATION+2*random.randrange(GENERATION//2)
+			f.write("person%d\t%s\tperson%d\tperson%d\n" % (i,"MF"[i%2],father,father+1))
+	variants_path = os.path.join(directory,"variants.txt")
+	with open(variants_path,"w") as f:
+		f.write("chrom\tpos\tref\talt\tperson\n")
+		for i in range(n):
+			for pos in random.sample(range(1000000),VARIANTS_PER_PERSON):
+				f.write("chr1\t%d\tA\t%s\tperson%d\n" % (pos,random.choice("CGT"),i))
+
+	size,seconds = measure(Pedigree,load_people)
+	person_size,person_time = size/n,seconds/n*1e6
+	size,seconds = measure(lambda: load_people(Pedigree()),load_variants)
+	variant_size,variant_time = size/(n*VARIANTS_PER_PERSON),seconds/(n*VARIANTS_PER_PERSON)*1e6
+
+print("%d people: %.0f bytes/person (target %d), %.2f us/person to load (target %d)" % (
+	n,person_size,BYTES_PER_PERSON,person_time,MICROSECONDS_PER_PERSON))
+print("%d variants: %.0f bytes/variant (target %d), %.2f us/variant to bulk load (target %d)" % (
+	n*VARIANTS_PER_PERSON,variant_size,BYTES_PER_VARIANT,variant_time,MICROSECONDS_PER_VARIANT))
+if person_size > BYTES_PER_PERSON or person_time > MICROSECONDS_PER_PERSON or \
+   variant_size > BYTES_PER_VARIANT or variant_time > MICROSECONDS_PER_VARIANT:
+	sys.exit("target missed")
@@ -2,6 +2,8 @@
 
 from assignment4 import *
 import copy
+import os
+import tempfile
 
 print("TESTING...")
 print("Checking with normal well formatted input...")
@@ -56,6 +58,29 @@ try:
 except AssertionError as msg:
 	print("caught exception %s" % str(msg).replace("\t",""))
 
+print("")
+print("Checking the pedigree graph...")
+test = Pedigree()
+test.load_people("ryan_pedigree.txt")
+order = [test.graph.names[i] for i in test.graph.order]
+assert all(order.index(parent) < order.index(child) for parent,child in test.graph.edges()), "parents must come before children"
+assert sorted(test.graph.names[i] for i in test.graph.children_of([test.graph.ids["Ben"]])) == ["Daryl","David","Norman","Sheila"]
+assert sorted(test.to_networkx().edges()) == sorted(test.graph.edges())
+#the parent arrays are the parentage; children, order and relationships follow a change to them
+graph = PedigreeGraph(test.graph.names,test.graph.mother.copy(),test.graph.father.copy())
+laura,ryan = graph.ids["Laura"],graph.ids["Ryan"]
+father = graph.father[laura]
+ids,kinship = graph.kinship()
+before = kinship[list(ids).index(ryan),list(ids).index(laura)]
+graph.set_parent(laura,"father",-1)
+assert laura not in graph.children_of([father]) and not graph.founder[laura]
+assert graph.relationships().relationship(ryan,laura)[0] == "half-sibling"
+ids,kinship = graph.kinship()
+assert kinship[list(ids).index(ryan),list(ids).index(laura)] == before/2
+graph.set_parent(graph.ids["Ben"],"father",ryan)
+assert graph.order is None, "a cycle leaves no topological order"
+print("Graph works!")
+
 print("")
 print("All people DB tests passed.")
 print("Checking variants DB tests...")
@@ -111,5 +136,623 @@ try:
 except AssertionError as msg:
 	print("caught exception %s" % str(msg).replace("\t",""))
 
+print("")
+print("Checking bulk variant loading...")
+test2 = copy.deepcopy(test)
+test2.load_variants("test_variants.txt",bulk=True)
+assert len(test2.variants) == 4, "bulk load should store every variant"
+assert list(test2.variants.to_frame()["person"]) == ["Ryan","Laura","Ryan","Ryan"]
+assert [(v.chrom,v.pos,v.ref,v.alt) for v in test2.people["Ryan"].variants] == [("chr1",3000,"A","T"),("chr4",5000,"T","A"),("chr4",5001,"T","C")]
+assert all(v.person is test2.people["Ryan"] for v in test2.people["Ryan"].variants)
+print("Bulk input works!")
+
+print("Checking the variant table matches row-by-row loading...")
+test3 = copy.deepcopy(test)
+test3.load_variants("test_variants.txt")
+assert test3.variants.to_frame().equals(test2.variants.to_frame()), "bulk and row-by-row loads should store the same variants"
+assert len(test3.people["Laura"].variants) == 1
+variant = test3.people["Laura"].variants[0]
+assert variant in test3.variants and variant.person is test3.people["Laura"]
+
+print("Checking per-person variant lookups...")
+ryan = test3.people["Ryan"]
+assert ryan.has_variant("chr4",5001) and not ryan.has_variant("chr4",5002)
+variant = ryan.get_variant("chr4",5000)
+assert (variant.ref,variant.alt) == ("T","A")
+ryan.remove_variant(variant)
+assert ryan.get_variant("chr4",5000) is None and variant.person is None
+assert len(ryan.variants) == 2 and len(test3.variants) == 3
+seen = {variant}
+ryan.add_variant(variant)
+assert ryan.has_variant("chr4",5000) and len(test3.variants) == 4
+#a Variant keeps its hash when it is stored, so sets made before still find it, as do its views
+assert variant in seen and ryan.get_variant("chr4",5000) in seen
+try:
+	ryan.add_variant(Variant("chr4",5000,"G"))
+	raise Exception("TEST FAILED")
+except AssertionError as msg:
+	print("caught exception %s" % str(msg).replace("\t",""))
+laura = test3.people["Laura"]
+laura.add_variant(ryan.get_variant("chr1",3000)) #move a stored variant to another person
+assert not ryan.has_variant("chr1",3000) and laura.get_variant("chr1",3000).person is laura
+assert len(ryan.variants) == 2 and len(laura.variants) == 2 and len(test3.variants) == 4
+try:
+	laura.add_variant(Variant("chr1",3000,"G"))
+	raise Exception("TEST FAILED")
+except AssertionError as msg:
+	print("caught exception %s" % str(msg).replace("\t",""))
+lily = test3.people["Lily"]
+lily.add_variant(Variant("chr2",4000,"T",ref="C"))
+try:
+	laura.get_variant("chr2",4000).person = lily #Lily already has a variant there
+	raise Exception("TEST FAILED")
+except AssertionError as msg:
+	print("caught exception %s" % str(msg).replace("\t",""))
+assert laura.has_variant("chr2",4000) and len(test3.variants) == 5
+lily.remove_variant(lily.get_variant("chr2",4000))
+laura.get_variant("chr1",3000).person = ryan #and back again
+assert ryan.has_variant("chr1",3000) and not laura.has_variant("chr1",3000)
+#len() reads running per-person counts, so adding between calls does not rebuild the index
+for pos in range(7000,7010):
+	ryan.add_variant(Variant("chr4",pos,"G"))
+	assert len(ryan.variants) == pos-6996 and test3.variants.sites.people_stale
+for person in test3.people.values():
+	assert len(person.variants) == len(list(person.variants))
+for pos in range(7000,7010):
+	ryan.remove_variant(ryan.get_variant("chr4",pos))
+assert len(ryan.variants) == 3 == len(list(ryan.variants))
+#the key index is sorted int64 arrays; removed, moved and truncated rows are skipped until the next merge
+table = VariantTable(chroms=["chr1"])
+code = table.person_code(ryan)
+table.extend_codes({"chrom":np.zeros(2000,dtype=np.uint8),"pos":np.arange(2000,dtype=np.uint32),
+					"ref":np.zeros(2000,dtype=np.uint8),"alt":np.ones(2000,dtype=np.uint8),"person":np.full(2000,code,dtype=np.int32)})
+assert table.index.keys.dtype == np.int64 and len(table.index.keys) == 2000
+table.remove(table[5])
+table.set_person(6,None)
+row = table.add(Variant("chr1",5,"C"),person=ryan)
+assert table.find(ryan,"chr1",5) == row and table.find(ryan,"chr1",6) is None and table.find(ryan,"chr1",7) == 7
+assert table.duplicates(VariantTable._keys([code,code,-1],[0,0,0],[5,6,6])).tolist() == [True,False,True]
+table.truncate(1000)
+assert table.find(ryan,"chr1",5) is None and table.find(ryan,"chr1",999) == 999 and table.find(ryan,"chr1",1500) is None
+table.extend_codes({"chrom":np.zeros(1,dtype=np.uint8),"pos":np.array([1500],dtype=np.uint32),
+					"ref":np.zeros(1,dtype=np.uint8),"alt":np.ones(1,dtype=np.uint8),"person":np.full(1,code,dtype=np.int32)})
+assert table.find(ryan,"chr1",1500) == 1000 and table.duplicates(table.keys()).all() and len(table.index.keys) == 1000
+print("Lookups work!")
+
+print("Checking region queries...")
+assert [(v.pos,v.person.name) for v in test3.variants_in_region("chr4",0,6000)] == [(5000,"Ryan"),(5001,"Ryan")]
+assert [v.pos for v in test3.variants_in_region("chr4",5001,5002)] == [5001]
+assert test3.variants_in_region("chr4",5002,6000) == [] and test3.variants_in_region("chrX",0,10) == []
+assert [v.pos for v in test3.nearest_variants("chr4",4000)] == [5000]
+hits = test3.query_regions([("chr1",0,10000),("chr4",5000,5001),("chr2",0,10)])
+assert list(hits["region"]) == [0,1] and list(hits["pos"]) == [3000,5000]
+test3.people["Laura"].add_variant(Variant("chr4",4999,"G"))
+assert [v.person.name for v in test3.variants_in_region("chr4",0,6000)] == ["Laura","Ryan","Ryan"]
+print("Region queries work!")
+
+print("Checking streamed variant loading...")
+for chunksize in [1,3]:
+	test4 = copy.deepcopy(test)
+	test4.load_variants("test_variants.txt",bulk=True,chunksize=chunksize)
+	assert test4.variants.to_frame().equals(test2.variants.to_frame()), "streamed and whole-file loads should store the same variants"
+test4 = copy.deepcopy(test)
+test4.load_variants("test_variants.txt",max_memory=10)
+assert len(test4.variants) == 4
+#the first chunk is sized from max_memory too, not read at a fixed number of rows
+sizes = [len(chunk) for offset,chunk in test._read_variant_chunks("test_variants.txt",True,None,10)]
+assert sizes == [1,1,1,1], sizes
+sizes = [len(chunk) for offset,chunk in test._read_variant_chunks("test_variants.txt",True,None,4*Pedigree._variant_row_bytes*3)]
+assert sizes[0] == 3 and sum(sizes) == 4, sizes
+print("\nredundant position across chunks")
+try:
+	test4 = copy.deepcopy(test)
+	test4.load_variants("test_variants_redundantpos.txt",bulk=True,chunksize=3)
+	raise Exception("TEST FAILED")
+except AssertionError as msg:
+	print("caught exception %s" % str(msg).replace("\t",""))
+assert len(test4.variants) == 0, "a failed load should not leave earlier chunks behind"
+print("Streaming works!")
+
+print("Checking multi-file variant loading...")
+test5 = copy.deepcopy(test)
+test5.load_variants_many(["test_variants.txt"],workers=2)
+assert test5.variants.to_frame().equals(test2.variants.to_frame()), "pooled and single-file loads should store the same variants"
+print("\nsame file twice")
+try:
+	test5 = copy.deepcopy(test)
+	test5.load_variants_many(["test_variants.txt","test_variants.txt"],workers=1)
+	raise Exception("TEST FAILED")
+except AssertionError as msg:
+	print("caught exception %s" % str(msg).replace("\t",""))
+	assert "record 1 in test_variants.txt" in str(msg)
+assert len(test5.variants) == 0, "a failed multi-file load should add nothing"
+print("\nperson not in db, in a worker")
+try:
+	test5.load_variants_many(["test_variants.txt","test_variants_personnotindataset.txt"],workers=2)
+	raise Exception("TEST FAILED")
+except AssertionError as msg:
+	print("caught exception %s" % str(msg).replace("\t",""))
+print("Multi-file loading works!")
+
+print("Checking VCF loading...")
+for filename in ["test_variants.vcf","test_variants.vcf.gz"]:
+	test6 = copy.deepcopy(test)
+	test6.load_vcf(filename)
+	assert len(test6.variants) == 6, "reference calls, no-calls and indels should be skipped"
+	assert [(v.chrom,v.pos,v.alt) for v in test6.people["Lily"].variants] == [("chr4",5000,"C"),("chr7",117000000,"A")]
+for index in ["test_variants.vcf.gz.tbi","test_variants.vcf.gz.csi"]:
+	test6 = copy.deepcopy(test)
+	test6.load_vcf("test_variants.vcf.gz",regions=[("chr4",5001,6000),("chr7",116000000,118000000)],index=index)
+	assert [(v.chrom,v.pos,v.person.name) for v in test6.variants] == [("chr4",5001,"Ryan"),("chr7",117000000,"Lily")]
+test6 = copy.deepcopy(test)
+test6.load_vcf("test_variants.vcf",samples={"Ryan":"Laura"})
+assert [v.pos for v in test6.people["Laura"].variants] == [3000,5000,5001] and len(test6.variants) == 3
+print("\nVCF sample not in db")
+try:
+	test6 = copy.deepcopy(test)
+	test6.load_vcf("test_variants.vcf",samples={"Ryan":"Bob"})
+	raise Exception("TEST FAILED")
+except AssertionError as msg:
+	print("caught exception %s" % str(msg).replace("\t",""))
+print("VCF loading works!")
+
+print("Checking snapshots...")
+with tempfile.TemporaryDirectory() as directory:
+	snapshot = os.path.join(directory,"pedigree.snap")
+	test6 = copy.deepcopy(test)
+	test6.load_vcf("test_variants.vcf")
+	test6.save(snapshot)
+	test7 = Pedigree.open(snapshot)
+	assert test7.variants.to_frame().equals(test6.variants.to_frame()), "a reopened snapshot should hold the same variants"
+	assert sorted(test7.graph.edges()) == sorted(test6.graph.edges())
+	assert test7.people["Ryan"].mother is test7.people["Lily"] and test7.people["Ryan"] in test7.people["Daryl"].children
+	assert [v.pos for v in test7.variants_in_region("chr4",0,6000)] == [5000,5000,5001]
+	test7.people["Ryan"].remove_variant(test7.people["Ryan"].get_variant("chr4",5000))
+	test7.people["Ryan"].add_variant(Variant("chr9",1,"A"))
+	assert len(test7.variants) == 6 and len(Pedigree.open(snapshot).variants) == 6
+	assert Pedigree.open(snapshot).people["Ryan"].has_variant("chr4",5000), "changes after open() should not reach the file"
+print("Snapshots work!")
+
+print("Checking generations...")
+test8 = copy.deepcopy(test)
+assert test8.people["Ryan"].generation == 2 and test8.people["Lily"].generation == 1 and test8.people["Simin"].generation == 0
+assert test8.graph.generation[test8.graph.ids["Ryan"]] == 2 and test8.graph.founder[test8.graph.ids["Ben"]]
+assert test8.graph.rank[test8.graph.ids["Lily"]] < test8.graph.rank[test8.graph.ids["Ryan"]]
+assert test8.people["Ben"].is_founder() and not test8.people["Laura"].is_founder()
+assert test8.people["Ryan"].all_ancestors() == {test8.people[n] for n in ["Lily","Daryl","Simin","Akbar","Alice Gayle","Ben"]}
+assert test8.people["Ryan"].ancestors(3,float('inf')) == set(), "no line of ancestors is 3 generations long"
+assert [p.generation for p in test8.topological_order(["Ryan","Ben","Lily"])] == [0,1,2]
+try:
+	test8.people["Simin"].set_mother(Person("Eve","F")) #not in the Pedigree, so not in its graph
+	raise Exception("TEST FAILED")
+except AssertionError as msg:
+	print("caught exception %s" % str(msg).replace("\t",""))
+test8.extend_people([("Eve","F",None,None)])
+test8.people["Simin"].set_mother(test8.people["Eve"])
+assert test8.people["Lily"].generation == 2 and test8.people["Ryan"].generation == 3
+assert test8.people["Ryan"].ancestors(3) == {test8.people["Simin"].mother}
+graph = test8.graph #parent changes reach the graph, and what is derived from it
+assert graph.mother[graph.ids["Simin"]] == graph.ids["Eve"] and not graph.founder[graph.ids["Simin"]]
+assert graph.generation[graph.ids["Ryan"]] == 3 and graph.rank[graph.ids["Eve"]] < graph.rank[graph.ids["Simin"]]
+assert test8.relationship("Eve","Lily") == "grandchild"
+test8.people["Simin"].remove_mother()
+assert test8.people["Ryan"].generation == 2 and graph.generation[graph.ids["Ryan"]] == 2 and graph.founder[graph.ids["Simin"]]
+assert test8.relationship("Eve","Lily") == "unrelated"
+kinship = test8.kinship()
+test8.people["Laura"].remove_father()
+assert test8.kinship().loc["Ryan","Laura"] == kinship.loc["Ryan","Laura"]/2
+assert test8.relationship("Ryan","Laura") == "half-sibling"
+try:
+	test8.people["Ben"].set_father(test8.people["Ryan"])
+	raise Exception("TEST FAILED")
+except AssertionError as msg:
+	print("caught exception %s" % str(msg).replace("\t",""))
+assert test8.people["Ben"].father is None and test8.people["Ben"].generation == 0
+print("Generations work!")
+
+print("Checking ancestor and descendant traversal...")
+test9 = copy.deepcopy(test)
+ancestors = test9.people["Ryan"].iter_ancestors(1,float('inf'))
+assert next(ancestors) in {test9.people["Lily"],test9.people["Daryl"]}
+assert len(list(ancestors)) == 5
+assert test9.people["Ben"].descendants(1,2) == {test9.people[n] for n in ["Daryl","Norman","David","Sheila","Ryan","Laura"]}
+assert test9.people["Ben"].descendants(2) == {test9.people["Ryan"],test9.people["Laura"]}
+assert test9.people["Ryan"].all_grandparents() == {test9.people[n] for n in ["Simin","Akbar","Alice Gayle","Ben"]}
+try:
+	test9.people["Ryan"].ancestors(2,1)
+	raise Exception("TEST FAILED")
+except ValueError as msg:
+	print("caught exception %s" % str(msg))
+print("Traversal works!")
+
+print("Checking kinship...")
+kinship = test.kinship()
+assert kinship.loc["Ryan","Laura"] == 0.25 and kinship.loc["Ryan","Norman"] == 0.125 and kinship.loc["Lily","Daryl"] == 0
+assert (np.diag(kinship.to_numpy()) == 0.5).all() and (kinship.to_numpy() == kinship.to_numpy().T).all()
+assert test.kinship(["Laura","Ryan"]).to_numpy().tolist() == [[0.5,0.25],[0.25,0.5]]
+assert len(test.kinship(sparse=True)) == np.count_nonzero(np.triu(kinship.to_numpy()))
+assert test.kinship_pairs([("Ryan","Laura"),("Sheila","Laura")]).tolist() == [0.25,0.125]
+assert (test.inbreeding() == 0).all()
+# the child of two full siblings
+graph = PedigreeGraph(["mom","dad","sister","brother","child"],[-1,-1,0,0,2],[-1,-1,1,1,3])
+ids,matrix = graph.kinship([4])
+assert matrix[-1,-1] == 0.625 and matrix[-2,-3] == 0.25, "the child is inbred with F = 0.25"
+print("Kinship works!")
+
+print("Checking relationships...")
+assert test.relationship("Ryan","Laura") == "sibling" and test.meiotic_distance("Ryan","Laura") == 2
+assert test.relationship("Ryan","Norman") == "aunt/uncle" and test.relationship("Norman","Ryan") == "niece/nephew"
+assert test.relationship("Ben","Ryan") == "grandchild" and test.relationship("Lily","Daryl") == "unrelated"
+assert test.meiotic_distance("Lily","Daryl") is None
+family = test.family_relationships(["Ryan","Laura","Simin"])
+assert family["relationship"].tolist() == ["sibling","grandparent","grandparent"]
+assert test.people["Ryan"].siblings() == {test.people["Laura"]} and test.people["Ryan"].half_siblings() == set()
+graph = PedigreeGraph(["gm","gf","aunt","dad","mom","inlaw","me","cousin","cousin kid","wife","half sib"],
+					  [-1,-1,0,0,-1,-1,4,2,7,-1,9],[-1,-1,1,1,-1,-1,3,5,-1,-1,3])
+index = graph.relationships()
+assert index.relationship(6,7) == ("first cousin",4) and index.relationship(6,8) == ("first cousin once removed",5)
+assert index.relationship(6,10) == ("half-sibling",2) and index.relationship(8,6) == ("first cousin once removed",5)
+print("Relationships work!")
+
+print("Checking extend_people...")
+test10 = copy.deepcopy(test)
+test10.extend_people([("Kid","F","Ryan","New Wife"),("New Wife","F",None,None)])
+assert test10.people["Kid"].father is test10.people["Ryan"] and test10.people["Kid"] in test10.people["Ryan"].children
+assert test10.people["Kid"].generation == 3 and test10.graph.generation[test10.graph.ids["Kid"]] == 3
+assert test10.graph.rank[test10.graph.ids["New Wife"]] < test10.graph.rank[test10.graph.ids["Kid"]]
+assert test10.relationship("Kid","Laura") == "aunt/uncle" and test10.kinship_pairs([("Kid","Ryan")]).tolist() == [0.25]
+assert test10.people["Ryan"].descendants() == {test10.people["Kid"]}
+for rows in [[("Ryan","M",None,None)],
+			 [("A","M","B",None),("B","M","A",None)],
+			 [("Stranger","M","Nobody",None)],
+			 [("Baby","X",None,None)]]:
+	try:
+		test10.extend_people(rows)
+		raise Exception("TEST FAILED")
+	except AssertionError as msg:
+		print("caught exception %s" % str(msg).replace("\t",""))
+assert len(test10.people) == len(test10.graph) == 13 and "A" not in test10.people
+print("extend_people works!")
+
+print("Checking compact people...")
+leaf = Person("Leaf","f")
+assert not hasattr(leaf,"__dict__") and leaf._children is None and leaf._variants is None
+assert leaf.gender == "female" and leaf.children == set() and len(leaf.variants) == 0
+leaf.gender = "M"
+assert leaf.gender == "male"
+print("Compact people work!")
+
+print("Checking PLINK files...")
+test11 = Pedigree()
+test11.load_fam("ryan_pedigree.fam")
+assert test11.people["Ryan"].father is test11.people["Daryl"] and test11.people["Alice_Gayle"].gender == "female"
+assert test11.families["Ryan"] == "FAM1" and test11.people["Ben"].mother is None
+with tempfile.TemporaryDirectory() as directory:
+	fam = os.path.join(directory,"out.fam")
+	test11.save_fam(fam,chunksize=4)
+	assert open(fam).read() == open("ryan_pedigree.fam").read(), "a loaded FAM file should be written back unchanged"
+	test12 = Pedigree()
+	test12.load_fam("ryan_pedigree.fam",separator="/")
+	assert test12.people["FAM1/Ryan"].mother is test12.people["FAM1/Lily"]
+	test12.save_fam(fam,separator="/")
+	assert open(fam).read() == open("ryan_pedigree.fam").read()
+	test13 = Pedigree()
+	test13.load_ped("test_genotypes.ped",chunksize=4)
+	assert len(test13.people) == 11 and len(test13.variants) == 5
+	assert test13.people["Laura"].get_variant("chrX",999).ref == "G" and test13.people["Laura"].get_variant("chrX",999).alt == "A"
+	assert [v.person.name for v in test13.variants_at("chr1",3000)] == ["Daryl","Ryan"]
+	other = Pedigree()
+	other.load_fam("test_genotypes.ped") #the first six PED columns are a FAM file
+	assert len(other.people) == 11 and other.people["Ryan"].father is other.people["Daryl"]
+	#markers on chromosomes hg38 does not have are skipped, not failed
+	with open(os.path.join(directory,"other.map"),"w") as f:
+		f.write("".join(open("test_genotypes.map").readlines()[:2])+"MT\trs3\t0\t1000\n")
+	other = Pedigree()
+	other.load_ped("test_genotypes.ped",map_path=os.path.join(directory,"other.map"))
+	assert len(other.variants) == 3 and other.variants_at("chrX",999) == []
+	with open(os.path.join(directory,"other.map"),"w") as f:
+		f.write("".join(open("test_genotypes.map").readlines()[:2])+"0\trs3\t0\t1000\n")
+	other = Pedigree()
+	other.load_ped("test_genotypes.ped",map_path=os.path.join(directory,"other.map"))
+	assert len(other.variants) == 3
+	with open(fam,"w") as f:
+		f.write("FAM1 Kid 0 0 0 -9\n")
+	try:
+		Pedigree().load_fam(fam)
+		raise Exception("TEST FAILED")
+	except AssertionError as msg:
+		print("caught exception %s" % str(msg).replace("\t",""))
+	with open(fam,"w") as f:
+		f.write("".join(open("test_genotypes.map").readlines()[:2])) #one marker short
+	try:
+		Pedigree().load_ped("test_genotypes.ped",map_path=fam)
+		raise Exception("TEST FAILED")
+	except AssertionError as msg:
+		print("caught exception %s" % str(msg).replace("\t",""))
+	#a variant that fails removes the people of the load too, so it can be retried
+	with open(fam,"w") as f:
+		f.write("".join(open("test_genotypes.map").readlines()[:2])+"1\trs3\t0\t300000000\n") #past the end of chr1
+	other = Pedigree()
+	try:
+		other.load_ped("test_genotypes.ped",map_path=fam,chunksize=4)
+		raise Exception("TEST FAILED")
+	except AssertionError as msg:
+		print("caught exception %s" % str(msg).replace("\t",""))
+	assert len(other.people) == 0 and len(other.graph) == 0 and len(other.variants) == 0 and len(other.variants.people) == 0
+	assert other.families == {} and other.phenotypes == {}
+	other.load_ped("test_genotypes.ped",chunksize=4)
+	assert len(other.people) == 11 and len(other.variants) == 5 and other.people["Ryan"].father is other.people["Daryl"]
+	assert [v.person.name for v in other.variants_at("chr1",3000)] == ["Daryl","Ryan"]
+print("PLINK files work!")
+
+print("Checking PLINK .bed genotypes...")
+test14 = Pedigree()
+test14.load_bed("test_genotypes.bed")
+assert test14.people["Ryan"].mother is test14.people["Lily"] and len(test14.genotypes) == 3
+assert test14.genotypes.dosages([2]).tolist() == [[0,0,0,0,2,0,0,0,0,0,1]]
+assert test14.genotypes.person_dosages(test14.people["Daryl"]).tolist() == [1,-1,0]
+for name,person in test14.people.items(): #the same variants as the PED file
+	assert sorted((v.chrom,v.pos,v.ref,v.alt) for v in person.variants) == sorted((v.chrom,v.pos,v.ref,v.alt) for v in test13.people[name].variants)
+assert test14.people["Laura"].get_variant("chr4",5000).ref == "C" and test14.people["Laura"].has_variant("chrX",999)
+assert not test14.people["Daryl"].has_variant("chr4",5000), "a missing genotype is not a variant"
+assert [v.person.name for v in test14.genotypes.variants_at("chr1",3000)] == ["Daryl","Ryan"]
+try:
+	test14.people["Ben"].add_variant(Variant("chr1",5,"A"))
+	raise Exception("TEST FAILED")
+except AssertionError as msg:
+	print("caught exception %s" % str(msg))
+print("PLINK .bed genotypes work!")
+
+print("\nChecking validation reports...")
+test15 = Pedigree()
+report = test15.validate_people("ryan_pedigree.txt")
+assert len(report) == 0
+report = test15.validate_people("ryan_pedigree_parentsnotinset.txt")
+print(report)
+assert list(report.columns) == ["record","column","error","message"]
+assert report["record"].is_monotonic_increasing
+assert sorted(report["error"]) == ["cycle","cycle","missing_parent","missing_parent"] #every problem, not just the first
+assert set(report[report["error"] == "cycle"]["record"]) == {12,13}
+for filename,error,record in [("ryan_pedigree_dupperson.txt","duplicate_name",12),
+							  ("ryan_pedigree_selfloop.txt","cycle",12),
+							  ("ryan_pedigree_wronggender.txt","bad_gender",10)]:
+	report = test15.validate_people(filename)
+	assert list(zip(report["error"],report["record"])) == [(error,record)]
+assert len(test15.people) == 0 #validation loads nothing
+test15.load_people("ryan_pedigree.txt")
+report = test15.validate_people("ryan_pedigree.txt")
+assert (report["error"] == "already_loaded").all() and len(report) == len(test15.people)
+
+assert len(test15.validate_variants("test_variants.txt")) == 0
+for filename,errors in [("test_variants_altimproper.txt",["bad_alt"]),
+						("test_variants_refimproper.txt",["bad_ref"]),
+						("test_variants_varoutofrange.txt",["bad_pos"]),
+						("test_variants_improperchrom.txt",["bad_chrom","unknown_person"]),
+						("test_variants_personnotindataset.txt",["unknown_person"]),
+						("test_variants_redundantpos.txt",["duplicate_variant"])]:
+	for chunksize in [None,2]:
+		report = test15.validate_variants(filename,chunksize=chunksize)
+		assert list(report["error"]) == errors
+		assert (report["record"] == 4).all()
+test15.load_variants("test_variants.txt")
+report = test15.validate_variants("test_variants.txt")
+assert (report["error"] == "duplicate_variant").all() and len(report) == 4
+print(report)
+
+#the checks are not asserts, so they survive python -O
+import subprocess,sys
+result = subprocess.run([sys.executable,"-O","-c","from assignment4 import Pedigree; print(len(Pedigree().validate_people('ryan_pedigree_nonDAG.txt')))"],capture_output=True,text=True)
+assert result.stdout.strip() == "2"
+
+#a variant without a person is reported, and rejected by both load paths
+with tempfile.TemporaryDirectory() as directory:
+	nobody = os.path.join(directory,"nobody.txt")
+	with open("test_variants.txt") as f, open(nobody,"w") as out:
+		lines = f.readlines()
+		out.writelines(lines[:3]+["chr5\t6000\tA\tT\t\n"]+lines[3:])
+	test15 = Pedigree()
+	test15.load_people("ryan_pedigree.txt")
+	report = test15.validate_variants(nobody)
+	assert list(zip(report["error"],report["record"])) == [("missing_person",3)]
+	for bulk in [False,True]:
+		try:
+			test15.load_variants(nobody,bulk=bulk)
+			raise Exception("TEST FAILED")
+		except AssertionError as msg:
+			print("caught exception %s" % str(msg))
+		assert len(test15.variants) == 0
+
+	#a float pos is rejected the same way by validation and both load paths, as Variant() does
+	floatpos = os.path.join(directory,"floatpos.txt")
+	with open(floatpos,"w") as out:
+		out.writelines(lines[:1]+["chr1\t3000.0\tA\tT\tRyan\n"])
+	report = test15.validate_variants(floatpos)
+	assert list(zip(report["error"],report["record"])) == [("bad_pos",1)]
+	assert report["message"].iat[0] == "pos must be type int, got type %s" % float
+	for bulk in [False,True]:
+		try:
+			test15.load_variants(floatpos,bulk=bulk)
+			raise Exception("TEST FAILED")
+		except AssertionError as msg:
+			print("caught exception %s" % str(msg))
+		assert len(test15.variants) == 0
+
+	#the load paths raise explicitly, so they also fail under python -O
+	for call in ["Pedigree().load_people('ryan_pedigree_dupperson.txt')",
+				 "Pedigree().load_people('ryan_pedigree_wronggender.txt')",
+				 "p = Pedigree(); p.load_people('ryan_pedigree.txt'); p.load_variants('test_variants_personnotindataset.txt')",
+				 "p = Pedigree(); p.load_people('ryan_pedigree.txt'); p.load_variants('test_variants_varoutofrange.txt')",
+				 "p = Pedigree(); p.load_people('ryan_pedigree.txt'); p.load_variants(%r)" % nobody]:
+		result = subprocess.run([sys.executable,"-O","-c","from assignment4 import Pedigree; "+call],capture_output=True,text=True)
+		assert "AssertionError" in result.stderr, call
+print("Validation reports work!")
+
+print("\nChecking Mendelian errors...")
+trios,sites = test14.mendelian_errors() #genotypes from the .bed file
+print(trios)
+print(sites)
+assert list(trios["child"]) == ["Lily","Daryl","Norman","David","Sheila","Ryan","Laura"]
+assert trios.set_index("child")["sites"].to_dict() == {"Lily":2,"Daryl":1,"Norman":2,"David":2,"Sheila":2,"Ryan":1,"Laura":1} #chrX is skipped, Daryl is uncalled at rs2
+assert trios["errors"].sum() == 1 and trios["de_novo"].sum() == 1
+assert list(sites[["child","chrom","pos","error","child_dosage","mother_dosage","father_dosage"]].itertuples(index=False,name=None)) == \
+	[("Daryl","chr1",3000,"de_novo",1,0,0)] #Ryan's copy is explained by Daryl
+trios,sites = test14.mendelian_errors(["Ryan","Laura"],chunksize=1)
+assert list(trios["child"]) == ["Ryan","Laura"] and len(sites) == 0
+
+test16 = Pedigree()
+test16.load_people("ryan_pedigree.txt")
+test16.load_variants("test_variants.txt")
+test16.people["Lily"].add_variant(Variant("chr1",3000,"T",ref="A",sanity=False)) #explains Ryan's chr1 variant
+test16.people["Daryl"].add_variant(Variant("chr4",5000,"G",ref="T",sanity=False)) #a different alt does not
+trios,sites = test16.mendelian_errors(["Ryan","Laura"])
+print(sites)
+assert trios.set_index("child").loc["Ryan",["sites","errors","de_novo"]].tolist() == [3,2,1]
+assert list(sites[["child","chrom","pos","alt","error"]].itertuples(index=False,name=None)) == \
+	[("Ryan","chr4",5000,"A","mendelian"),("Ryan","chr4",5001,"C","de_novo"),("Laura","chr2",4000,"G","de_novo")]
+print("Mendelian errors work!")
+
+print("\nChecking gene dropping...")
+test17 = Pedigree()
+test17.load_people("ryan_pedigree.txt")
+graph = test17.graph
+alleles = test17.gene_drop(4000,seed=7)
+assert alleles.shape == (4000,len(graph),2)
+for i in range(len(graph)):
+	if graph.founder[i]:
+		assert (alleles[:,i] == [2*i,2*i+1]).all() #founders keep their own alleles
+	for slot,parent in enumerate([graph.mother[i],graph.father[i]]):
+		if parent >= 0: #every allele comes from the parent
+			assert (alleles[:,i,slot,None] == alleles[:,parent]).any(axis=1).all()
+shared = lambda a,b: (alleles[:,graph.ids[a],:,None] == alleles[:,graph.ids[b],None,:]).mean() #estimated kinship
+kinship = test17.kinship()
+for a,b in [("Ryan","Laura"),("Ryan","Ben"),("Ryan","Sheila"),("Lily","Daryl")]:
+	print(a,b,shared(a,b),kinship.loc[a,b])
+	assert abs(shared(a,b)-kinship.loc[a,b]) < 0.02
+assert (test17.gene_drop(1000,seed=7,batch=300) == test17.gene_drop(1000,seed=7,batch=300,workers=2)).all() #same with a pool
+assert not (test17.gene_drop(1000,seed=7) == test17.gene_drop(1000,seed=8)).all()
+dosages = test17.gene_drop(2000,seed=7,frequency=0.25)
+assert dosages.shape == (2000,len(graph)) and dosages.dtype == np.int8
+assert (abs(dosages.mean(axis=0)-0.5) < 0.1).all()
+assert test17.gene_drop(0).shape == (0,len(graph),2)
+print("Gene dropping works!")
+
+print("\nChecking segregation filters...")
+sites = test14.segregating_sites("dominant",affected=["Ryan","Daryl"],unaffected=["Ben","Alice_Gayle","Lily"])
+print(sites)
+assert list(sites[["chrom","pos","carriers"]].itertuples(index=False,name=None)) == [("chr1",3000,2)]
+sites = test14.segregating_sites("de_novo",affected=["Daryl"],unaffected=["Ben","Alice_Gayle","Norman"])
+assert list(sites["pos"]) == [3000] #Daryl's rs2 genotype is missing, so rs2 cannot be de novo
+assert len(test14.segregating_sites("de_novo",affected=["Ryan","Daryl"],unaffected=["Ben","Alice_Gayle","Lily"])) == 0 #Daryl passes it on
+try:
+	test14.segregating_sites("de_novo",affected=["Ryan"])
+	raise Exception("TEST FAILED")
+except AssertionError as msg:
+	print("caught exception %s" % msg)
+sites = test14.segregating_sites("x_linked",affected=["Lily"],unaffected=["Daryl","Laura"])
+assert list(sites[["chrom","pos","alt"]].itertuples(index=False,name=None)) == [("chrX",999,"A")] #Lily is homozygous, Laura a carrier
+assert len(test14.segregating_sites("x_linked",affected=["Lily","Laura"])) == 0 #but Laura is not homozygous
+test14.phenotypes.update({"Daryl":"2","Ryan":"2","Ben":"1"}) #PLINK affection status
+assert list(test14.segregating_sites("dominant")["pos"]) == [3000]
+try:
+	test14.segregating_sites("mitochondrial",affected=["Ryan"])
+	raise Exception("TEST FAILED")
+except AssertionError as msg:
+	print("caught exception %s" % msg)
+
+sites = test16.segregating_sites("dominant",affected=["Ryan","Lily"],unaffected=["Laura"]) #from the variants
+assert list(sites[["chrom","pos","alt"]].itertuples(index=False,name=None)) == [("chr1",3000,"T")]
+sites = test16.segregating_sites("de_novo",affected=["Ryan"],unaffected=["Lily","Daryl","Laura"])
+assert list(sites["pos"]) == [5000,5001] #Lily passes on chr1:3000; Daryl has a different alt at 5000
+sites = test16.segregating_sites("recessive",affected=["Ryan"],unaffected=["Lily"]) #zygosity unknown, carriers count
+assert list(sites["pos"]) == [3000]
+#argument checks raise explicitly too, so they also fail under python -O
+for call in ["p = Pedigree(); p.load_bed('test_genotypes.bed'); p.segregating_sites('de_novo',affected=['Ryan'])",
+			 "p = Pedigree(); p.load_people('ryan_pedigree.txt'); p.segregating_sites('mitochondrial',affected=['Ryan'])",
+			 "p = Pedigree(); p.load_people('ryan_pedigree.txt'); p.gene_drop(10,frequency=2)",
+			 "p = Pedigree(); p.load_people('ryan_pedigree.txt'); p.allele_frequencies(by='everyone')",
+			 "p = Pedigree(); p.variants.add(Variant('chr1',1,'A',person=Person('Eve','F'))); p.save('never_written.snapshot')",
+			 "p = Pedigree(); p.load_people('ryan_pedigree.txt'); p.graph.set_parent(p.graph.ids['Ben'],'father',p.graph.ids['Ryan']); p.graph.kinship()",
+			 "p = Pedigree(); p.load_people('ryan_pedigree.txt'); p.graph.set_parent(p.graph.ids['Ben'],'father',p.graph.ids['Ryan']); p.graph.relationships()"]:
+	result = subprocess.run([sys.executable,"-O","-c","from assignment4 import *; "+call],capture_output=True,text=True)
+	assert "AssertionError" in result.stderr, call
+assert not os.path.exists("never_written.snapshot")
+print("Segregation filters work!")
+
+print("\nChecking the site index...")
+test18 = Pedigree()
+test18.load_people("ryan_pedigree.txt")
+test18.load_variants("test_variants.txt")
+test18.people["Laura"].add_variant(Variant("chr1",3000,"T",ref="A"))
+test18.people["Lily"].add_variant(Variant("chr1",3000,"G",ref="A"))
+counts = test18.allele_counts()
+print(counts)
+assert list(counts[["chrom","pos","alt","carriers"]].itertuples(index=False,name=None)) == \
+	[("chr1",3000,"G",1),("chr1",3000,"T",2),("chr2",4000,"G",1),("chr4",5000,"A",1),("chr4",5001,"C",1)] #each site once
+assert [p.name for p in test18.carriers("chr1",3000)] == ["Lily","Ryan","Laura"]
+assert [p.name for p in test18.carriers("chr1",3000,"T")] == ["Ryan","Laura"]
+assert test18.carriers("chr1",3000,"C") == [] and test18.carriers("chr1",3001) == [] and test18.carriers("chrU",3000) == []
+assert [(v.chrom,v.pos) for v in test18.people["Laura"].variants] == [("chr2",4000),("chr1",3000)] #in the order they were added
+test18.people["Laura"].remove_variant(test18.people["Laura"].get_variant("chr1",3000)) #the index follows changes
+assert [p.name for p in test18.carriers("chr1",3000,"T")] == ["Ryan"]
+assert len(test18.people["Laura"].variants) == 1
+assert test18.allele_counts()["carriers"].sum() == len(test18.variants)
+#changes between queries are merged into the built index; it must match one built from scratch
+table = test18.variants
+codes = [table.person_code(test18.people[name]) for name in ["Ryan","Laura","Lily"]]
+for pos in range(100):
+	test18.people[["Ryan","Laura","Lily"][pos%3]].add_variant(Variant("chr5",pos//3,"ACGT"[pos%2]))
+	if pos%5 == 0:
+		test18.people["Laura"].remove_variant(list(test18.people["Laura"].variants)[0])
+	if pos%9 == 0:
+		variant = list(test18.people["Ryan"].variants)[-1]
+		if not test18.people["Daryl"].has_variant(variant.chrom,variant.pos):
+			variant.person = test18.people["Daryl"]
+	sites,carriers = table.carriers(codes)
+	fresh = SiteIndex(table)
+	fresh.build()
+	fresh.build_people()
+	for name in ["keys","rows","starts","chrom","pos","ref","alt","person_rows","person_starts"]:
+		assert (getattr(table.sites,name) == getattr(fresh,name)).all(), name
+print("The site index works!")
+
+print("\nChecking allele frequencies...")
+test19 = Pedigree()
+test19.load_people("ryan_pedigree.txt")
+assert len(test19.allele_frequencies()) == 0
+test19.load_variants("test_variants.txt") #counted as it loads
+frequencies = test19.allele_frequencies()
+print(frequencies)
+assert list(frequencies.columns) == ["chrom","pos","ref","alt","carriers","people","frequency"]
+assert (frequencies["people"] == 11).all() and np.allclose(frequencies["frequency"],1/22)
+test19.people["Laura"].add_variant(Variant("chr1",3000,"T",ref="A"))
+frequencies = test19.allele_frequencies(chroms=["chr1"])
+assert list(frequencies[["pos","carriers"]].itertuples(index=False,name=None)) == [(3000,2)]
+test19.people["Ryan"].remove_variant(test19.people["Ryan"].get_variant("chr4",5000))
+assert list(test19.allele_frequencies(chroms=["chr4"])["pos"]) == [5001]
+counted = test19.allele_frequencies()
+assert (counted[["chrom","pos","alt","carriers"]].values == test19.allele_counts()[["chrom","pos","alt","carriers"]].values).all()
+frequencies = test19.allele_frequencies(by={"Ryan":"kids","Laura":"kids","Lily":"parents","Daryl":"parents"})
+assert list(frequencies[["group","pos","carriers","people","frequency"]].itertuples(index=False,name=None)) == \
+	[("kids",3000,2,2,0.5),("kids",4000,1,2,0.25),("kids",5001,1,2,0.25)]
+
+frequencies = test13.allele_frequencies(by="family") #PLINK families from the PED file
+print(frequencies)
+assert (frequencies["family"] == "FAM1").all() and (frequencies["people"] == len(test13.people)).all()
+print("Allele frequencies work!")
+
+for filename in ["test_variants_altimproper.txt",
+				 "test_variants_refimproper.txt",
+				 "test_variants_varoutofrange.txt",
+				 "test_variants_improperchrom.txt",
+				 "test_variants_personnotindataset.txt",
+				 "test_variants_redundantpos.txt"]:
+	print("\nbulk %s" % filename)
+	try:
+		test2 = copy.deepcopy(test)
+		test2.load_variants(filename,bulk=True)
+		raise Exception("TEST FAILED")
+	except AssertionError as msg:
+		print("caught exception %s" % str(msg).replace("\t",""))
+
 print("")
 print("ALL TESTS PASSED :D")
\ No newline at end of file
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+""" Benchmark `person.Person`: memory and time per person to construct and to link to parents
+
+Genders are given in the spellings found in PED and pedigree files, so construction includes the
+synonym lookup. Loading whole pedigree files is measured by
+assignments/4/solutions/assignment4_benchmark.py.
+
+Run with `python benchmark_person.py [number of people]`; exits non-zero if a target is missed.
+
+:Authors: Ryan Neff <ryan.neff@icahn.mssm.edu>
+:Date: 2017-12-12
+:Copyright: 2017, Arthur Goldberg
+:License: MIT
+"""
+import sys
+import time
+import tracemalloc
+
+from person import Person, Gender
+
+# the Person object and its slot in the list of people; names are built before measuring
+BYTES_PER_PERSON = 120
+MICROSECONDS_PER_PERSON = 20
+
+
+def benchmark(n):
+    """ Build `n` parentless people, then give each of them a mother and father
+
+    Args:
+        n (:obj:`int`): number of people
+
+    Returns:
+        :obj:`tuple`: (bytes per person, microseconds per person to construct, microseconds per
+            person to link to parents)
+    """
+    genders = ['male', 'F', '1', Gender.FEMALE]
+    names = ['person{}'.format(i) for i in range(n)]
+    tracemalloc.start()
+    start = time.perf_counter()
+    people = [Person(name, genders[i % 4]) for i, name in enumerate(names)]
+    constructed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for i in range(2, n):
+        people[i].set_mother(people[i - 1 - (i % 2)])
+        people[i].set_father(people[i - 2 + (i % 2)])
+    linked = time.perf_counter() - start
+    return size / n, constructed / n * 1e6, linked / n * 1e6
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    size, constructed, linked = benchmark(n)
+    print("{} people: {:.0f} bytes/person (target {}), {:.2f} us/person to construct (target {}), "
+          "{:.2f} us/person to link parents".format(n, size, BYTES_PER_PERSON, constructed,
+                                                    MICROSECONDS_PER_PERSON, linked))
+    if size > BYTES_PER_PERSON or constructed > MICROSECONDS_PER_PERSON:
+        sys.exit("target missed")
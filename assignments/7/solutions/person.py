@@ -7,6 +7,8 @@
 :Copyright: 2017, Arthur Goldberg
 :License: MIT
 """
+import collections
+
 
 class Error(Exception):
     """ Base class for exceptions in this module
@@ -31,14 +33,11 @@ class Gender(object):
     MALE = 'M'
     FEMALE = 'F'
     UNKNOWN = 'unknown'
+    # gender constants by the small integer code that `Person` stores
+    CODES = (UNKNOWN, MALE, FEMALE)
 
     def __init__(self):
-        # '1' and '2' map to male and female in PED files: see http://zzz.bwh.harvard.edu/plink/data.shtml#ped
-        self.gender_map = {
-            self.MALE:set(['male', 'm', '1']),
-            self.FEMALE:set(['female', 'f', '2']),
-            self.UNKNOWN:set(['unknown', 'na', 'not specified','-9','0']) #if we're following PED file format...
-        }
+        self.gender_map = GENDER_SYNONYMS
 
     def get_gender(self, gender):
         """ Obtain a gender constant
@@ -54,10 +53,36 @@ class Gender(object):
         Raises:
             :obj:`PersonError`: if `gender` does not map to a reference gender value
         """
-        for gender_constant,synonyms in self.gender_map.items():
-            if gender.lower() in synonyms:
-                return gender_constant
-        raise PersonError("Illegal gender '{}'".format(gender))
+        return Gender.CODES[_gender_code(gender)]
+
+    @staticmethod
+    def map_array(values, codes=False):
+        """ Convert a whole column of gender values at once
+
+        Each distinct value is looked up once. A numpy array or pandas Series is converted with
+        numpy and gives a numpy array back; any other iterable gives a list.
+
+        Args:
+             values (:obj:`iterable` of :obj:`str`): gender values
+             codes (:obj:`bool`, optional): provide indices into `Gender.CODES` rather than
+                gender constants
+
+        Returns:
+            :obj:`list` or :obj:`numpy.ndarray`: a gender constant, or code, for each value
+
+        Raises:
+            :obj:`PersonError`: if any value does not map to a reference gender value
+        """
+        if hasattr(values, 'dtype'):
+            import numpy as np
+            distinct, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+            mapped = Gender.map_array(distinct.tolist(), codes=codes)
+            return np.asarray(mapped, dtype=np.int8 if codes else object)[inverse.ravel()]
+        values = list(values)
+        lookup = {value: _gender_code(value) for value in set(values)}
+        if not codes:
+            lookup = {value: Gender.CODES[code] for value, code in lookup.items()}
+        return [lookup[value] for value in values]
 
     def genders_string_mappings(self):
         """ Report the mappings from strings to gender constants
@@ -71,6 +96,116 @@ class Gender(object):
         return rv
 
 
+# '1' and '2' map to male and female in PED files: see http://zzz.bwh.harvard.edu/plink/data.shtml#ped
+GENDER_SYNONYMS = {
+    Gender.MALE:set(['male', 'm', '1']),
+    Gender.FEMALE:set(['female', 'f', '2']),
+    Gender.UNKNOWN:set(['unknown', 'na', 'not specified','-9','0']) #if we're following PED file format...
+}
+# every lower-case synonym -> its index in `Gender.CODES`, built once for all lookups
+_GENDER_CODES = {synonym: Gender.CODES.index(constant)
+                 for constant, synonyms in GENDER_SYNONYMS.items() for synonym in synonyms}
+
+
+def _gender_code(gender):
+    """ Look up the `Gender.CODES` index of a case-insensitive gender value
+
+    Raises:
+        :obj:`PersonError`: if `gender` does not map to a reference gender value
+    """
+    try:
+        return _GENDER_CODES[gender.lower()]
+    except (KeyError, AttributeError):
+        raise PersonError("Illegal gender '{}'".format(gender))
+
+
+class AncestorCache(object):
+    """ Memoized ancestor sets of people, with a bound on the memory they use
+
+    `ancestors(person)` builds a person's ancestor set once, reusing the cached sets of any
+    ancestors on the way, so later "is X an ancestor of Y" queries for the same Y are a set lookup.
+    Memory is bounded by `max_entries`, the total size of the cached sets; the least recently used
+    sets are dropped to stay under it. When an edge changes, `invalidate()` drops the sets of the
+    person below it and of their descendants, the only people whose ancestry changed.
+
+    Attributes:
+        max_entries (:obj:`int`): the most ancestors held across all cached sets
+        entries (:obj:`int`): the number of ancestors held now
+    """
+
+    def __init__(self, max_entries=1 << 18):
+        self.max_entries = max_entries
+        self.entries = 0
+        self._sets = collections.OrderedDict()    # person -> frozenset, least recently used first
+
+    def __len__(self):
+        return len(self._sets)
+
+    def __contains__(self, person):
+        return person in self._sets
+
+    def ancestors(self, person):
+        """ Get all of `person`'s known ancestors
+
+        Args:
+            person (:obj:`Person`): the person
+
+        Returns:
+            :obj:`frozenset` of `Person`: `person`'s known ancestors
+        """
+        cached = self._sets.get(person)
+        if cached is not None:
+            self._sets.move_to_end(person)
+            return cached
+        # a cached ancestor brings all of their own ancestors, so their line is not walked again
+        ancestors = set()
+        stack = [person]
+        while stack:
+            current = stack.pop()
+            for parent in (current._mother, current._father):
+                if parent is None or parent in ancestors:
+                    continue
+                ancestors.add(parent)
+                known = self._sets.get(parent)
+                if known is not None:
+                    ancestors |= known
+                else:
+                    stack.append(parent)
+        ancestors = frozenset(ancestors)
+        if len(ancestors) <= self.max_entries:
+            self._sets[person] = ancestors
+            self.entries += len(ancestors)
+            while self.entries > self.max_entries:
+                _, dropped = self._sets.popitem(last=False)
+                self.entries -= len(dropped)
+        return ancestors
+
+    def invalidate(self, person):
+        """ Drop the cached sets of `person` and their descendants after an edge above `person` changed
+
+        Args:
+            person (:obj:`Person`): the person whose mother or father changed
+        """
+        if not self._sets:
+            return
+        stack = [person]
+        seen = set()
+        while stack:
+            current = stack.pop()
+            dropped = self._sets.pop(current, None)
+            if dropped is not None:
+                self.entries -= len(dropped)
+            for child in current._children or ():
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+
+    def clear(self):
+        """ Drop every cached set """
+        self._sets.clear()
+        self.entries = 0
+
+
 class Person(object):
     """ Person
 
@@ -80,8 +215,17 @@ class Person(object):
         mother (:obj:`Person`): a person's mother
         father (:obj:`Person`): a person's father
         children (:obj:`set` of `Person`): a person's children
+        generation (:obj:`int`): the length of the longest line of known ancestors above this
+            person; 0 for founders. It is kept up to date whenever `mother` or `father` changes.
     """
 
+    # no per-instance __dict__: the gender is stored as a code into `Gender.CODES` and children as
+    # None until the first child
+    __slots__ = ('name', '_gender', '_mother', '_father', '_children', 'generation')
+
+    # ancestor sets for is_ancestor_of() and add_child(), shared by every person
+    ancestor_cache = AncestorCache()
+
     def __init__(self, name, gender, mother=None, father=None):
         """ Create a Person instance
 
@@ -98,10 +242,15 @@ class Person(object):
             :obj:`PersonError`: if `gender` does not map to a reference gender value
         """
         self.name = name
-        self.gender = Gender().get_gender(gender)
-        self.mother = mother
-        self.father = father
-        self.children = set()
+        self.gender = gender
+        self._children = None
+        self.generation = 0
+        self._mother = None
+        self._father = None
+        if mother is not None:
+            self.mother = mother
+        if father is not None:
+            self.father = father
 
     def __repr__(self):
         """ Provide a string representation of this person"""
@@ -126,6 +275,114 @@ class Person(object):
             return 'NA'
         return person.name
 
+    @property
+    def gender(self):
+        """ :obj:`str`: this person's gender constant; set from any string `Gender` accepts """
+        return Gender.CODES[self._gender]
+
+    @gender.setter
+    def gender(self, gender):
+        self._gender = _gender_code(gender)
+
+    @property
+    def children(self):
+        """ :obj:`set` of `Person`: this person's children, created when first needed """
+        if self._children is None:
+            self._children = set()
+        return self._children
+
+    @children.setter
+    def children(self, children):
+        self._children = children
+
+    @property
+    def mother(self):
+        """ :obj:`Person`: this person's mother """
+        return self._mother
+
+    @mother.setter
+    def mother(self, mother):
+        self._set_parent('_mother', mother)
+
+    @property
+    def father(self):
+        """ :obj:`Person`: this person's father """
+        return self._father
+
+    @father.setter
+    def father(self, father):
+        self._set_parent('_father', father)
+
+    def _set_parent(self, attribute, parent, checked=False):
+        """ Set a parent reference, update the generations below it and drop the cached ancestor
+        sets it changes
+
+        Args:
+            checked (:obj:`bool`, optional): the caller has already ruled out a cycle
+
+        Raises:
+            :obj:`PersonError`: if `parent` is this person or one of their descendants
+        """
+        if parent is not None and not checked and self._has_descendant(parent):
+            raise PersonError("parent %s is a descendant of person %s" % (parent.name, self.name))
+        setattr(self, attribute, parent)
+        Person.ancestor_cache.invalidate(self)
+        self._update_generation()
+
+    def _has_descendant(self, person):
+        """ Test whether `person` is this person or one of their descendants
+
+        Descendants always have a larger generation than their ancestors, so branches whose
+        generation has reached `person`'s cannot lead to `person` and are not searched.
+
+        Returns:
+            :obj:`bool`: True if `person` is this person or a descendant
+        """
+        stack = [self]
+        while stack:
+            current = stack.pop()
+            if current is person:
+                return True
+            if current.generation < person.generation:
+                stack.extend(current._children or ())
+        return False
+
+    def _update_generation(self):
+        """ Recompute this person's generation from their parents, and then their descendants' """
+        stack = [self]
+        while stack:
+            person = stack.pop()
+            parents = [p for p in (person.mother, person.father) if p is not None]
+            generation = 1 + max(p.generation for p in parents) if parents else 0
+            if generation != person.generation:
+                person.generation = generation
+                stack.extend(person._children or ())
+
+    def is_ancestor_of(self, person):
+        """ Test whether this person is one of `person`'s known ancestors
+
+        A person without children is nobody's ancestor, and an ancestor's generation is always
+        smaller than their descendant's; other queries are answered from `Person.ancestor_cache`,
+        a set lookup once `person`'s ancestors are cached.
+
+        Args:
+            person (:obj:`Person`): the possible descendant
+
+        Returns:
+            :obj:`bool`: True if this person is an ancestor of `person`
+        """
+        if not self._children or self.generation >= person.generation:
+            return False
+        return self in Person.ancestor_cache.ancestors(person)
+
+    def is_founder(self):
+        """ Test whether this person has no known parents
+
+        Returns:
+            :obj:`bool`: True if neither parent is known
+        """
+        return self.mother is None and self.father is None
+
     def set_mother(self, mother):
         """ Set the mother of this person
 
@@ -134,11 +391,12 @@ class Person(object):
 
         Raises:
             :obj:`PersonError`: if `mother` is not female
+            :obj:`PersonError`: if `mother` is this person or one of their descendants
         """
         if mother.gender != Gender.FEMALE:
             raise PersonError("mother named '{}' is not female".format(mother.name))
-        mother.children.add(self)
         self.mother = mother
+        mother.children.add(self)
 
     def set_father(self, father):
         """ Set the father of this person
@@ -148,11 +406,12 @@ class Person(object):
 
         Raises:
             :obj:`PersonError`: if `father` is not male
+            :obj:`PersonError`: if `father` is this person or one of their descendants
         """
         if father.gender != Gender.MALE:
             raise PersonError("father named '{}' is not male".format(father.name))
-        father.children.add(self)
         self.father = father
+        father.children.add(self)
 
     def remove_mother(self):
         '''remove the mother-child relationship in this object and the mother'''
@@ -185,7 +444,7 @@ class Person(object):
             :obj:`PersonError`: if `child` has null gender
             :obj:`PersonError`: if `child` already has a mother or father set, depending on this person's gender
             :obj:`PersonError`: if `child` is already in person's descendents (including children)
-            :obj:`PersonError`: if `child` is in person's ancestors (cycle detection)
+            :obj:`PersonError`: if `child` is this person or one of their ancestors (cycle detection)
         '''
         if (child.mother != None)&(self.gender == Gender.FEMALE): #check if we're about to overwrite child's mother
             raise PersonError("child %s already has mother %s set"%(child.name, child.mother.name))
@@ -194,13 +453,12 @@ class Person(object):
         #FIXED BUG from unittests: inf needs to be 'inf' in the float definition
         #FIXED BUG: don't need to check for descendants here, checking for ancestors 
         #   and parent-child relationships is enough 
-        #FIXED BUG from unittests: inf needs to be 'inf' in the float definition
-        if child in self.all_ancestors(): #check all ancestors for us
+        if child is self or child.is_ancestor_of(self): #check all ancestors for us, from the cache
             raise PersonError("child %s is an ancestor of person %s"%(child.name, self.name))
         if self.gender == Gender.FEMALE:
-            child.set_mother(self)
+            child._set_parent('_mother', self, checked=True)
         elif self.gender == Gender.MALE:
-            child.set_father(self)
+            child._set_parent('_father', self, checked=True)
         else: #gender is unknown or null
             raise PersonError("cannot add child %s with unknown gender of parent"%child.name)
         self.children.add(child)
@@ -227,39 +485,26 @@ class Person(object):
         Raises:
             :obj:`PersonError`: if `max_depth` < `min_depth`
         """
-        if max_depth is not None:
-            if max_depth < min_depth:
-                    raise PersonError("max_depth ({}) cannot be less than min_depth ({})".format(
-                        max_depth, min_depth))
-        else:
-            # collect just one depth
-            max_depth = min_depth
-        collected_ancestors = set()
-        return self._ancestors(collected_ancestors, min_depth, max_depth)
-
-    def _ancestors(self, collected_ancestors, min_depth, max_depth):
-        """ Obtain this person's ancestors who lie within the generational depth [min_depth, max_depth]
+        return set(self.iter_ancestors(min_depth, max_depth))
 
-        This is a private, recursive method that recurses through the ancestry via parent references.
+    def iter_ancestors(self, min_depth, max_depth=None):
+        """ Lazily generate this person's ancestors within a generational depth range
 
         Args:
-            collected_ancestors (:obj:`set`): ancestors collected thus far by this method
             min_depth (:obj:`int`): see `ancestors()`
-            max_depth (:obj:`int`): see `ancestors()`
+            max_depth (:obj:`int`, optional): see `ancestors()`
 
         Returns:
-            :obj:`set` of `Person`: this person's ancestors
+            :obj:`generator` of `Person`: each ancestor once, nearest generations first
 
         Raises:
             :obj:`PersonError`: if `max_depth` < `min_depth`
         """
-        if min_depth <= 0:
-            collected_ancestors.add(self)
-        if 0 < max_depth:
-            for parent in [self.mother, self.father]:
-                if parent is not None:
-                    parent._ancestors(collected_ancestors, min_depth-1, max_depth-1)
-        return collected_ancestors
+        max_depth = self._check_depths(min_depth, max_depth)
+        # a person whose generation is below the depth still needed has no ancestors that deep
+        return self._traverse(lambda person: [p for p in (person.mother, person.father) if p is not None],
+                              min_depth, max_depth,
+                              keep=lambda person, depth: depth + person.generation >= min_depth)
 
     def descendants(self, min_depth=1, max_depth=None):
         """ Return this person's descendants within a generational depth range
@@ -279,35 +524,73 @@ class Person(object):
         Raises:
             :obj:`ValueError`: if `max_depth` < `min_depth`
         """
-        if max_depth is not None:
-            if max_depth < min_depth:
-                    raise PersonError("max_depth ({}) cannot be less than min_depth ({})".format(
-                        max_depth, min_depth))
-        else:
-            max_depth = min_depth # just collect one
-
-        collected_descendants = set()
-        return self._descendants(collected_descendants, min_depth, max_depth)
-
-    def _descendants(self, collected_descendants, min_depth, max_depth):
-        """ Obtain this person's descendants who lie within the generational depth [min_depth, max_depth]
-        This is a private, recursive method that recurses through the descendants via children references.
+        return set(self.iter_descendants(min_depth, max_depth))
+
+    def iter_descendants(self, min_depth=1, max_depth=None):
+        """ Lazily generate this person's descendants within a generational depth range
+
         Args:
-            collected_descendants (:obj:`set`): descendants collected thus far by this method
             min_depth (:obj:`int`): see `descendants()`
-            max_depth (:obj:`int`): see `descendants()`
+            max_depth (:obj:`int`, optional): see `descendants()`
+
         Returns:
-            :obj:`set` of `Person`: this person's descendants
+            :obj:`generator` of `Person`: each descendant once, nearest generations first
+
         Raises:
-            :obj:`ValueError`: if `max_depth` < `min_depth`
+            :obj:`PersonError`: if `max_depth` < `min_depth`
+        """
+        max_depth = self._check_depths(min_depth, max_depth)
+        return self._traverse(lambda person: person._children or (), min_depth, max_depth)
+
+    @staticmethod
+    def _check_depths(min_depth, max_depth):
+        """ Validate a depth range, defaulting `max_depth` to `min_depth`
+
+        Returns:
+            :obj:`int`: `max_depth`
+
+        Raises:
+            :obj:`PersonError`: if `max_depth` < `min_depth`
+        """
+        if max_depth is None:
+            # collect just one depth
+            return min_depth
+        if max_depth < min_depth:
+            raise PersonError("max_depth ({}) cannot be less than min_depth ({})".format(
+                max_depth, min_depth))
+        return max_depth
+
+    def _traverse(self, relatives, min_depth, max_depth, keep=None):
+        """ Walk breadth-first from this person, yielding relatives within [min_depth, max_depth]
+
+        The frontier at each depth is the set of people reachable by a path of exactly that length,
+        so a relative reached along many paths is expanded once per depth rather than once per
+        path, and deep lineages do not recurse.
+
+        Args:
+            relatives (:obj:`function`): maps a person to the next people out, e.g. their parents
+            min_depth (:obj:`int`): the minimum depth to yield
+            max_depth (:obj:`int`): the maximum depth to yield; may be infinite
+            keep (:obj:`function`, optional): `keep(person, depth)` is False when nothing worth
+                yielding can be reached through `person` at `depth`; that branch is dropped
+
+        Yields:
+            :obj:`Person`: each relative in range once, in order of depth
         """
-        assert self not in collected_descendants, "the pedigree is not a DAG. self is descendant of self."
-        if min_depth <= 0:
-            collected_descendants.add(self)
-        if 0 < max_depth:
-            for child in self.children:
-                child._descendants(collected_descendants, min_depth-1, max_depth-1)
-        return collected_descendants
+        yielded = set()
+        frontier = {self}
+        depth = 0
+        while frontier:
+            if keep is not None:
+                frontier = {person for person in frontier if keep(person, depth)}
+            if min_depth <= depth:
+                for person in frontier - yielded:
+                    yielded.add(person)
+                    yield person
+            if max_depth <= depth:
+                return
+            frontier = {relative for person in frontier for relative in relatives(person)}
+            depth += 1
 
     def parents(self):
         ''' Provide this person's parents
@@ -341,4 +624,4 @@ class Person(object):
         Returns:
             :obj:`set`: all of this person's known ancestors
         '''
-        return self.ancestors(1, max_depth=float('inf'))
+        return set(Person.ancestor_cache.ancestors(self))
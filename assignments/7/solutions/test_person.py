@@ -10,7 +10,7 @@
 import unittest
 import sys
 
-from person import Person, Gender, PersonError
+from person import Person, Gender, PersonError, AncestorCache
 
 
 class TestGender(unittest.TestCase):
@@ -25,6 +25,33 @@ class TestGender(unittest.TestCase):
             Gender().get_gender('---')
         self.assertIn('Illegal gender', str(context.exception))
 
+    def test_ped_codes(self):
+        self.assertEqual(Gender().get_gender('1'), Gender.MALE)
+        self.assertEqual(Gender().get_gender('2'), Gender.FEMALE)
+        self.assertEqual(Gender().get_gender('0'), Gender.UNKNOWN)
+        self.assertEqual(Gender().get_gender('-9'), Gender.UNKNOWN)
+        with self.assertRaises(PersonError):
+            Gender().get_gender(None)
+
+    def test_map_array(self):
+        self.assertEqual(Gender.map_array(['1', 'F', 'male', '0']),
+                         [Gender.MALE, Gender.FEMALE, Gender.MALE, Gender.UNKNOWN])
+        self.assertEqual(Gender.map_array(('2', '-9'), codes=True),
+                         [Gender.CODES.index(Gender.FEMALE), Gender.CODES.index(Gender.UNKNOWN)])
+        with self.assertRaises(PersonError) as context:
+            Gender.map_array(['m', '3'])
+        self.assertIn("Illegal gender '3'", str(context.exception))
+
+    def test_map_array_numpy(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest('numpy is not installed')
+        mapped = Gender.map_array(np.array(['2', '1', 'f', '2']))
+        self.assertEqual(mapped.tolist(), [Gender.FEMALE, Gender.MALE, Gender.FEMALE, Gender.FEMALE])
+        codes = Gender.map_array(np.array(['0', 'M']), codes=True)
+        self.assertEqual(codes.tolist(), [0, 1])
+
     def test_genders_string_mappings(self):
         output_string = Gender().genders_string_mappings()
         self.assertIn("Legal genders, which are case insensitive, map to gender constants:",output_string)
@@ -62,6 +89,17 @@ class TestPerson(unittest.TestCase):
         teststr = str(self.dad)
         self.assertIn("name: dad; gender: M>", teststr)
 
+    def test_compact_person(self):
+        leaf = Person('leaf', 'female')
+        self.assertFalse(hasattr(leaf, '__dict__'))
+        self.assertIsNone(leaf._children)
+        self.assertEqual(leaf.gender, Gender.FEMALE)
+        self.assertEqual(leaf.children, set())
+        leaf.gender = 'unknown'
+        self.assertEqual(leaf.gender, Gender.UNKNOWN)
+        with self.assertRaises(PersonError):
+            leaf.gender = '---'
+
     def test_set_mother(self):
         self.child.set_mother(self.mom)
         self.assertEqual(self.child.mother, self.mom)
@@ -129,6 +167,8 @@ class TestPerson(unittest.TestCase):
         with self.assertRaises(PersonError) as context:
             self.root_child.add_child(self.head_father)
         self.assertIn("is an ancestor of person", str(context.exception))
+        self.assertIsNone(self.head_father.father)
+        self.assertNotIn(self.head_father, self.root_child.children)
 
     def test_remove_father(self):
         self.child.set_father(self.dad)
@@ -212,6 +252,87 @@ class TestPerson(unittest.TestCase):
             self.root_child.ancestors(min_depth=2,max_depth=1)
         self.assertIn('max_depth (1) cannot be less than min_depth (2)', str(context.exception))
 
+    def test_ancestors_pruned(self):
+        self.assertEqual(self.head_father.ancestors(min_depth=1, max_depth=float('inf')), set())
+        self.assertEqual(self.root_child.ancestors(min_depth=4, max_depth=float('inf')), set())
+        self.assertEqual(len(self.root_child.ancestors(min_depth=3, max_depth=float('inf'))), 8)
+
+    def test_generation(self):
+        self.assertEqual(self.root_child.generation, 3)
+        self.assertEqual(self.head_father.generation, 0)
+        self.assertTrue(self.head_father.is_founder())
+        self.assertFalse(self.root_child.is_founder())
+        self.assertEqual(self.child.generation, 0)
+
+        # a new ancestor above the head father deepens the whole line below it
+        great = Person('great', Gender.MALE)
+        self.head_father.set_father(great)
+        self.assertEqual(self.head_father.generation, 1)
+        self.assertEqual(self.root_child.father.generation, 3)
+        self.assertEqual(self.root_child.generation, 4)
+        self.assertEqual(self.root_child.mother.generation, 2)
+
+        self.head_father.remove_father()
+        self.assertEqual(self.head_father.generation, 0)
+        self.assertEqual(self.root_child.generation, 3)
+
+    def test_ancestor_cache(self):
+        self.assertTrue(self.head_father.is_ancestor_of(self.root_child))
+        self.assertFalse(self.root_child.is_ancestor_of(self.head_father))
+        self.assertFalse(self.root_child.is_ancestor_of(self.root_child))
+        self.assertEqual(len(self.root_child.all_ancestors()), 14)
+
+        self.assertIn(self.root_child, Person.ancestor_cache)
+        # changing an edge above a cached person is seen by everyone below it
+        great = Person('great', Gender.MALE)
+        self.head_father.set_father(great)
+        self.assertTrue(great.is_ancestor_of(self.root_child))
+        self.assertEqual(len(self.root_child.all_ancestors()), 15)
+        self.head_father.remove_father()
+        self.assertFalse(great.is_ancestor_of(self.root_child))
+        self.root_child.remove_mother()
+        self.assertEqual(len(self.root_child.all_ancestors()), 7)
+        self.assertEqual(self.root_child.all_ancestors(),
+                         self.root_child.ancestors(1, max_depth=float('inf')))
+
+    def test_ancestor_cache_bound(self):
+        cache = AncestorCache(max_entries=10)
+        self.assertEqual(len(cache.ancestors(self.root_child)), 14)
+        self.assertNotIn(self.root_child, cache)    # larger than the whole cache
+        cache.ancestors(self.root_child.mother)
+        cache.ancestors(self.root_child.father)
+        self.assertLessEqual(cache.entries, 10)
+        self.assertNotIn(self.root_child.mother, cache)    # least recently used, dropped
+        self.assertIn(self.root_child.father, cache)
+        # a removed edge drops the sets of everyone below it
+        self.root_child.father.remove_father()
+        cache.invalidate(self.root_child.father)
+        self.assertNotIn(self.root_child.father, cache)
+        self.assertEqual(cache.entries, 0)
+
+    def test_is_ancestor_of_inbred(self):
+        # each couple's children are the next couple, so an ancestor is reached along 2**depth
+        # paths; the search must visit each one once
+        mother, father = Person('mother0', Gender.FEMALE), Person('father0', Gender.MALE)
+        top = father
+        for i in range(1, 60):
+            daughter, son = Person('mother%d' % i, Gender.FEMALE), Person('father%d' % i, Gender.MALE)
+            for child in (daughter, son):
+                child.set_mother(mother)
+                child.set_father(father)
+            mother, father = daughter, son
+        self.assertTrue(top.is_ancestor_of(father))
+        self.assertFalse(father.is_ancestor_of(top))
+        self.assertEqual(len(father.all_ancestors()), 118)
+
+    def test_set_parent_cycle_error(self):
+        with self.assertRaises(PersonError) as context:
+            self.head_father.set_father(self.root_child.father)
+        self.assertIn('is a descendant of person', str(context.exception))
+        self.assertIsNone(self.head_father.father)
+        self.assertNotIn(self.head_father, self.root_child.father.children)
+        self.assertEqual(self.head_father.generation, 0)
+
     def test_descendants(self):
         children = set([Person.get_persons_name(i) 
                               for i in self.head_father.descendants()])
@@ -223,6 +344,36 @@ class TestPerson(unittest.TestCase):
         true_descendants = {'root_child_dad_dad', 'root_child_dad', 'root_child'}
         self.assertEqual(all_descendants, true_descendants)
 
+    def test_iter_ancestors(self):
+        ancestors = self.root_child.iter_ancestors(1, max_depth=float('inf'))
+        self.assertIn(next(ancestors), self.root_child.parents())
+        self.assertEqual(len(list(ancestors)), 13)
+        with self.assertRaises(PersonError):
+            self.root_child.iter_ancestors(2, max_depth=1)
+
+    def test_traverse_shared_ancestors(self):
+        # a person reached along paths of different lengths appears at every depth they occupy
+        founder = Person('founder', Gender.MALE)
+        daughter = Person('daughter', Gender.FEMALE)
+        founder.add_child(daughter)
+        grandchild = Person('grandchild', Gender.UNKNOWN)
+        founder.add_child(grandchild)
+        daughter.add_child(grandchild)
+        self.assertEqual(grandchild.ancestors(1), {founder, daughter})
+        self.assertEqual(grandchild.ancestors(2), {founder})
+        self.assertEqual(founder.descendants(2), {grandchild})
+        self.assertEqual(list(founder.iter_descendants(1, max_depth=float('inf'))).count(grandchild), 1)
+
+    def test_deep_lineage(self):
+        person = top = Person('top', Gender.FEMALE)
+        for i in range(3000):
+            child = Person('child%d' % i, Gender.FEMALE)
+            person.add_child(child)
+            person = child
+        self.assertEqual(len(person.ancestors(1, max_depth=float('inf'))), 3000)
+        self.assertEqual(len(top.descendants(1, max_depth=float('inf'))), 3000)
+        self.assertEqual(person.ancestors(3000), {top})
+
     def test_descendants_error(self):
         with self.assertRaises(PersonError) as context:
             self.head_father.descendants(min_depth=2,max_depth=1)